@@ -0,0 +1,119 @@
+import re
+from collections import Counter, deque
+
+# 比對模式
+OVERLAPPING = 'overlapping'              # 回報所有出現位置 (含彼此重疊者)
+LEFTMOST_LONGEST = 'leftmost_longest'    # 由左至右取最長者，已匹配的字元不再重複計算
+MATCH_MODES = (OVERLAPPING, LEFTMOST_LONGEST)
+
+
+class AhoCorasick:
+    """
+    多關鍵字比對自動機。建立一次後，每篇文本只需掃描一遍即可找出所有關鍵字。
+
+    :param keyword_labels: (dict) 關鍵字 -> 標籤 (或標籤序列，同一關鍵字可對應多個標籤)。
+    """
+
+    def __init__(self, keyword_labels):
+        self.keywords = []
+        self.labels = []
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+
+        for keyword, labels in keyword_labels.items():
+            if not keyword:
+                continue
+            if isinstance(labels, str):
+                labels = (labels,)
+            self._add(keyword, tuple(labels))
+        self._build_failure_links()
+        # 在根狀態時，以正規表示式直接跳到下一個可能的關鍵字起始字元
+        first_chars = ''.join(re.escape(ch) for ch in sorted(self._goto[0]))
+        self._next_start = re.compile(f'[{first_chars}]').search if first_chars else None
+
+    def _add(self, keyword, labels):
+        state = 0
+        for ch in keyword:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            state = nxt
+        kw_id = len(self.keywords)
+        self.keywords.append(keyword)
+        self.labels.append(labels)
+        self._out[state] = self._out[state] + (kw_id,)
+
+    def _build_failure_links(self):
+        goto, fail, out = self._goto, self._fail, self._out
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                # 後綴狀態的輸出一併合併，掃描時不必再沿失敗連結回溯
+                out[nxt] = out[nxt] + out[fail[nxt]]
+
+    def iter_overlapping(self, text):
+        """逐一產生 (起點, 終點, 關鍵字編號)，包含所有重疊的匹配"""
+        goto, fail, out = self._goto, self._fail, self._out
+        keywords = self.keywords
+        root = goto[0]
+        next_start = self._next_start
+        if next_start is None:
+            return
+        state = 0
+        i = 0
+        n = len(text)
+        while i < n:
+            if state == 0:
+                m = next_start(text, i)
+                if m is None:
+                    return
+                i = m.start()
+                state = root[text[i]]
+            else:
+                ch = text[i]
+                while state and ch not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(ch, 0)
+            for kw_id in out[state]:
+                yield i + 1 - len(keywords[kw_id]), i + 1, kw_id
+            i += 1
+
+    def find_all(self, text, mode=OVERLAPPING):
+        """回傳 (起點, 終點, 關鍵字編號) 列表，依 mode 決定是否允許重疊"""
+        if mode not in MATCH_MODES:
+            raise ValueError(f"未知的比對模式: {mode}，可用模式為 {MATCH_MODES}")
+        matches = list(self.iter_overlapping(text))
+        if mode == OVERLAPPING or len(matches) < 2:
+            return matches
+        matches.sort(key=lambda m: (m[0], -m[1]))
+        selected = []
+        last_end = 0
+        for start, end, kw_id in matches:
+            if start >= last_end:
+                selected.append((start, end, kw_id))
+                last_end = end
+        return selected
+
+    def count_keywords(self, text, mode=OVERLAPPING):
+        """回傳各關鍵字出現次數 (Counter，鍵為關鍵字字串)"""
+        return Counter(self.keywords[kw_id] for _, _, kw_id in self.find_all(text, mode))
+
+    def count_labels(self, text, mode=OVERLAPPING):
+        """回傳各標籤出現次數 (Counter)，同一關鍵字對應多個標籤時每個標籤各計一次"""
+        counter = Counter()
+        labels = self.labels
+        for _, _, kw_id in self.find_all(text, mode):
+            for label in labels[kw_id]:
+                counter[label] += 1
+        return counter
@@ -0,0 +1,88 @@
+"""
+比較舊版逐別名 doc.count 迴圈與 Aho-Corasick 自動機的人物聲量計算速度。
+
+用法: python benchmarks/bench_entity_volume.py [PTT 匯出檔路徑]
+未提供檔案時，以實體別名與隨機中文字合成測試文章。
+"""
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aho_corasick import LEFTMOST_LONGEST, OVERLAPPING
+from entity import build_entity_matcher, get_entity_map
+from ptt_reader import iter_posts
+
+NUM_SYNTHETIC_POSTS = 20000
+FILLER_CHARS = '的一是不了人我在有他這為之大來以個中上們到說時國和地也子就出要會可你對生能而'
+
+
+def make_synthetic_posts(entity_map, num_posts, seed=42):
+    rng = random.Random(seed)
+    aliases = [alias for aliases in entity_map.values() for alias in aliases]
+    posts = []
+    for _ in range(num_posts):
+        pieces = []
+        for _ in range(rng.randint(20, 80)):
+            pieces.append(''.join(rng.choice(FILLER_CHARS) for _ in range(rng.randint(5, 30))))
+            if rng.random() < 0.3:
+                pieces.append(rng.choice(aliases))
+        posts.append(''.join(pieces))
+    return posts
+
+
+def count_with_loop(documents, entity_map):
+    """舊版 analyze_entity_volume 的計數迴圈"""
+    entity_counter = Counter()
+    for doc in documents:
+        for main_entity, aliases in entity_map.items():
+            occurrences_in_doc = 0
+            for alias in aliases:
+                occurrences_in_doc += doc.count(alias)
+            if occurrences_in_doc > 0:
+                entity_counter[main_entity] += occurrences_in_doc
+    return entity_counter
+
+
+def count_with_matcher(documents, matcher, mode):
+    entity_counter = Counter()
+    for doc in documents:
+        entity_counter.update(matcher.count_labels(doc, mode))
+    return entity_counter
+
+
+def timed(label, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<28} {elapsed:8.3f} 秒")
+    return result
+
+
+def main():
+    entity_map = get_entity_map()
+    if len(sys.argv) > 1:
+        documents = [post for post in iter_posts(sys.argv[1]) if post.strip()]
+    else:
+        documents = make_synthetic_posts(entity_map, NUM_SYNTHETIC_POSTS)
+    total_chars = sum(len(doc) for doc in documents)
+    print(f"文章數: {len(documents)}，總字元數: {total_chars}")
+
+    start = time.perf_counter()
+    matcher = build_entity_matcher(entity_map)
+    print(f"  {'建立自動機':<28} {time.perf_counter() - start:8.3f} 秒 ({len(matcher.keywords)} 個別名)")
+
+    loop_counts = timed('逐別名 doc.count 迴圈', count_with_loop, documents, entity_map)
+    overlap_counts = timed('自動機 (overlapping)', count_with_matcher, documents, matcher, OVERLAPPING)
+    longest_counts = timed('自動機 (leftmost_longest)', count_with_matcher, documents, matcher, LEFTMOST_LONGEST)
+
+    print("\n前 10 位人物提及次數 (迴圈 / overlapping / leftmost_longest):")
+    for entity, count in loop_counts.most_common(10):
+        print(f"  {entity}: {count} / {overlap_counts[entity]} / {longest_counts[entity]}")
+
+
+if __name__ == '__main__':
+    main()
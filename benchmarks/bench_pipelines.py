@@ -0,0 +1,182 @@
+"""
+三個分析流程的效能測試：在 1 萬、10 萬、100 萬篇合成文章上分別計時解析、人物聲量、情感分數、
+斷詞前處理與 LDA 訓練各階段，並與儲存的基準結果比較，超過門檻的階段標示為退步。
+
+用法:
+  python benchmarks/bench_pipelines.py                        # 所有規模與階段，與基準比較
+  python benchmarks/bench_pipelines.py --sizes 10000 --stages parse entity sentiment
+  python benchmarks/bench_pipelines.py --sizes 10000 --save-baseline   # 以本次結果更新基準
+
+合成資料由 make_synthetic_dump.py 產生並保存在 benchmarks/data/，之後重複使用。
+基準結果只在同一台機器上比較才有意義，更換機器後請以 --save-baseline 重新建立。
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from opencc import OpenCC
+
+from corpus_cache import parse_dump
+from entity import ENTITY_MATCH_MODE, build_entity_matcher, get_entity_map
+from make_synthetic_dump import write_synthetic_dump
+from mention_matrix import build_mention_matrix
+from sentiment import calculate_sentiment_scores
+from topic_analysis import (
+    NUM_TOPICS, OPENCC_PROFILE, RANDOM_STATE, build_raw_corpus, ensure_jieba, filter_corpus,
+    fit_lda_model, get_stopwords, preprocess_texts_parallel
+)
+
+# --- 1. 設定 ---
+
+SIZES = [10000, 100000, 1000000]
+STAGES = ['parse', 'entity', 'sentiment', 'preprocess', 'lda']
+LDA_PASSES = 1                  # 測試時的 LDA 迭代次數 (只比較單次迭代的成本)
+REPEATS = 3                     # 較快的階段重複執行並取最短耗時，降低單次量測的雜訊
+REPEATED_STAGES = ('parse', 'entity', 'sentiment')
+REGRESSION_THRESHOLD = 1.25     # 耗時超過基準的倍數時視為退步
+
+DATA_DIR = os.path.join(BENCH_DIR, 'data')
+BASELINE_PATH = os.path.join(BENCH_DIR, 'baselines.json')
+
+
+# --- 2. 各階段 ---
+
+def dump_path_for(num_posts):
+    """取得 (必要時產生) 指定規模的合成匯出檔"""
+    path = os.path.join(DATA_DIR, f"synthetic-{num_posts}.txt")
+    if not os.path.exists(path):
+        print(f"  產生 {num_posts} 篇合成文章: {path}")
+        write_synthetic_dump(path, num_posts)
+    return path
+
+def run_stage(stage, state):
+    """
+    執行單一階段，state 保存前面階段的產出 (解析結果、斷詞結果) 供後續階段使用。
+    回傳該階段處理的項目數。
+    """
+    if stage == 'parse':
+        state['corpus'] = parse_dump(state['path'])
+        return len(state['corpus'])
+
+    corpus = state['corpus']
+    if stage == 'entity':
+        entity_map = get_entity_map()
+        matcher = build_entity_matcher(entity_map)
+        dated = corpus[corpus['timestamp'].notna()]
+        docs = [{'doc': doc, 'date': ts.to_pydatetime()} for doc, ts in zip(dated['text'], dated['timestamp'])]
+        build_mention_matrix({'synthetic': docs}, matcher, list(entity_map), ENTITY_MATCH_MODE)
+        return len(docs)
+    if stage == 'sentiment':
+        calculate_sentiment_scores(corpus['text'].tolist())
+        return len(corpus)
+    if stage == 'preprocess':
+        texts = [body if pushes is None else body + " " + pushes for body, pushes in zip(corpus['body'], corpus['pushes'])]
+        state['processed'] = preprocess_texts_parallel(texts, state['stopwords'], state['cc'])
+        return len(texts)
+    if stage == 'lda':
+        processed = [doc for doc in state['processed'] if doc]
+        dictionary, bows = filter_corpus(build_raw_corpus(processed))
+        fit_lda_model(dictionary, bows, NUM_TOPICS, LDA_PASSES, RANDOM_STATE)
+        return len(bows)
+    raise ValueError(f"未知的階段: {stage}")
+
+def bench_size(num_posts, stages, repeats=REPEATS):
+    """對單一規模依序執行各階段，回傳 {階段: {'seconds', 'items', 'items_per_sec'}}"""
+    state = {'path': dump_path_for(num_posts)}
+    needed = list(stages)
+    # 後面的階段需要前面階段的產出，未選取的前置階段照樣執行但不計入結果
+    if any(stage != 'parse' for stage in needed) and 'parse' not in needed:
+        needed.insert(0, 'parse')
+    if 'lda' in needed and 'preprocess' not in needed:
+        needed.insert(needed.index('lda'), 'preprocess')
+    if 'preprocess' in needed:
+        state['stopwords'] = get_stopwords()
+        state['cc'] = OpenCC(OPENCC_PROFILE)
+        ensure_jieba()  # 詞典載入屬於啟動成本，不計入前處理階段
+
+    results = {}
+    for stage in STAGES:
+        if stage not in needed:
+            continue
+        seconds = float('inf')
+        for _ in range(repeats if stage in REPEATED_STAGES and stage in stages else 1):
+            start = time.perf_counter()
+            items = run_stage(stage, state)
+            seconds = min(seconds, time.perf_counter() - start)
+        if stage in stages:
+            results[stage] = {'seconds': round(seconds, 4), 'items': items,
+                              'items_per_sec': round(items / seconds, 1) if seconds else None}
+    return results
+
+
+# --- 3. 基準比較 ---
+
+def load_baselines(path=BASELINE_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_baselines(results, path=BASELINE_PATH):
+    """將本次結果合併寫入基準檔 (只覆蓋本次有執行的規模與階段)"""
+    baselines = load_baselines(path)
+    sizes = baselines.setdefault('sizes', {})
+    for size, stage_results in results.items():
+        sizes.setdefault(size, {}).update(stage_results)
+    baselines['machine'] = {'platform': platform.platform(), 'python': platform.python_version(),
+                            'cpu_count': os.cpu_count()}
+    baselines['updated'] = datetime.now().isoformat(timespec='seconds')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(baselines, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write('\n')
+
+def report(results, baselines):
+    """印出各規模、各階段的耗時與吞吐量，並與基準比較；回傳退步的 (規模, 階段) 列表"""
+    regressions = []
+    base_sizes = baselines.get('sizes', {})
+    print(f"\n{'規模':>9} {'階段':<11} {'秒數':>9} {'每秒項目':>11} {'基準秒數':>9} {'倍數':>6}")
+    for size, stage_results in results.items():
+        for stage, result in stage_results.items():
+            base = base_sizes.get(size, {}).get(stage)
+            line = f"{size:>9} {stage:<11} {result['seconds']:>9.3f} {result['items_per_sec'] or 0:>11.1f}"
+            if base:
+                ratio = result['seconds'] / base['seconds'] if base['seconds'] else float('inf')
+                line += f" {base['seconds']:>9.3f} {ratio:>6.2f}"
+                if ratio > REGRESSION_THRESHOLD:
+                    line += "  <-- 退步"
+                    regressions.append((size, stage))
+            print(line)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='PTT 分析流程效能測試')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help='文章數規模')
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES, help='要計時的階段')
+    parser.add_argument('--repeat', type=int, default=REPEATS, help='快速階段的重複次數 (取最短耗時)')
+    parser.add_argument('--save-baseline', action='store_true', help='以本次結果更新基準檔')
+    args = parser.parse_args()
+
+    results = {}
+    for num_posts in args.sizes:
+        print(f"\n=== {num_posts} 篇文章 ===")
+        results[str(num_posts)] = bench_size(num_posts, args.stages, args.repeat)
+
+    regressions = report(results, load_baselines())
+    if args.save_baseline:
+        save_baselines(results)
+        print(f"\n基準結果已更新: {BASELINE_PATH}")
+    elif regressions:
+        print(f"\n警告：{len(regressions)} 個階段比基準慢超過 {REGRESSION_THRESHOLD} 倍。")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,190 @@
+"""
+主題模型後端比較：在同一份合成語料 (同一個詞典與文章 × 詞矩陣) 上以相同的主題數、迭代次數與隨機種子
+訓練各後端，比較訓練加推論的耗時、記憶體峰值與主題品質 (u_mass coherence、主題多樣性)。
+
+每個後端在獨立的子行程中執行，記憶體峰值互不影響；gensim 的 worker 行程計入子行程的峰值欄位。
+語料建立一次後存於 benchmarks/data/，之後重複使用。
+
+用法:
+  python benchmarks/bench_topic_backends.py                                   # 1 萬篇，所有後端
+  python benchmarks/bench_topic_backends.py --posts 100000 --backends gensim sklearn-online
+  python benchmarks/bench_topic_backends.py --output backend_benchmark.csv
+"""
+import argparse
+import json
+import os
+import pickle
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from topic_backends import TOPIC_BACKENDS
+
+# --- 1. 設定 ---
+
+DEFAULT_NUM_POSTS = 10000
+TOP_WORDS = 10              # 計算 coherence 與主題多樣性時每個主題取的關鍵詞數
+COHERENCE = 'u_mass'        # 只需詞袋即可計算 (越接近 0 越好)
+
+DATA_DIR = os.path.join(BENCH_DIR, 'data')
+
+
+# --- 2. 共用語料 ---
+
+def corpus_cache_path(num_posts):
+    from token_cache import preprocessing_fingerprint
+    from topic_analysis import OPENCC_PROFILE, get_custom_words, get_stopwords
+    fingerprint = preprocessing_fingerprint(get_custom_words(), get_stopwords(), OPENCC_PROFILE)
+    return os.path.join(DATA_DIR, f"topic-corpus-{num_posts}-{fingerprint}.pkl")
+
+def prepare_corpus(num_posts):
+    """解析、斷詞並過濾合成語料，將 (詞典, 文章 × 詞矩陣) 存檔；已存在時直接沿用。回傳存檔路徑"""
+    path = corpus_cache_path(num_posts)
+    if os.path.exists(path):
+        return path
+    from opencc import OpenCC
+    from bench_pipelines import dump_path_for
+    from corpus_cache import parse_dump
+    from topic_analysis import (
+        OPENCC_PROFILE, build_raw_corpus, filter_corpus, get_stopwords, preprocess_texts_parallel, topic_documents
+    )
+    print(f"  建立 {num_posts} 篇文章的共用語料: {path}")
+    texts, _ = topic_documents(parse_dump(dump_path_for(num_posts)))
+    processed = preprocess_texts_parallel(texts, get_stopwords(), OpenCC(OPENCC_PROFILE))
+    dictionary, corpus = filter_corpus(build_raw_corpus(doc for doc in processed if doc))
+    os.makedirs(DATA_DIR, exist_ok=True)
+    with open(path, 'wb') as f:
+        pickle.dump((dictionary, corpus.matrix), f, protocol=pickle.HIGHEST_PROTOCOL)
+    return path
+
+def load_corpus_file(path):
+    from token_corpus import BowCorpus
+    with open(path, 'rb') as f:
+        dictionary, matrix = pickle.load(f)
+    return dictionary, BowCorpus(matrix)
+
+
+# --- 3. 單一後端 (子行程) ---
+
+def memory_mb():
+    """
+    回傳 (目前記憶體用量, 本行程記憶體峰值, 已結束子行程的記憶體峰值) (MB)，無法取得的項目為 None。
+    Linux 上讀取 /proc/self/status：ru_maxrss 會沿用 exec 之前父行程的峰值，VmHWM 則只計本行程。
+    """
+    current = peak = children = None
+    try:
+        with open('/proc/self/status', 'r') as f:
+            fields = dict(line.split(':', 1) for line in f if ':' in line)
+        current = int(fields['VmRSS'].split()[0]) / 1024
+        peak = int(fields['VmHWM'].split()[0]) / 1024
+    except (OSError, KeyError, ValueError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return current, peak, children
+    scale = 1 / 1024 if sys.platform != 'darwin' else 1 / 2**20   # Linux 為 KB，macOS 為位元組
+    if peak is None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale
+    return current, peak, children
+
+def run_backend(backend, corpus_path, num_topics, passes, random_state):
+    """在目前行程訓練並推論一個後端，回傳結果 dict (含主題關鍵詞)"""
+    import numpy as np
+    import topic_analysis
+    from topic_analysis import fit_topic_model, infer_doc_topics
+    topic_analysis.TOPIC_BACKEND = backend
+    dictionary, corpus = load_corpus_file(corpus_path)
+    rss_before, _, _ = memory_mb()
+
+    start = time.perf_counter()
+    model = fit_topic_model(dictionary, corpus, num_topics, passes, random_state, backend)
+    train_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    doc_topics = infer_doc_topics(model, corpus)
+    infer_seconds = time.perf_counter() - start
+
+    _, rss_peak, children_peak = memory_mb()
+    return {
+        'backend': backend,
+        'train_seconds': round(train_seconds, 3),
+        'infer_seconds': round(infer_seconds, 3),
+        'peak_rss_mb': round(rss_peak, 1) if rss_peak is not None else None,
+        # 訓練與推論期間相對於載入語料後的記憶體增量
+        'fit_rss_increase_mb': round(rss_peak - rss_before, 1) if None not in (rss_peak, rss_before) else None,
+        'children_peak_rss_mb': round(children_peak, 1) if children_peak is not None else None,
+        # 最大主題作為主要主題的文章比例 (過高表示模型沒有分出主題)
+        'largest_topic_share': round(float(np.bincount(doc_topics.argmax(axis=1)).max() / len(doc_topics)), 4),
+        'topics': [[word for word, _ in model.show_topic(i, topn=TOP_WORDS)] for i in range(num_topics)],
+    }
+
+def run_in_subprocess(backend, corpus_path, num_topics, passes, random_state):
+    """以新的 Python 行程執行 run_backend，記憶體峰值只包含該後端"""
+    command = [sys.executable, os.path.abspath(__file__), '--child', backend, corpus_path,
+               '--num-topics', str(num_topics), '--passes', str(passes), '--seed', str(random_state)]
+    completed = subprocess.run(command, capture_output=True, text=True)
+    if completed.returncode != 0:
+        print(f"錯誤：後端 {backend} 執行失敗:\n{completed.stderr[-2000:]}")
+        return None
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+# --- 4. 主題品質 ---
+
+def topic_quality(topics, dictionary, corpus):
+    """回傳 (u_mass coherence 平均, 主題多樣性 = 所有主題關鍵詞中不重複詞的比例)"""
+    from gensim.models import CoherenceModel
+    coherence = CoherenceModel(topics=topics, corpus=corpus, dictionary=dictionary, coherence=COHERENCE).get_coherence()
+    num_words = sum(len(words) for words in topics)
+    diversity = len({word for words in topics for word in words}) / num_words if num_words else 0.0
+    return coherence, diversity
+
+
+# --- 5. 主程式執行流程 ---
+
+def main():
+    from topic_analysis import NUM_TOPICS, PASSES, RANDOM_STATE
+    parser = argparse.ArgumentParser(description='主題模型後端的耗時、記憶體與主題品質比較')
+    parser.add_argument('--posts', type=int, default=DEFAULT_NUM_POSTS, help='合成文章數')
+    parser.add_argument('--backends', nargs='+', choices=TOPIC_BACKENDS, default=TOPIC_BACKENDS, help='要比較的後端')
+    parser.add_argument('--num-topics', type=int, default=NUM_TOPICS, help='主題數')
+    parser.add_argument('--passes', type=int, default=PASSES, help='LDA 迭代次數')
+    parser.add_argument('--seed', type=int, default=RANDOM_STATE, help='隨機種子')
+    parser.add_argument('--output', help='將結果另存為 CSV')
+    parser.add_argument('--child', nargs=2, metavar=('BACKEND', 'CORPUS'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        result = run_backend(args.child[0], args.child[1], args.num_topics, args.passes, args.seed)
+        print(json.dumps(result, ensure_ascii=False))
+        return
+
+    print(f"=== {args.posts} 篇文章、{args.num_topics} 個主題、{args.passes} 次迭代、種子 {args.seed} ===")
+    corpus_path = prepare_corpus(args.posts)
+    dictionary, corpus = load_corpus_file(corpus_path)
+    print(f"  語料: {len(corpus)} 篇文章、{len(dictionary)} 個詞、{corpus.matrix.nnz} 個非零項")
+
+    rows = []
+    for backend in args.backends:
+        print(f"  > 正在執行 {backend}...")
+        result = run_in_subprocess(backend, corpus_path, args.num_topics, args.passes, args.seed)
+        if result is None:
+            continue
+        result['coherence'], result['diversity'] = topic_quality(result.pop('topics'), dictionary, corpus)
+        rows.append(result)
+
+    import pandas as pd
+    table = pd.DataFrame(rows)
+    print()
+    print(table.to_string(index=False, float_format=lambda x: f"{x:.4f}"))
+    if args.output:
+        table.to_csv(args.output, index=False, encoding='utf-8-sig')
+        print(f"\n結果已儲存至 {args.output}")
+
+
+if __name__ == '__main__':
+    main()
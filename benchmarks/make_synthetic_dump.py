@@ -0,0 +1,146 @@
+"""
+產生 PTT 匯出格式的合成資料，供效能測試使用。
+
+每篇文章包含作者/看板/標題/時間標頭、內文、※ 發信站頁尾與推/噓/→ 推文，
+內文與推文中以固定比例穿插人物別名 (entity.get_entity_map) 與情感詞 (sentiment 詞典)。
+文章依發文時間遞增排列，與爬蟲依序附加的實際檔案相同。
+
+用法: python benchmarks/make_synthetic_dump.py 輸出路徑 [--posts 10000] [--board Gossiping] [--seed 42]
+輸出路徑以 .gz 結尾時寫成 gzip 壓縮檔。
+"""
+import argparse
+import gzip
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from entity import get_entity_map
+from ptt_reader import POST_SEPARATOR
+from sentiment import NEGATIVE_WORDS, POSITIVE_WORDS
+
+# --- 1. 設定 ---
+
+DEFAULT_NUM_POSTS = 10000
+DEFAULT_BOARD = 'Gossiping'
+DEFAULT_SEED = 42
+
+START_TIME = datetime(2025, 7, 19)   # 第一篇文章的時間
+SPAN_DAYS = 14                      # 文章平均分布的天數
+
+ENTITY_RATE = 0.15     # 每個詞位置換成人物別名的機率
+LEXICON_RATE = 0.08    # 每個詞位置換成情感詞的機率
+MEAN_PUSHES = 12       # 每篇文章平均推文數 (指數分布)
+MAX_PUSHES = 300
+MIN_BODY_WORDS, MAX_BODY_WORDS = 20, 200
+
+FILLER_WORDS = [
+    '今天', '大家', '覺得', '真的', '台灣', '政府', '立委', '罷免', '投票', '選舉', '結果', '國會',
+    '颱風', '關稅', '新聞', '記者', '表示', '目前', '已經', '還是', '就是', '因為', '所以', '但是',
+    '如果', '這次', '上次', '民眾', '政黨', '總統', '議員', '開票', '同意票', '不同意', '門檻', '投票率',
+    '八卦', '有沒有', '是不是', '怎麼', '什麼', '可以', '應該', '不會', '知道', '以為', '一直', '其實',
+]
+PUNCTUATION = ['，', '。', ' ', '\n', '！', '？']
+TITLE_PREFIXES = ['[問卦] ', '[問卦] ', '[新聞] ', '[爆卦] ', 'Re: [問卦] ', 'Re: [新聞] ', 'Fw: [新聞] ']
+PUSH_TAGS = ['推', '推', '推', '→', '→', '噓']
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+
+# --- 2. 產生文章 ---
+
+class SyntheticPostGenerator:
+    """
+    以固定種子產生可重現的合成文章。
+
+    :param board: (str) 看板名稱。
+    :param seed: (int) 隨機種子。
+    :param entity_rate: (float) 每個詞位置為人物別名的機率。
+    :param lexicon_rate: (float) 每個詞位置為情感詞的機率。
+    """
+
+    def __init__(self, board=DEFAULT_BOARD, seed=DEFAULT_SEED, entity_rate=ENTITY_RATE, lexicon_rate=LEXICON_RATE):
+        self.board = board
+        self.rng = random.Random(seed)
+        self.entity_rate = entity_rate
+        self.lexicon_rate = lexicon_rate
+        self.aliases = [alias for aliases in get_entity_map().values() for alias in aliases]
+        self.lexicon = sorted(word.strip() for word in POSITIVE_WORDS | NEGATIVE_WORDS if word.strip())
+
+    def _word(self):
+        r = self.rng.random()
+        if r < self.entity_rate:
+            return self.rng.choice(self.aliases)
+        if r < self.entity_rate + self.lexicon_rate:
+            return self.rng.choice(self.lexicon)
+        return self.rng.choice(FILLER_WORDS)
+
+    def _phrase(self, num_words):
+        return ''.join(self._word() + self.rng.choice(PUNCTUATION) for _ in range(num_words)).strip()
+
+    def _pushes(self, post_time):
+        rng = self.rng
+        num_pushes = min(int(rng.expovariate(1 / MEAN_PUSHES)), MAX_PUSHES) if MEAN_PUSHES else 0
+        lines = []
+        for _ in range(num_pushes):
+            push_time = post_time + timedelta(minutes=rng.randint(0, 180))
+            text = ''.join(self._word() for _ in range(rng.randint(1, 5)))
+            lines.append(f"{rng.choice(PUSH_TAGS)} user{rng.randint(1, 50000)}: {text} "
+                         f"{push_time:%m/%d %H:%M}")
+        return '\n'.join(lines)
+
+    def post(self, post_id, post_time):
+        """產生單篇文章原文 (不含分隔線)"""
+        rng = self.rng
+        title = rng.choice(TITLE_PREFIXES) + self._phrase(rng.randint(2, 5)).replace('\n', '')
+        time_line = (f"{WEEKDAYS[post_time.weekday()]} {MONTHS[post_time.month - 1]} "
+                     f"{post_time.day} {post_time:%H:%M:%S} {post_time.year}")
+        body = self._phrase(rng.randint(MIN_BODY_WORDS, MAX_BODY_WORDS))
+        return (
+            f"\n作者 user{rng.randint(1, 50000)} (暱稱)\n"
+            f"看板 {self.board}\n"
+            f"標題 {title}\n"
+            f"時間 {time_line}\n\n"
+            f"{body}\n\n--\n"
+            f"※ 發信站: 批踢踢實業坊(ptt.cc), 來自: 1.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(0, 255)} (臺灣)\n"
+            f"※ 文章網址: https://www.ptt.cc/bbs/{self.board}/M.{int(post_time.timestamp())}.A.{post_id % 4096:03X}.html\n"
+            f"{self._pushes(post_time)}\n"
+        )
+
+    def iter_posts(self, num_posts, start=START_TIME, span_days=SPAN_DAYS):
+        """依時間遞增產生 num_posts 篇文章"""
+        step = timedelta(days=span_days) / max(num_posts, 1)
+        for post_id in range(num_posts):
+            yield self.post(post_id, (start + step * post_id).replace(microsecond=0))
+
+def write_synthetic_dump(path, num_posts, board=DEFAULT_BOARD, seed=DEFAULT_SEED,
+                         entity_rate=ENTITY_RATE, lexicon_rate=LEXICON_RATE):
+    """逐篇寫出合成匯出檔，記憶體用量與文章數無關"""
+    generator = SyntheticPostGenerator(board, seed, entity_rate, lexicon_rate)
+    opener = gzip.open if path.endswith('.gz') else open
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with opener(path, 'wt', encoding='utf-8') as f:
+        for i, post in enumerate(generator.iter_posts(num_posts)):
+            if i:
+                f.write(POST_SEPARATOR)
+            f.write(post)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='產生 PTT 匯出格式的合成資料')
+    parser.add_argument('output', help='輸出檔路徑 (.txt 或 .txt.gz)')
+    parser.add_argument('--posts', type=int, default=DEFAULT_NUM_POSTS, help='文章數')
+    parser.add_argument('--board', default=DEFAULT_BOARD, help='看板名稱')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help='隨機種子')
+    parser.add_argument('--entity-rate', type=float, default=ENTITY_RATE, help='人物別名出現比例')
+    parser.add_argument('--lexicon-rate', type=float, default=LEXICON_RATE, help='情感詞出現比例')
+    args = parser.parse_args()
+
+    write_synthetic_dump(args.output, args.posts, args.board, args.seed, args.entity_rate, args.lexicon_rate)
+    print(f"已產生 {args.posts} 篇文章: {args.output} ({os.path.getsize(args.output) / 1e6:.1f} MB)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+import hashlib
+import json
+import os
+
+from ptt_reader import COMPRESSED_SUFFIXES, iter_posts, iter_posts_from_offset, resolve_dump_path
+
+# --- 1. 設定 ---
+
+# 檢查點格式版本：修改彙總結構時請遞增，舊檢查點會自動捨棄
+CHECKPOINT_VERSION = 1
+
+# 用來偵測檔案被替換或截斷的檔頭長度 (位元組)
+HEAD_HASH_BYTES = 4096
+
+
+def config_fingerprint(*parts):
+    """以分析設定 (詞典、比對模式等) 計算指紋，設定變更時檢查點即失效"""
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(json.dumps(parts, ensure_ascii=False, sort_keys=True, default=sorted).encode('utf-8'))
+    return digest.hexdigest()
+
+def _head_hash(file_path, length):
+    with open(file_path, 'rb') as f:
+        return hashlib.blake2b(f.read(length), digest_size=16).hexdigest()
+
+
+# --- 2. 檢查點 ---
+
+class CheckpointStore:
+    """
+    記錄每個匯出檔已處理到的位元組位移，以及可合併的彙總結果 (JSON)。
+    重新執行時只需讀取檔案新增的尾段，並將結果合併進既有彙總。
+
+    :param path: (str) 檢查點 JSON 檔路徑。
+    :param fingerprint: (str) 分析設定指紋，與檔案中記錄的不同時從頭開始。
+    """
+
+    def __init__(self, path, fingerprint):
+        self.path = path
+        self.fingerprint = fingerprint
+        self._files = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+                if state.get('version') == CHECKPOINT_VERSION and state.get('fingerprint') == fingerprint:
+                    self._files = state.get('files', {})
+                else:
+                    print(f"提示：分析設定或檢查點格式已變更，將重新處理全部資料 ({path})。")
+            except (OSError, ValueError) as e:
+                print(f"警告：檢查點 {path} 讀取失敗，將重新處理全部資料: {e}")
+
+    def aggregates(self, file_path):
+        """回傳該檔案的彙總字典 (可直接修改，save 時一併寫回)"""
+        return self._files.setdefault(file_path, {'offset': 0, 'aggregates': {}})['aggregates']
+
+    def read_new_posts(self, file_path):
+        """
+        產生 (文章原文, 是否已完整) 。已完整的文章處理後即推進位移；
+        最後一篇尚未以分隔線結尾的文章每次都會重新讀取，但不記入檢查點。
+        檔案被截斷或檔頭改變時，捨棄該檔案的位移與彙總並從頭讀取。
+        壓縮檔 (.gz/.zst) 無法依位移接續讀取，每次都完整讀取，所有文章都視為未完整 (不記入檢查點)。
+        彙總字典會就地清空，呼叫端先前由 aggregates 取得的參照仍然有效。
+        """
+        resolved = resolve_dump_path(file_path)
+        state = self._files.setdefault(file_path, {'offset': 0, 'aggregates': {}})
+        if resolved.endswith(COMPRESSED_SUFFIXES):
+            print(f"提示：{file_path} 為壓縮檔，無法增量讀取，將完整讀取且不記入檢查點。")
+            self._reset(state)
+            for post in iter_posts(resolved):
+                yield post, False
+            return
+
+        size = os.path.getsize(resolved)
+        if state['offset'] > 0:
+            head_len = state.get('head_len')
+            if (head_len is None or size < state['offset']
+                    or _head_hash(resolved, head_len) != state.get('head_hash')):
+                print(f"提示：檔案 {file_path} 已被替換或截斷，將重新處理此檔案。")
+                self._reset(state)
+        # 檔頭在推進位移之前記錄，讀取中途中斷時存下的檢查點仍然完整
+        head_len = min(size, HEAD_HASH_BYTES)
+        state['head_len'] = head_len
+        state['head_hash'] = _head_hash(resolved, head_len)
+
+        for post, end_offset in iter_posts_from_offset(resolved, state['offset']):
+            if end_offset is None:
+                yield post, False
+            else:
+                yield post, True
+                state['offset'] = end_offset
+
+    @staticmethod
+    def _reset(state):
+        state['offset'] = 0
+        state['aggregates'].clear()
+        state.pop('head_len', None)
+        state.pop('head_hash', None)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        state = {'version': CHECKPOINT_VERSION, 'fingerprint': self.fingerprint, 'files': self._files}
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
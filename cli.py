@@ -0,0 +1,203 @@
+"""
+PTT 分析的統一命令列入口。每個子命令只載入自己需要的模組：
+人物聲量不會載入 pandas、matplotlib、gensim 或 jieba，情感分析只在繪圖時載入 matplotlib，
+只有主題分析才載入 gensim 與 jieba。
+
+用法:
+  python cli.py entity [--no-checkpoint] [--files a.txt b.txt]
+  python cli.py sentiment [--no-plot] [--resolution 6h] [--no-checkpoint] [--dedup] [--scorer weighted]
+  python cli.py sentiment-compare               # 比較詞典比例分數與加權斷詞分數 (否定詞、程度副詞)
+  python cli.py topic [--stream] [--retrain] [--dedup] [--backend sklearn-online]
+  python cli.py sweep
+  python cli.py network                         # 人物共同提及網路與人物情感
+  python cli.py pushes [--resolution 10min] [--scorer weighted]   # 推文活動曲線與推文情感
+  python cli.py pipeline [--stages entity sentiment topic] [--dedup]
+  python cli.py dedup                           # 只列出近似重複文章，不做其他分析
+  python cli.py live [--port 8726] [--post-clock] [--scorer weighted]   # 即時追蹤新增文章，以 HTTP 提供滾動時間窗的數值 (JSON)
+  python cli.py jieba-dict                      # 預先建立含自定義詞彙的 Jieba 詞典與快取
+"""
+import argparse
+
+# 注意：此檔案頂層只能匯入標準函式庫，各分析模組在子命令的處理函式內才匯入
+
+PIPELINE_STAGES = ['entity', 'sentiment', 'topic']
+SENTIMENT_SCORERS = ['ratio', 'weighted']
+TOPIC_BACKENDS = ['gensim', 'sklearn-batch', 'sklearn-online', 'nmf']   # 與 topic_backends.TOPIC_BACKENDS 相同
+
+
+# --- 1. 子命令 ---
+
+def apply_file_paths(module, args):
+    """以 --files 覆寫模組的 FILE_PATHS"""
+    if args.files:
+        module.FILE_PATHS = list(args.files)
+
+def run_entity(args):
+    import entity
+    apply_file_paths(entity, args)
+    if args.no_checkpoint:
+        entity.USE_CHECKPOINT = False
+    entity.main()
+
+def run_sentiment(args):
+    import sentiment
+    apply_file_paths(sentiment, args)
+    if args.no_checkpoint:
+        sentiment.USE_CHECKPOINT = False
+    if args.no_plot:
+        sentiment.SHOW_PLOT = False
+    if args.resolution:
+        sentiment.TIME_RESOLUTION = args.resolution
+    if args.dedup:
+        sentiment.DEDUP_POSTS = True
+    if args.scorer:
+        sentiment.SENTIMENT_SCORER = args.scorer
+    sentiment.main()
+
+def run_sentiment_compare(args):
+    import lexicon_scorer
+    apply_file_paths(lexicon_scorer, args)
+    if args.lexicon:
+        lexicon_scorer.SENTIMENT_LEXICON_PATH = args.lexicon
+    lexicon_scorer.main()
+
+def run_topic(args):
+    import topic_analysis
+    apply_file_paths(topic_analysis, args)
+    if args.stream:
+        topic_analysis.STREAM_CORPUS = True
+    if args.retrain:
+        topic_analysis.FORCE_RETRAIN = True
+    if args.dedup:
+        topic_analysis.DEDUP_POSTS = True
+    if args.backend:
+        topic_analysis.TOPIC_BACKEND = args.backend
+    topic_analysis.main()
+
+def run_sweep(args):
+    import topic_sweep
+    apply_file_paths(topic_sweep, args)
+    topic_sweep.main()
+
+def run_network(args):
+    import entity_network
+    apply_file_paths(entity_network, args)
+    if args.resolution:
+        entity_network.NETWORK_RESOLUTION = args.resolution
+    entity_network.main()
+
+def run_pushes(args):
+    import push_analysis
+    apply_file_paths(push_analysis, args)
+    if args.resolution:
+        push_analysis.PUSH_RESOLUTION = args.resolution
+    if args.scorer:
+        import sentiment
+        sentiment.SENTIMENT_SCORER = args.scorer
+    push_analysis.main()
+
+def run_pipeline(args):
+    import pipeline
+    apply_file_paths(pipeline, args)
+    if args.scorer:
+        import sentiment
+        sentiment.SENTIMENT_SCORER = args.scorer
+    pipeline.run_pipeline(args.stages, args.dedup or pipeline.DEDUP_POSTS)
+
+def run_dedup(args):
+    import dedup
+    apply_file_paths(dedup, args)
+    if args.threshold is not None:
+        dedup.DEDUP_THRESHOLD = args.threshold
+    dedup.main()
+
+def run_live(args):
+    import live_monitor
+    apply_file_paths(live_monitor, args)
+    if args.host:
+        live_monitor.LIVE_HOST = args.host
+    if args.port is not None:
+        live_monitor.LIVE_PORT = args.port
+    if args.interval is not None:
+        live_monitor.POLL_INTERVAL = args.interval
+    if args.post_clock:
+        live_monitor.USE_POST_CLOCK = True
+    if args.scorer:
+        import sentiment
+        sentiment.SENTIMENT_SCORER = args.scorer
+    live_monitor.main()
+
+def run_jieba_dict(args):
+    import topic_analysis
+    topic_analysis.USE_PREBUILT_JIEBA_DICT = True
+    topic_analysis.setup_jieba()
+    print(f"Jieba 詞典已就緒: {topic_analysis.jieba_dictionary_path(topic_analysis.get_custom_words())}")
+
+
+# --- 2. 參數解析 ---
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='PTT 人物聲量、情感與主題分析')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    def add_command(name, handler, help_text, with_files=True):
+        sub = subparsers.add_parser(name, help=help_text, description=help_text)
+        if with_files:
+            sub.add_argument('--files', nargs='+', help='要分析的匯出檔 (預設為模組內的 FILE_PATHS)')
+        sub.set_defaults(handler=handler)
+        return sub
+
+    sub = add_command('entity', run_entity, '人物聲量分析')
+    sub.add_argument('--no-checkpoint', action='store_true', help='不使用增量檢查點，完整重新計算')
+
+    sub = add_command('sentiment', run_sentiment, '版面情感趨勢分析')
+    sub.add_argument('--no-checkpoint', action='store_true', help='不使用增量檢查點，完整重新計算')
+    sub.add_argument('--no-plot', action='store_true', help='只輸出 CSV，不繪圖 (不載入 matplotlib)')
+    sub.add_argument('--resolution', help="匯總的時間解析度 (pandas 頻率字串，例如 'D'、'6h'、'10min')")
+    sub.add_argument('--dedup', action='store_true', help='先移除跨版面的近似重複文章')
+    sub.add_argument('--scorer', choices=SENTIMENT_SCORERS, help="評分方法 (預設 'ratio'；'weighted' 為加權斷詞分數)")
+
+    sub = add_command('sentiment-compare', run_sentiment_compare, '比較詞典比例分數與加權斷詞分數 (含否定詞與程度副詞)')
+    sub.add_argument('--lexicon', help="加權情感詞典檔 (每行「詞 權重」，預設 'sentiment_lexicon.txt')")
+
+    sub = add_command('topic', run_topic, 'LDA 主題模型分析')
+    sub.add_argument('--stream', action='store_true', help='以磁碟上的串流語料庫訓練 (適合大型語料)')
+    sub.add_argument('--retrain', action='store_true', help='忽略已保存的模型，完整重新訓練')
+    sub.add_argument('--dedup', action='store_true', help='先移除跨版面的近似重複文章')
+    sub.add_argument('--backend', choices=TOPIC_BACKENDS, help="主題模型後端 (預設 'gensim')")
+
+    add_command('sweep', run_sweep, '主題數掃描 (平行訓練多個模型並比較)')
+
+    sub = add_command('network', run_network, '人物共同提及網路與人物情感 (輸出圖形工具可匯入的檔案)')
+    sub.add_argument('--resolution', help="人物情感的時間解析度 (pandas 頻率字串，預設 'D')")
+
+    sub = add_command('pushes', run_pushes, '推文 (推/噓/→) 活動曲線與推文情感')
+    sub.add_argument('--resolution', help="推文曲線的時間解析度 (pandas 頻率字串，預設 'H')")
+    sub.add_argument('--scorer', choices=SENTIMENT_SCORERS, help="推文情感評分方法 (預設 'ratio')")
+
+    sub = add_command('pipeline', run_pipeline, '單次掃描的整合分析 (每個檔案只讀取一次)')
+    sub.add_argument('--stages', nargs='+', choices=PIPELINE_STAGES, default=PIPELINE_STAGES, help='要執行的分析')
+    sub.add_argument('--dedup', action='store_true', help='先移除跨版面的近似重複文章')
+    sub.add_argument('--scorer', choices=SENTIMENT_SCORERS, help="情感評分方法 (預設 'ratio')")
+
+    sub = add_command('dedup', run_dedup, '近似重複文章偵測 (MinHash/LSH)，輸出重複文章清單')
+    sub.add_argument('--threshold', type=float, help='估計 Jaccard 相似度門檻 (預設 0.8)')
+
+    sub = add_command('live', run_live, '即時監看：追蹤匯出檔新增的文章，以本機 HTTP 端點提供 10 分鐘/1 小時/1 天的情感與人物聲量')
+    sub.add_argument('--host', help="HTTP 服務位址 (預設 '127.0.0.1')")
+    sub.add_argument('--port', type=int, help='HTTP 服務埠號 (預設 8726)')
+    sub.add_argument('--interval', type=float, help='檢查檔案的間隔秒數 (預設 2)')
+    sub.add_argument('--post-clock', action='store_true', help='以最新發文時間作為時間窗結尾 (重播過去的匯出檔時使用)')
+    sub.add_argument('--scorer', choices=SENTIMENT_SCORERS, help="情感評分方法 (預設 'ratio')")
+
+    add_command('jieba-dict', run_jieba_dict, '預先建立含自定義詞彙的 Jieba 詞典與前綴詞典快取', with_files=False)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.handler(args)
+
+
+if __name__ == '__main__':
+    main()
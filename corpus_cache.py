@@ -0,0 +1,277 @@
+import hashlib
+import os
+import re
+from datetime import datetime
+
+from ptt_reader import board_name_from_path, iter_posts, resolve_dump_path
+
+# --- 1. 設定 ---
+
+# 快取檔案存放目錄
+CACHE_DIR = '.ptt_cache'
+
+# 解析器版本：修改 parse_post 的輸出時請遞增，舊快取會自動失效
+PARSER_VERSION = 2
+
+# 是否啟用快取 (False 時每次都重新解析原始檔)
+USE_CORPUS_CACHE = True
+
+# 計算檔案雜湊時每次讀取的位元組數
+HASH_CHUNK_SIZE = 1 << 22
+
+CORPUS_COLUMNS = ['board', 'timestamp', 'author', 'title', 'body', 'pushes', 'text']
+
+# 推文表：每列一則推文，post_id 為所屬文章在文章表中的列號
+PUSH_COLUMNS = ['post_id', 'tag', 'user', 'text', 'time']
+PUSH_TAGS = ['推', '噓', '→']
+
+HEADER_FIELDS = {'作者': 'author', '看板': 'header_board', '標題': 'title', '時間': 'time_line'}
+FOOTER_MARK = '※ 發信站: 批踢踢實業坊(ptt.cc)'
+QUOTE_MARK = ': ※ 引述'
+DATE_PATTERN = re.compile(r"\s*([A-Za-z]{3}\s+[A-Za-z]{3}\s+\d{1,2}\s+\d{2}:\d{2}:\d{2}\s+\d{4})")
+PUSH_PATTERN = re.compile(
+    r"([推噓→])\s*([^:\s]*)\s*:\s?(.*?)\s*(?:\d{1,3}(?:\.\d{1,3}){3}\s+)?(\d{1,2}/\d{1,2}\s+\d{1,2}:\d{2})?\s*$"
+)
+
+
+# --- 2. 單篇文章解析 ---
+
+def parse_post(post, with_pushes=False):
+    """
+    以單次逐行掃描 (狀態機：標頭/內文 -> 發信站之後的推文區) 將單篇文章原文解析為欄位記錄，空白文章回傳 None。
+
+    - author, title: 第一個「作者」「標題」標頭行的內容
+    - timestamp: 第一個「時間」標頭行的發文時間，無法解析時為 None
+    - body: 發信站之前、去除作者/看板/標題/時間標頭行與引述的內文
+    - pushes: 發信站之後的推文 (推/噓/→) 行以空白串接，沒有發信站時為 None
+    - text: 去除首尾空白的完整原文
+    - push_records: with_pushes 為 True 時才有，[(標籤, 使用者, 推文內容, 'MM/DD HH:MM' 或 None)]；
+      推文時間沒有年份，由 build_push_table 以發文時間批次補齊
+
+    :param with_pushes: (bool) 是否拆解每則推文的欄位 (只需文章層級欄位時可省略以加快速度)。
+    """
+    text = post.strip()
+    if not text:
+        return None
+
+    headers = {}
+    body_lines = []
+    push_lines = None
+    lines = text.split('\n')
+    last = len(lines) - 1
+    for i, line in enumerate(lines):
+        if push_lines is not None:
+            if line[:1] in '推噓→' and line:
+                push_lines.append(line)
+            continue
+        footer_at = line.find(FOOTER_MARK)
+        if footer_at != -1:
+            # 發信站之前的同一行內容仍屬於內文，之後進入推文區
+            line = line[:footer_at]
+            push_lines = []
+        elif i < last and line[:2] in HEADER_FIELDS:
+            # 標頭行 (不論出現在內文何處) 都不列入內文，第一次出現者記為欄位
+            headers.setdefault(HEADER_FIELDS[line[:2]], line[2:].strip())
+            continue
+        quote_at = line.find(QUOTE_MARK)
+        if quote_at != -1:
+            line = line[:quote_at]
+        body_lines.append(line)
+
+    timestamp = None
+    date_match = DATE_PATTERN.match(headers.get('time_line', ''))
+    if date_match:
+        try:
+            timestamp = datetime.strptime(date_match.group(1), '%a %b %d %H:%M:%S %Y')
+        except ValueError:
+            pass
+
+    record = {
+        'timestamp': timestamp,
+        'author': headers.get('author', ''),
+        'title': headers.get('title', ''),
+        'body': '\n'.join(body_lines).strip(),
+        'pushes': None if push_lines is None else ' '.join(push_lines),
+        'text': text,
+    }
+    if with_pushes:
+        push_records = []
+        for line in push_lines or ():
+            match = PUSH_PATTERN.match(line)
+            if match:
+                push_records.append(match.groups())
+        record['push_records'] = push_records
+    return record
+
+def build_push_table(post_id, tag, user, text, time, post_times):
+    """
+    由逐則收集的欄位建立欄位式推文表：post_id 為 int32，tag 與 user 為 category (整數代碼 + 共用字串表)，
+    text 在有 pyarrow 時使用 Arrow 字串陣列 (單一緩衝區加位移)，time 為 datetime64。
+    前五個參數為與 PUSH_COLUMNS 同名、等長的欄位列表，time 為 'MM/DD HH:MM' 字串。
+
+    :param post_times: (Series) 文章表的發文時間；推文時間以所屬文章的年份補齊，
+                       早於發文超過半年者視為跨年而加一年，無法判斷時為 NaT。
+    """
+    import numpy as np
+    import pandas as pd
+    try:
+        import pyarrow  # noqa: F401
+        text_dtype = 'string[pyarrow]'
+    except ImportError:
+        text_dtype = object
+    post_id = np.asarray(post_id, dtype=np.int32)
+    parent_times = pd.Series(post_times.to_numpy()[post_id])
+    years = parent_times.dt.year.astype('Int64').astype(str)
+    raw_times = pd.Series(time, dtype=object)
+    push_times = pd.to_datetime(years + '/' + raw_times, format='%Y/%m/%d %H:%M', errors='coerce')
+    next_year = (parent_times - push_times) > pd.Timedelta(days=182)
+    if next_year.any():
+        push_times[next_year] = pd.to_datetime(
+            (parent_times[next_year].dt.year + 1).astype(str) + '/' + raw_times[next_year],
+            format='%Y/%m/%d %H:%M', errors='coerce')
+    return pd.DataFrame({
+        'post_id': post_id,
+        'tag': pd.Categorical(tag, categories=PUSH_TAGS),
+        'user': pd.Categorical(user),
+        'text': pd.array(text, dtype=text_dtype) if text_dtype != object else np.asarray(text, dtype=object),
+        'time': push_times.to_numpy(),
+    }, columns=PUSH_COLUMNS)
+
+def parse_dump(file_path, with_pushes=False, columns=None):
+    """
+    逐篇解析整個匯出檔，回傳欄位式 DataFrame；with_pushes 為 True 時回傳 (文章表, 推文表)，
+    兩者在同一次掃描中產生。
+
+    :param columns: (list) 文章表只保留的欄位 (CORPUS_COLUMNS 的子集)，None 時保留全部；
+                    未列出的欄位在解析時即不收集。
+    """
+    import pandas as pd  # 延後載入：只用 parse_post 的增量模式不需要 pandas
+    board = board_name_from_path(file_path)
+    columns = CORPUS_COLUMNS if columns is None else list(columns)
+    post_columns = {name: [] for name in columns}
+    record_columns = [name for name in columns if name != 'board']
+    push_columns = {name: [] for name in PUSH_COLUMNS}
+    timestamps = []  # 推文時間以發文年份補齊，文章表不含 timestamp 時也需要
+    for post in iter_posts(file_path):
+        record = parse_post(post, with_pushes)
+        if record is None:
+            continue
+        if with_pushes:
+            post_id = len(timestamps)
+            for tag, user, push_text, push_time in record['push_records']:
+                push_columns['post_id'].append(post_id)
+                push_columns['tag'].append(tag)
+                push_columns['user'].append(user)
+                push_columns['text'].append(push_text)
+                push_columns['time'].append(push_time)
+        timestamps.append(record['timestamp'])
+        for name in record_columns:
+            post_columns[name].append(record[name])
+    if 'board' in post_columns:
+        post_columns['board'] = [board] * len(timestamps)
+    if 'timestamp' in post_columns:
+        post_columns['timestamp'] = timestamps
+    df = pd.DataFrame(post_columns, columns=columns)
+    post_times = pd.Series(pd.to_datetime(timestamps), dtype='datetime64[ns]')
+    if 'timestamp' in df:
+        df['timestamp'] = post_times.to_numpy()
+    if with_pushes:
+        return df, build_push_table(**push_columns, post_times=post_times)
+    return df
+
+
+# --- 3. 快取讀寫 ---
+
+def file_fingerprint(file_path):
+    """以檔案內容計算雜湊值 (BLAKE2b)，作為快取鍵的一部分"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as f:
+        while True:
+            chunk = f.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def cache_path_for(file_path, fingerprint, kind='posts'):
+    """kind 為 'posts' (文章表) 或 'pushes' (推文表)"""
+    board = board_name_from_path(file_path)
+    suffix = '' if kind == 'posts' else f'.{kind}'
+    return os.path.join(CACHE_DIR, f"{board}-{fingerprint}-v{PARSER_VERSION}{suffix}.parquet")
+
+def _remove_stale_caches(file_path, keep_paths):
+    """刪除同一版面的舊快取 (原始檔或解析器版本已變更)"""
+    board = board_name_from_path(file_path)
+    if not os.path.isdir(CACHE_DIR):
+        return
+    for name in os.listdir(CACHE_DIR):
+        path = os.path.join(CACHE_DIR, name)
+        if name.startswith(f"{board}-") and name.endswith('.parquet') and path not in keep_paths:
+            os.remove(path)
+
+def _write_parquet(df, path):
+    tmp_path = path + '.tmp'
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+def _load_tables(file_path, use_cache, kind, columns=None):
+    """
+    回傳 kind 指定的表 ('posts'、'pushes'，或 'both' 回傳 (文章表, 推文表))。快取未命中時以一次掃描
+    同時解析文章表與推文表並都寫入快取，之後不論先讀哪一個表，另一個表都不必重新解析。
+    columns 為文章表只讀取的欄位 (見 load_corpus)。
+    """
+    file_path = resolve_dump_path(file_path)
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(file_path)
+    if not use_cache:
+        tables = dict(zip(('posts', 'pushes'), parse_dump(file_path, with_pushes=True, columns=columns)
+                          if kind != 'posts' else (parse_dump(file_path, columns=columns), None)))
+        return (tables['posts'], tables['pushes']) if kind == 'both' else tables[kind]
+
+    try:
+        import pyarrow  # noqa: F401  (Parquet 讀寫需要)
+    except ImportError:
+        print("提示：未安裝 pyarrow，將不使用解析快取。")
+        return _load_tables(file_path, False, kind, columns)
+
+    fingerprint = file_fingerprint(file_path)
+    cache_paths = {name: cache_path_for(file_path, fingerprint, name) for name in ('posts', 'pushes')}
+    names = ('posts', 'pushes') if kind == 'both' else (kind,)
+    if all(os.path.exists(cache_paths[name]) for name in names):
+        import pandas as pd
+        tables = [pd.read_parquet(cache_paths[name], columns=columns if name == 'posts' else None) for name in names]
+        return tuple(tables) if kind == 'both' else tables[0]
+
+    tables = dict(zip(('posts', 'pushes'), parse_dump(file_path, with_pushes=True)))
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    # 推文表先寫入，文章表存在即表示兩者皆已完成
+    _write_parquet(tables['pushes'], cache_paths['pushes'])
+    _write_parquet(tables['posts'], cache_paths['posts'])
+    _remove_stale_caches(file_path, set(cache_paths.values()))
+    if columns is not None:
+        tables['posts'] = tables['posts'][list(columns)]
+    return (tables['posts'], tables['pushes']) if kind == 'both' else tables[kind]
+
+def load_corpus(file_path, use_cache=USE_CORPUS_CACHE, columns=None):
+    """
+    載入解析後的文章表。若快取存在且原始檔內容與解析器版本皆未變更，直接讀取 Parquet 快取；
+    否則重新解析並寫入快取 (同時寫入推文表)。找不到原始檔時拋出 FileNotFoundError。
+
+    :param columns: (list) 只讀取的欄位 (CORPUS_COLUMNS 的子集)，None 時讀取全部。text 已包含內文與推文，
+                    只需 text 的分析不必載入 body、pushes，記憶體用量約減半。
+    :return: (DataFrame) 欄位為 board, timestamp, author, title, body, pushes, text (或 columns 指定的欄位)。
+    """
+    return _load_tables(file_path, use_cache, 'posts', columns)
+
+def load_pushes(file_path, use_cache=USE_CORPUS_CACHE):
+    """
+    載入欄位式推文表，快取規則與 load_corpus 相同。找不到原始檔時拋出 FileNotFoundError。
+
+    :return: (DataFrame) 欄位為 post_id (對應 load_corpus 文章表的列號), tag (推/噓/→), user, text,
+             time (以發文年份補齊的推文時間，無法判斷時為 NaT)。
+    """
+    return _load_tables(file_path, use_cache, 'pushes')
+
+def load_corpus_and_pushes(file_path, use_cache=USE_CORPUS_CACHE, columns=None):
+    """同時載入文章表 (columns 同 load_corpus) 與推文表 (只計算一次檔案指紋)，回傳 (文章表, 推文表)"""
+    return _load_tables(file_path, use_cache, 'both', columns)
@@ -0,0 +1,244 @@
+"""
+近似重複文章偵測：以字元 shingle 的 MinHash 簽章加上 LSH 分段 (banding)，找出跨版面的
+Re:/Fw: 轉貼、引述整篇與複製貼上的新聞稿。每篇文章只與同一 LSH 桶中的代表文章比對，
+耗時與文章數大致成線性。
+
+比對文字為內文去除引述行 (': ' 開頭) 與標點空白後的結果，過短的文章不判斷。
+先加入的文章為代表，之後與其相似度 (估計的 Jaccard 係數) 達到門檻的文章標記為重複。
+
+用法: python dedup.py     # 標記 FILE_PATHS 中的重複文章並輸出報告，不修改任何檔案
+"""
+import os
+import re
+
+import numpy as np
+
+from ptt_reader import board_name_from_path
+
+# --- 1. 設定 ---
+
+FILE_PATHS = ['gossiping.txt', 'hatepolitics.txt']
+
+DEDUP_THRESHOLD = 0.8     # 估計 Jaccard 相似度達到此值即視為重複
+DEDUP_NUM_PERM = 128      # MinHash 簽章長度 (越長估計越準，記憶體為每篇 4 × DEDUP_NUM_PERM 位元組)
+DEDUP_SHINGLE_SIZE = 5    # 字元 shingle 長度
+DEDUP_MIN_CHARS = 30      # 正規化後少於此字數的文章不判斷 (短文容易誤判)
+DEDUP_SEED = 42
+
+# 比對所需的文章表欄位 (load_corpus 的 columns；只載入這些欄位時須傳入 board)
+DEDUP_COLUMNS = ['body']
+
+# 'collapse': 移除重複文章，只保留代表；'flag': 保留所有文章，只加上 duplicate_of 欄位
+DEDUP_MODE = 'collapse'
+
+REPORT_FILENAME = os.path.join('dedup_outputs', 'near_duplicates.csv')
+
+QUOTE_LINE_PATTERN = re.compile(r'^: .*$', re.MULTILINE)
+NON_WORD_PATTERN = re.compile(r'[\W_]+')
+
+_HASH_BASE = np.uint64(1000003)
+
+
+# --- 2. MinHash 與 LSH ---
+
+def normalize_for_dedup(body):
+    """去除引述行、標點與空白並轉小寫，回傳用於比對的字串"""
+    return NON_WORD_PATTERN.sub('', QUOTE_LINE_PATTERN.sub('', body)).lower()
+
+def shingle_hashes(text, shingle_size=DEDUP_SHINGLE_SIZE):
+    """以 numpy 計算所有字元 shingle 的 64 位元多項式雜湊 (不重複)"""
+    codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+    num_shingles = len(codes) - shingle_size + 1
+    if num_shingles <= 0:
+        return np.unique(codes)
+    hashes = codes[:num_shingles].copy()
+    for offset in range(1, shingle_size):
+        hashes = hashes * _HASH_BASE + codes[offset:offset + num_shingles]  # uint64 溢位即為 mod 2^64
+    return np.unique(hashes)
+
+def _false_rates(threshold, bands, rows, grid=200):
+    """LSH (bands, rows) 在相似度門檻兩側的誤判與漏判機率積分"""
+    below = np.linspace(0.0, threshold, grid)
+    above = np.linspace(threshold, 1.0, grid)
+    false_positive = np.trapz(1 - (1 - below ** rows) ** bands, below)
+    false_negative = np.trapz((1 - above ** rows) ** bands, above)
+    return false_positive, false_negative
+
+def lsh_params(threshold, num_perm):
+    """選擇使誤判與漏判總和最小的 (分段數, 每段列數)，bands × rows <= num_perm"""
+    best = None
+    for bands in range(1, num_perm + 1):
+        for rows in range(1, num_perm // bands + 1):
+            error = sum(_false_rates(threshold, bands, rows))
+            if best is None or error < best[0]:
+                best = (error, bands, rows)
+    return best[1], best[2]
+
+
+class NearDuplicateIndex:
+    """
+    逐篇加入文章並即時判斷是否與先前加入的文章近似重複。可跨多個版面共用同一個索引。
+
+    :param threshold: (float) 估計 Jaccard 相似度門檻。
+    :param num_perm: (int) MinHash 簽章長度。
+    :param shingle_size: (int) 字元 shingle 長度。
+    :param min_chars: (int) 正規化後的最少字數，較短的文章不判斷也不加入索引。
+    :param seed: (int) 雜湊函數的隨機種子。
+    """
+
+    def __init__(self, threshold=DEDUP_THRESHOLD, num_perm=DEDUP_NUM_PERM, shingle_size=DEDUP_SHINGLE_SIZE,
+                 min_chars=DEDUP_MIN_CHARS, seed=DEDUP_SEED):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.min_chars = min_chars
+        self.seed = seed
+        self.num_bands, self.rows_per_band = lsh_params(threshold, num_perm)
+        rng = np.random.default_rng(seed)
+        max_uint64 = np.iinfo(np.uint64).max
+        # multiply-shift 雜湊族：h(x) = (a·x + b) >> 32，a 為奇數
+        self._mult = (rng.integers(0, max_uint64, size=(num_perm, 1), dtype=np.uint64, endpoint=True)
+                      | np.uint64(1))
+        self._add = rng.integers(0, max_uint64, size=(num_perm, 1), dtype=np.uint64, endpoint=True)
+        self._band_mult = rng.integers(0, max_uint64, size=self.rows_per_band, dtype=np.uint64, endpoint=True)
+        self._buckets = [{} for _ in range(self.num_bands)]
+        self._signatures = []
+        self._keys = []
+        self.num_checked = 0
+        self.num_duplicates = 0
+
+    def signature(self, body):
+        """文章的 MinHash 簽章 (uint32 陣列)；過短的文章回傳 None"""
+        text = normalize_for_dedup(body)
+        if len(text) < self.min_chars:
+            return None
+        values = self._mult * shingle_hashes(text, self.shingle_size)
+        values += self._add
+        # 右移為單調函數，先取最小值再右移與逐一右移後取最小值相同，省去一次完整的陣列運算
+        return (values.min(axis=1) >> np.uint64(32)).astype(np.uint32)
+
+    def _band_keys(self, signature):
+        bands = signature[:self.num_bands * self.rows_per_band].reshape(self.num_bands, self.rows_per_band)
+        return (bands.astype(np.uint64) * self._band_mult).sum(axis=1).tolist()
+
+    def add(self, body, key):
+        """
+        判斷文章是否與索引中的文章重複；不重複時將其加入索引成為代表。
+
+        :param key: (hashable) 呼叫端用來識別文章的鍵 (例如 (版面, 列號))。
+        :return: (tuple) (代表文章的鍵, 估計相似度)；不重複或無法判斷時為 (None, None)。
+        """
+        signature = self.signature(body)
+        if signature is None:
+            return None, None
+        self.num_checked += 1
+        band_keys = self._band_keys(signature)
+        checked = set()
+        for bucket, band_key in zip(self._buckets, band_keys):
+            entry = bucket.get(band_key)
+            if entry is None or entry in checked:
+                continue
+            checked.add(entry)
+            similarity = float(np.count_nonzero(self._signatures[entry] == signature)) / self.num_perm
+            if similarity >= self.threshold:
+                self.num_duplicates += 1
+                return self._keys[entry], similarity
+
+        entry = len(self._signatures)
+        self._signatures.append(signature)
+        self._keys.append(key)
+        for bucket, band_key in zip(self._buckets, band_keys):
+            bucket.setdefault(band_key, entry)
+        return None, None
+
+
+# --- 3. 文章表處理 ---
+
+def mark_near_duplicates(corpus, index, board=None):
+    """
+    依序將文章表的每篇文章加入索引，回傳加上 duplicate_of (代表文章的 '版面:列號'，不重複為 None)
+    與 similarity 欄位的副本。文章鍵為 (版面, 文章表列索引)。
+    """
+    board = board if board is not None else (corpus['board'].iloc[0] if len(corpus) else '')
+    duplicate_of, similarities = [], []
+    for post_index, body in zip(corpus.index, corpus['body']):
+        representative, similarity = index.add(body, (board, post_index))
+        duplicate_of.append(None if representative is None else f"{representative[0]}:{representative[1]}")
+        similarities.append(similarity)
+    marked = corpus.copy()
+    marked['duplicate_of'] = duplicate_of
+    marked['similarity'] = similarities
+    return marked
+
+def drop_near_duplicates(corpus, index, board=None, mode=None):
+    """
+    依 mode (預設 DEDUP_MODE) 處理文章表：'collapse' 回傳移除重複後的文章表 (保留原列索引)，
+    'flag' 回傳加上 duplicate_of 欄位的完整文章表。回傳 (文章表, 重複篇數)。
+    """
+    mode = DEDUP_MODE if mode is None else mode
+    marked = mark_near_duplicates(corpus, index, board)
+    is_duplicate = marked['duplicate_of'].notna()
+    if mode == 'flag':
+        return marked, int(is_duplicate.sum())
+    return corpus[~is_duplicate.to_numpy()], int(is_duplicate.sum())
+
+def report_dedup(removed_counts, index=None):
+    """
+    印出各版面移除的重複文章數。
+
+    :param removed_counts: (dict) 版面 -> (原文章數, 重複篇數)。
+    """
+    print("\n--- 近似重複文章 ---")
+    total_posts = total_removed = 0
+    for board, (num_posts, num_removed) in removed_counts.items():
+        share = num_removed / num_posts * 100 if num_posts else 0.0
+        print(f"  - {board}: {num_removed}/{num_posts} 篇 ({share:.1f}%) 為近似重複")
+        total_posts += num_posts
+        total_removed += num_removed
+    if total_posts:
+        print(f"  - 合計: {total_removed}/{total_posts} 篇 ({total_removed / total_posts * 100:.1f}%)")
+    if index is not None:
+        print(f"  - 相似度門檻 {index.threshold}，LSH {index.num_bands} 段 × {index.rows_per_band} 列，"
+              f"比對 {index.num_checked} 篇 (其餘過短)")
+
+
+# --- 4. 主程式執行流程 ---
+
+def main():
+    import pandas as pd
+    from corpus_cache import load_corpus
+
+    print("--- PTT 近似重複文章偵測 ---")
+    index = NearDuplicateIndex(DEDUP_THRESHOLD)
+    removed_counts = {}
+    flagged = []
+    for path in FILE_PATHS:
+        board = board_name_from_path(path)
+        try:
+            corpus = load_corpus(path, columns=['timestamp', 'title'] + DEDUP_COLUMNS)
+        except FileNotFoundError:
+            print(f"錯誤：找不到檔案 {path}，將跳過此檔案。")
+            continue
+        marked = mark_near_duplicates(corpus, index, board)
+        duplicates = marked[marked['duplicate_of'].notna()]
+        removed_counts[board] = (len(corpus), len(duplicates))
+        flagged.append(pd.DataFrame({
+            'board': board,
+            'post_index': duplicates.index,
+            'timestamp': duplicates['timestamp'].to_numpy(),
+            'title': duplicates['title'].to_numpy(),
+            'duplicate_of': duplicates['duplicate_of'].to_numpy(),
+            'similarity': duplicates['similarity'].to_numpy(),
+        }))
+    if not removed_counts:
+        print("沒有找到任何文章。")
+        return
+    report_dedup(removed_counts, index)
+
+    os.makedirs(os.path.dirname(REPORT_FILENAME), exist_ok=True)
+    pd.concat(flagged, ignore_index=True).to_csv(REPORT_FILENAME, index=False, encoding='utf-8-sig')
+    print(f"\n重複文章清單已儲存至 {REPORT_FILENAME}")
+
+
+if __name__ == '__main__':
+    main()
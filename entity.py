@@ -1,7 +1,13 @@
-import re
-from datetime import datetime
+import os
+from datetime import datetime, timedelta
 from collections import Counter
 
+from aho_corasick import AhoCorasick, LEFTMOST_LONGEST
+from checkpoint import CheckpointStore, config_fingerprint
+from corpus_cache import CACHE_DIR, PARSER_VERSION, load_corpus, parse_post
+from mention_matrix import build_bucketed_mention_matrix, build_mention_matrix
+from run_report import finish_run, stage, start_run
+
 # --- 1. 設定 ---
 
 # 要分析的檔案路徑列表
@@ -11,6 +17,18 @@ FILE_PATHS = ['gossiping.txt', 'hatepolitics.txt']
 # 假設年份為 2025 年，您可以根據資料的實際年份修改
 CUTOFF_TIME = datetime(2025, 7, 26, 16, 30)
 
+# 要比較的所有時間切點；提及矩陣只建立一次，增加切點不需重新掃描文字
+# 例如: [CUTOFF_TIME, datetime(2025, 8, 23, 16, 30)]
+CUTOFF_TIMES = [CUTOFF_TIME]
+
+# 別名比對模式: 'leftmost_longest' (重疊的別名只算最長者，如「高雄歷史哥」不再同時計入「歷史哥」)
+# 或 'overlapping' (每個別名的出現都計入)
+ENTITY_MATCH_MODE = LEFTMOST_LONGEST
+
+# 增量模式：記錄每個檔案已處理到的位置與每分鐘的人物提及彙總，重新執行時只處理新增的文章
+USE_CHECKPOINT = True
+CHECKPOINT_PATH = os.path.join(CACHE_DIR, 'entity_checkpoint.json')
+
 
 # --- 2. 角色與函式定義 ---
 
@@ -54,14 +72,23 @@ def get_entity_map():
         "惡骨大": ["惡骨大", "David Wu"], "陳揮文": ["陳揮文"], "黃智賢": ["黃智賢"], "黃暐瀚": ["黃暐瀚"]
     }
 
+def build_entity_matcher(entity_map):
+    """將實體對照表編譯為 Aho-Corasick 自動機 (別名 -> 所屬實體)，只需建立一次"""
+    alias_to_entities = {}
+    for main_entity, aliases in entity_map.items():
+        for alias in aliases:
+            entities = alias_to_entities.setdefault(alias, [])
+            if main_entity not in entities:
+                entities.append(main_entity)
+    return AhoCorasick(alias_to_entities)
+
 def parse_docs_with_dates(file_path):
     """
     從檔案路徑載入文章，並將每篇文章與其發布日期配對。
     只回傳有成功解析出日期的文章。
     """
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        corpus = load_corpus(file_path, columns=['timestamp', 'text'])
     except FileNotFoundError:
         print(f"錯誤：找不到檔案 {file_path}，將跳過此檔案。")
         return []
@@ -69,120 +96,200 @@ def parse_docs_with_dates(file_path):
         print(f"讀取檔案 {file_path} 時發生錯誤: {e}")
         return []
 
-    posts = content.split('======================================================================')
-    parsed_data = []
-    date_pattern = re.compile(r"時間\s+([A-Za-z]{3}\s+[A-Za-z]{3}\s+\d{1,2}\s+\d{2}:\d{2}:\d{2}\s+\d{4})")
-
-    for post in posts:
-        if not post.strip():
-            continue
-        
-        match = date_pattern.search(post)
-        if match:
-            date_str = match.group(1)
-            try:
-                date_obj = datetime.strptime(date_str, '%a %b %d %H:%M:%S %Y')
-                # 將文章內容與日期物件配對儲存
-                parsed_data.append({'doc': post, 'date': date_obj})
-            except ValueError:
-                # 忽略無法解析的日期
-                pass
+    # 將文章內容與日期物件配對儲存，忽略無法解析的日期
+    corpus = corpus[corpus['timestamp'].notna()]
+    parsed_data = [
+        {'doc': doc, 'date': timestamp.to_pydatetime()}
+        for doc, timestamp in zip(corpus['text'], corpus['timestamp'])
+    ]
     return parsed_data
 
-def report_date_range(dates, analysis_title):
-    """報告所提供日期列表的時間範圍。"""
+def report_date_summary(num_posts, min_date, max_date, analysis_title):
+    """報告文章數與最早、最晚的發文時間。"""
     print(f"\n--- {analysis_title} ---")
-    if not dates:
+    if not num_posts:
         print("  - 未能找到任何有效的日期資訊。")
         return
-    min_date = min(dates)
-    max_date = max(dates)
     date_format_str = "%Y-%m-%d %H:%M:%S"
-    print(f"  - 總共找到 {len(dates)} 篇包含日期的文章。")
+    print(f"  - 總共找到 {num_posts} 篇包含日期的文章。")
     print(f"  - 最早文章日期: {min_date.strftime(date_format_str)}")
     print(f"  - 最晚文章日期: {max_date.strftime(date_format_str)}")
 
-def analyze_entity_volume(documents, entity_map, analysis_title):
-    """分析文章中不同人物的聲量（總提及次數）。"""
+def report_entity_volume(top_entities, num_documents, analysis_title):
+    """印出人物聲量排行。top_entities 為 [(人物, 次數), ...]，已依次數排序。"""
     print(f"\n--- {analysis_title} ---")
-    if not documents:
+    if not num_documents:
         print("  - 此時間區間內沒有文件可供分析。")
         return
 
-    entity_counter = Counter()
-    
-    for doc in documents:
-        for main_entity, aliases in entity_map.items():
-            occurrences_in_doc = 0
-            for alias in aliases:
-                occurrences_in_doc += doc.count(alias)
-            
-            if occurrences_in_doc > 0:
-                entity_counter[main_entity] += occurrences_in_doc
-
-    print(f"  - 在 {len(documents)} 篇文章中進行分析。")
+    print(f"  - 在 {num_documents} 篇文章中進行分析。")
     print(f"  - 以下為聲量最高的前 20 位人物（總提及次數）：")
-    if not entity_counter:
+    if not top_entities:
         print("    - (未找到任何指定人物的提及)")
         return
     
-    for i, (entity, count) in enumerate(entity_counter.most_common(20), 1):
+    for i, (entity, count) in enumerate(top_entities, 1):
         print(f"    {i}. {entity}: {count} 次")
 
-# --- 3. 主程式執行流程 ---
-
-def main():
-    """主程式，執行檔案讀取、日期與人物聲量分析"""
-    print("--- PTT 文章資料分析 ---")
-    print(f"時間切點設定為: {CUTOFF_TIME.strftime('%Y-%m-%d %H:%M:%S')}")
+def analyze_entity_volume(documents, entity_map, analysis_title, matcher=None, match_mode=ENTITY_MATCH_MODE):
+    """分析文章中不同人物的聲量（總提及次數）。"""
+    if matcher is None:
+        matcher = build_entity_matcher(entity_map)
+    entity_counter = Counter()
     
-    entity_map = get_entity_map()
-    all_parsed_data_combined = []
+    # 每篇文章只掃描一次，所有別名同時比對
+    for doc in documents:
+        entity_counter.update(matcher.count_labels(doc, match_mode))
+
+    report_entity_volume(entity_counter.most_common(20), len(documents), analysis_title)
+
+def report_cutoff_volumes(matrix, boards, label):
+    """依 CUTOFF_TIMES 中每個切點，以提及矩陣加總切點前後的人物聲量"""
+    for cutoff in CUTOFF_TIMES:
+        cutoff_str = cutoff.strftime('%Y-%m-%d %H:%M')
+        mask_before = matrix.select(boards=boards, end=cutoff)
+        mask_after = matrix.select(boards=boards, start=cutoff)
+        report_entity_volume(matrix.top_entities(mask_before, 20), matrix.count_posts(mask_before), f"{label}人物聲量分析 (至 {cutoff_str} 為止)")
+        report_entity_volume(matrix.top_entities(mask_after, 20), matrix.count_posts(mask_after), f"{label}人物聲量分析 ({cutoff_str} 以後)")
+
+def entity_checkpoint_fingerprint(entity_map):
+    return config_fingerprint(entity_map, ENTITY_MATCH_MODE, PARSER_VERSION)
+
+def _minute_bucket(timestamp):
+    """向上取整到分鐘，任何整分的時間切點都能以「<= 切點」精確切分"""
+    if timestamp.second or timestamp.microsecond:
+        timestamp += timedelta(minutes=1)
+    return timestamp.replace(second=0, microsecond=0).isoformat(timespec='minutes')
 
+def _add_to_buckets(buckets, bucket, num_posts, mentions, first, last):
+    buckets.setdefault('posts', {})
+    buckets.setdefault('mentions', {})
+    buckets['posts'][bucket] = buckets['posts'].get(bucket, 0) + num_posts
+    if mentions:
+        bucket_mentions = buckets['mentions'].setdefault(bucket, {})
+        for entity, count in mentions.items():
+            bucket_mentions[entity] = bucket_mentions.get(entity, 0) + count
+    if buckets.get('first') is None or first < buckets['first']:
+        buckets['first'] = first
+    if buckets.get('last') is None or last > buckets['last']:
+        buckets['last'] = last
+
+def collect_board_buckets_incremental(file_path, store, matcher):
+    """
+    只讀取檢查點之後新增的文章，併入檢查點中的每分鐘提及彙總後回傳
+    {'posts': {時間桶: 文章數}, 'mentions': {時間桶: {人物: 次數}}, 'first': ..., 'last': ...}。
+    尚未以分隔線結尾的最後一篇文章只計入本次結果，不寫入檢查點。
+    """
+    committed = store.aggregates(file_path)
+    pending = {}
+    try:
+        for post_text, complete in store.read_new_posts(file_path):
+            record = parse_post(post_text)
+            if record is None or record['timestamp'] is None:
+                continue
+            timestamp = record['timestamp']
+            mentions = matcher.count_labels(record['text'], ENTITY_MATCH_MODE)
+            target = committed if complete else pending
+            _add_to_buckets(target, _minute_bucket(timestamp), 1, mentions, timestamp.isoformat(), timestamp.isoformat())
+    except FileNotFoundError:
+        print(f"錯誤：找不到檔案 {file_path}，將跳過此檔案。")
+
+    merged = {'posts': {}, 'mentions': {}, 'first': None, 'last': None}
+    for source in (committed, pending):
+        for bucket, num_posts in source.get('posts', {}).items():
+            _add_to_buckets(merged, bucket, num_posts, source['mentions'].get(bucket), source['first'], source['last'])
+    return merged
+
+def report_all_volumes(matrix, date_summaries, file_paths):
+    """
+    依序報告各看板與所有看板合併後的日期範圍與切點前後人物聲量。
+
+    :param matrix: (MentionMatrix) 版面名稱為檔案路徑的提及矩陣。
+    :param date_summaries: (dict) 檔案路徑 -> (文章數, 最早時間, 最晚時間)。
+    :param file_paths: (list) 要報告的檔案路徑，決定輸出順序。
+    """
     # --- 階段一: 對每個看板進行獨立分析 ---
     print("\n\n******************************")
     print("*** 階段一: 各看板獨立分析 ***")
     print("******************************")
-    for path in FILE_PATHS:
+    for path in file_paths:
         print(f"\n\n========== 開始分析檔案: {path} ==========")
         
-        # 1. 讀取並解析文章與日期
-        documents_with_dates = parse_docs_with_dates(path)
-        
-        # 2. 報告整體日期範圍
-        all_dates_in_file = [item['date'] for item in documents_with_dates]
-        report_date_range(all_dates_in_file, f"檔案 '{path}' 整體日期範圍")
+        # 1. 報告整體日期範圍
+        report_date_summary(*date_summaries[path], f"檔案 '{path}' 整體日期範圍")
         
-        # 3. 根據時間切點篩選文章
-        docs_before = [item['doc'] for item in documents_with_dates if item['date'] <= CUTOFF_TIME]
-        docs_after = [item['doc'] for item in documents_with_dates if item['date'] > CUTOFF_TIME]
-        
-        # 4. 分別進行聲量分析
-        analyze_entity_volume(docs_before, entity_map, f"檔案 '{path}' 人物聲量分析 (至 {CUTOFF_TIME.strftime('%Y-%m-%d %H:%M')} 為止)")
-        analyze_entity_volume(docs_after, entity_map, f"檔案 '{path}' 人物聲量分析 ({CUTOFF_TIME.strftime('%Y-%m-%d %H:%M')} 以後)")
-        
-        # 匯集資料以供後續合併分析
-        all_parsed_data_combined.extend(documents_with_dates)
+        # 2. 根據時間切點篩選文章並分別進行聲量分析
+        report_cutoff_volumes(matrix, path, f"檔案 '{path}' ")
     
     # --- 階段二: 對所有看板進行合併分析 ---
     print("\n\n********************************")
     print("*** 階段二: 所有檔案合併分析 ***")
     print("********************************")
-    if not all_parsed_data_combined:
+    if not matrix.num_posts:
         print("未能從任何檔案載入資料，無法進行合併分析。")
         return
     
     # 1. 報告合併後的整體日期範圍
-    all_dates_combined = [item['date'] for item in all_parsed_data_combined]
-    report_date_range(all_dates_combined, "所有檔案合併後整體日期範圍")
+    summaries = [summary for summary in date_summaries.values() if summary[0]]
+    report_date_summary(
+        sum(summary[0] for summary in summaries),
+        min(summary[1] for summary in summaries),
+        max(summary[2] for summary in summaries),
+        "所有檔案合併後整體日期範圍"
+    )
+
+    # 2. 進行合併後的聲量分析
+    report_cutoff_volumes(matrix, None, "所有檔案合併")
 
-    # 2. 篩選合併後的資料
-    combined_docs_before = [item['doc'] for item in all_parsed_data_combined if item['date'] <= CUTOFF_TIME]
-    combined_docs_after = [item['doc'] for item in all_parsed_data_combined if item['date'] > CUTOFF_TIME]
+# --- 3. 主程式執行流程 ---
+
+def main():
+    """主程式，執行檔案讀取、日期與人物聲量分析"""
+    print("--- PTT 文章資料分析 ---")
+    start_run('entity')
+    print(f"時間切點設定為: {', '.join(cutoff.strftime('%Y-%m-%d %H:%M:%S') for cutoff in CUTOFF_TIMES)}")
     
-    # 3. 進行合併後的聲量分析
-    analyze_entity_volume(combined_docs_before, entity_map, f"所有檔案合併人物聲量分析 (至 {CUTOFF_TIME.strftime('%Y-%m-%d %H:%M')} 為止)")
-    analyze_entity_volume(combined_docs_after, entity_map, f"所有檔案合併人物聲量分析 ({CUTOFF_TIME.strftime('%Y-%m-%d %H:%M')} 以後)")
+    entity_map = get_entity_map()
+    entity_matcher = build_entity_matcher(entity_map)
+
+    # 讀取並解析所有檔案，只掃描一次文字建立「文章 × 人物」提及矩陣
+    # date_summaries: {檔案: (文章數, 最早時間, 最晚時間)}
+    if USE_CHECKPOINT:
+        store = CheckpointStore(CHECKPOINT_PATH, entity_checkpoint_fingerprint(entity_map))
+        board_buckets = {}
+        for path in FILE_PATHS:
+            with stage('scan_incremental', board=path) as record:
+                board_buckets[path] = collect_board_buckets_incremental(path, store, entity_matcher)
+                record.items = sum(board_buckets[path]['posts'].values())
+        with stage('save_checkpoint'):
+            store.save()
+        with stage('build_matrix') as record:
+            matrix = build_bucketed_mention_matrix(board_buckets, list(entity_map))
+            record.items = matrix.counts.shape[0]
+        date_summaries = {
+            path: (
+                sum(buckets['posts'].values()),
+                datetime.fromisoformat(buckets['first']) if buckets['first'] else None,
+                datetime.fromisoformat(buckets['last']) if buckets['last'] else None
+            )
+            for path, buckets in board_buckets.items()
+        }
+    else:
+        board_docs = {}
+        for path in FILE_PATHS:
+            with stage('parse', board=path) as record:
+                board_docs[path] = parse_docs_with_dates(path)
+                record.items = len(board_docs[path])
+        with stage('build_matrix') as record:
+            matrix = build_mention_matrix(board_docs, entity_matcher, list(entity_map), ENTITY_MATCH_MODE)
+            record.items = matrix.num_posts
+        date_summaries = {}
+        for path, docs in board_docs.items():
+            dates = [item['date'] for item in docs]
+            date_summaries[path] = (len(dates), min(dates), max(dates)) if dates else (0, None, None)
+
+    report_all_volumes(matrix, date_summaries, FILE_PATHS)
+    finish_run()
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,223 @@
+"""
+人物共同提及網路與人物層級情感分析：每個版面只掃描一次，同時建立「文章 × 人物」提及矩陣與每篇文章的情感分數，
+之後以稀疏矩陣乘法一次算出
+  - 人物 × 人物共同提及矩陣 (同一篇文章同時提到兩人的文章數)
+  - 每位人物相關文章的平均情感分數與文章數 (總計，以及依日期 × 版面)
+並輸出 Gephi 等圖形工具可直接匯入的節點/邊 CSV 與 GraphML。
+
+用法: python entity_network.py
+"""
+import os
+import xml.etree.ElementTree as ET
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from entity import build_entity_matcher, get_entity_map
+from mention_matrix import MentionMatrixBuilder
+from pipeline import scan_board
+from ptt_reader import board_name_from_path
+from run_report import finish_run, stage, start_run
+
+# --- 1. 設定 ---
+
+FILE_PATHS = ['gossiping.txt', 'hatepolitics.txt']
+
+# 人物情感的時間解析度 (pandas 頻率字串)
+NETWORK_RESOLUTION = 'D'
+
+# 共同提及少於此文章數的人物組合不輸出為邊 (避免圖形被偶然的共同提及淹沒)
+MIN_EDGE_WEIGHT = 2
+
+OUTPUT_DIR = 'entity_network'
+
+
+# --- 2. 稀疏矩陣計算 ---
+
+def presence_matrix(matrix, mask=None):
+    """文章 × 人物的 0/1 矩陣 (一篇文章提到某人物多次只算一次)，可先以遮罩選取文章"""
+    counts = matrix.counts if mask is None else matrix.counts[np.flatnonzero(mask)]
+    presence = counts.astype(bool).astype(np.int32)
+    presence.eliminate_zeros()
+    return presence.tocsr()
+
+def co_mention_matrix(matrix, mask=None):
+    """
+    人物 × 人物共同提及矩陣 (csr_matrix)，以 Pᵀ·P 一次算出：
+    非對角元素為同時提到兩位人物的文章數，對角元素為提到該人物的文章數。
+    """
+    presence = presence_matrix(matrix, mask)
+    return (presence.T @ presence).tocsr()
+
+def entity_sentiment_summary(matrix, scores, mask=None):
+    """
+    各人物相關文章 (至少提到一次) 的情感統計，以 sᵀ·P 與 1ᵀ·P 兩次乘法算出。
+
+    :param matrix: (MentionMatrix) 每列一篇文章的提及矩陣。
+    :param scores: (ndarray) 與矩陣列對齊的每篇文章情感分數。
+    :return: (DataFrame) 索引為人物，欄位為 posts, mentions, score_sum, mean_score；依文章數排序，不含零篇者。
+    """
+    rows = np.arange(matrix.counts.shape[0]) if mask is None else np.flatnonzero(mask)
+    presence = presence_matrix(matrix, mask)
+    row_scores = np.asarray(scores, dtype=np.float64)[rows]
+    posts = np.asarray(presence.sum(axis=0)).ravel()
+    mentions = np.asarray(matrix.counts[rows].sum(axis=0)).ravel()
+    score_sum = presence.T @ row_scores
+    summary = pd.DataFrame({
+        'posts': posts,
+        'mentions': mentions,
+        'score_sum': score_sum,
+        'mean_score': np.divide(score_sum, posts, out=np.full(len(posts), np.nan), where=posts > 0),
+    }, index=pd.Index(matrix.entity_names, name='entity'))
+    return summary[summary['posts'] > 0].sort_values('posts', ascending=False, kind='stable')
+
+def entity_sentiment_by_period(matrix, scores, freq=NETWORK_RESOLUTION):
+    """
+    依時間 × 版面彙總各人物的情感 (另含合併所有版面的 'combined')。
+    以「(時間桶, 版面) × 文章」指示矩陣 (值為情感分數或 1) 乘上提及矩陣，不必逐篇迴圈，
+    結果保持稀疏，只輸出有文章的 (時間, 版面, 人物) 組合。
+
+    :return: (DataFrame) 欄位為 Date, board, entity, posts, score_sum, mean_score。
+    """
+    columns = ['Date', 'board', 'entity', 'posts', 'score_sum', 'mean_score']
+    num_posts = matrix.counts.shape[0]
+    if num_posts == 0:
+        return pd.DataFrame(columns=columns)
+    presence = presence_matrix(matrix)
+    scores = np.asarray(scores, dtype=np.float64)
+    bucket_codes, bucket_labels = pd.factorize(pd.DatetimeIndex(matrix.timestamps).floor(freq), sort=True)
+    board_codes = matrix.board_codes.astype(np.int64)
+    board_labels = matrix.board_names + ['combined']
+    num_boards = len(matrix.board_names)
+
+    # 每個時間桶有 num_boards + 1 個群組，最後一個是合併所有版面的 'combined'
+    shape = (len(bucket_labels) * (num_boards + 1), num_posts)
+    frames = []
+    for group_codes in (bucket_codes * (num_boards + 1) + board_codes, bucket_codes * (num_boards + 1) + num_boards):
+        indicator = sparse.csr_matrix((np.ones(num_posts), (group_codes, np.arange(num_posts))), shape=shape)
+        weighted = sparse.csr_matrix((scores, (group_codes, np.arange(num_posts))), shape=shape)
+        post_counts = (indicator @ presence).tocoo()
+        score_sums = (weighted @ presence).tocsr()
+        group_ids, entity_ids = post_counts.row, post_counts.col
+        frames.append(pd.DataFrame({
+            'Date': bucket_labels[group_ids // (num_boards + 1)],
+            'board': np.asarray(board_labels, dtype=object)[group_ids % (num_boards + 1)],
+            'entity': np.asarray(matrix.entity_names, dtype=object)[entity_ids],
+            'posts': post_counts.data.astype(np.int64),
+            'score_sum': np.asarray(score_sums[group_ids, entity_ids]).ravel(),
+        }))
+    table = pd.concat(frames, ignore_index=True)
+    table['mean_score'] = table['score_sum'] / table['posts']
+    return table.sort_values(['Date', 'board', 'posts'], ascending=[True, True, False], ignore_index=True)[columns]
+
+
+# --- 3. 輸出 ---
+
+def co_mention_edges(co_mentions, entity_names, min_weight=MIN_EDGE_WEIGHT):
+    """將共同提及矩陣的上三角轉為邊列表 DataFrame (Source, Target, Weight)，依權重排序"""
+    upper = sparse.triu(co_mentions, k=1).tocoo()
+    keep = upper.data >= min_weight
+    names = np.asarray(entity_names, dtype=object)
+    edges = pd.DataFrame({
+        'Source': names[upper.row[keep]],
+        'Target': names[upper.col[keep]],
+        'Weight': upper.data[keep].astype(np.int64),
+    })
+    return edges.sort_values('Weight', ascending=False, ignore_index=True)
+
+def write_graphml(path, nodes, edges):
+    """
+    以標準函式庫寫出 GraphML (Gephi、Cytoscape、networkx 皆可讀取)。
+    nodes 為 entity_sentiment_summary 的結果，edges 為 co_mention_edges 的結果。
+    """
+    ns = 'http://graphml.graphdrawing.org/xmlns'
+    root = ET.Element('graphml', xmlns=ns)
+    node_keys = [('posts', 'int'), ('mentions', 'int'), ('mean_score', 'double')]
+    for name, kind in node_keys:
+        ET.SubElement(root, 'key', id=name, attrib={'for': 'node', 'attr.name': name, 'attr.type': kind})
+    ET.SubElement(root, 'key', id='weight', attrib={'for': 'edge', 'attr.name': 'weight', 'attr.type': 'int'})
+    graph = ET.SubElement(root, 'graph', id='co_mentions', edgedefault='undirected')
+    for entity, row in nodes.iterrows():
+        node = ET.SubElement(graph, 'node', id=entity)
+        for name, kind in node_keys:
+            value = row[name]
+            ET.SubElement(node, 'data', key=name).text = str(int(value) if kind == 'int' else round(float(value), 6))
+    for source, target, weight in edges.itertuples(index=False):
+        edge = ET.SubElement(graph, 'edge', source=source, target=target)
+        ET.SubElement(edge, 'data', key='weight').text = str(int(weight))
+    ET.ElementTree(root).write(path, encoding='utf-8', xml_declaration=True)
+
+def export_network(summary, edges, by_period, output_dir=OUTPUT_DIR):
+    """寫出節點表、邊表、依時間與版面的人物情感表與 GraphML，回傳輸出目錄"""
+    os.makedirs(output_dir, exist_ok=True)
+    nodes = summary.reset_index().rename(columns={'entity': 'Id'})
+    nodes.insert(1, 'Label', nodes['Id'])
+    nodes.to_csv(os.path.join(output_dir, 'nodes.csv'), index=False, encoding='utf-8-sig')
+    edges.to_csv(os.path.join(output_dir, 'edges.csv'), index=False, encoding='utf-8-sig')
+    by_period.to_csv(os.path.join(output_dir, 'entity_sentiment_by_period.csv'), index=False, encoding='utf-8-sig')
+    # 只有被提及過的人物才會成為節點，邊的兩端必定在其中
+    write_graphml(os.path.join(output_dir, 'co_mentions.graphml'), summary, edges)
+    return output_dir
+
+
+# --- 4. 主程式執行流程 ---
+
+def build_network_inputs(file_paths):
+    """
+    每個版面掃描一次，回傳 (MentionMatrix, 與矩陣列對齊的情感分數 ndarray)。
+    """
+    entity_map = get_entity_map()
+    entity_matcher = build_entity_matcher(entity_map)
+    builder = MentionMatrixBuilder(list(entity_map))
+    score_blocks = []
+    for path in file_paths:
+        print(f"  > 正在處理版面: {board_name_from_path(path)}")
+        result = scan_board(path, {'entity', 'sentiment'}, builder, entity_matcher)
+        if result is None:
+            # scan_board 讀取失敗時不會登記版面，矩陣列與分數仍然對齊
+            continue
+        # 'scored' 每列一篇 (不限年份)，與 add_post 加入的文章順序相同
+        score_blocks.append(result['scored']['score_sum'].to_numpy())
+    with stage('build_matrix') as record:
+        matrix = builder.build()
+        record.items = matrix.num_posts
+    # scan_board 以檔案路徑登記版面，輸出時改用版面名稱
+    matrix.board_names = [board_name_from_path(path) for path in matrix.board_names]
+    scores = np.concatenate(score_blocks) if score_blocks else np.zeros(0)
+    return matrix, scores
+
+def main():
+    print("--- PTT 人物共同提及網路與人物情感分析 ---")
+    start_run('entity_network')
+
+    print("\n[步驟 1/3] 正在掃描各版面...")
+    matrix, scores = build_network_inputs(FILE_PATHS)
+    if matrix.num_posts == 0:
+        print("沒有找到任何文章，無法進行分析。")
+        finish_run()
+        return
+
+    print(f"\n[步驟 2/3] 正在計算 {matrix.num_posts} 篇文章的共同提及與人物情感...")
+    with stage('co_mentions') as record:
+        co_mentions = co_mention_matrix(matrix)
+        edges = co_mention_edges(co_mentions, matrix.entity_names)
+        record.items = len(edges)
+    with stage('entity_sentiment') as record:
+        summary = entity_sentiment_summary(matrix, scores)
+        by_period = entity_sentiment_by_period(matrix, scores, NETWORK_RESOLUTION)
+        record.items = len(by_period)
+
+    print("\n--- 人物相關文章的情感 (依文章數排序) ---")
+    print(summary.head(20).round(3).to_string())
+    print(f"\n--- 共同提及最多的人物組合 (至少 {MIN_EDGE_WEIGHT} 篇) ---")
+    print(edges.head(20).to_string(index=False))
+
+    print("\n[步驟 3/3] 正在輸出圖形檔...")
+    output_dir = export_network(summary, edges, by_period)
+    finish_run()
+    print(f"\n節點、邊與人物情感表已儲存至 {output_dir}/ (nodes.csv、edges.csv、entity_sentiment_by_period.csv、co_mentions.graphml)")
+
+
+if __name__ == '__main__':
+    main()
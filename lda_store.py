@@ -0,0 +1,84 @@
+import json
+import os
+import pickle
+
+from gensim import corpora, models
+
+from corpus_cache import CACHE_DIR
+
+# --- 1. 設定 ---
+
+# 模型存檔格式版本：修改存檔內容時請遞增，舊模型會被忽略並重新訓練
+MODEL_STORE_VERSION = 1
+
+MODEL_DIR = os.path.join(CACHE_DIR, 'lda_models')
+
+
+# --- 2. 模型存取 ---
+
+class LdaModelStore:
+    """
+    依來源名稱 (各版面與合併語料) 保存 LDA 模型、其詞典，以及已訓練過的文章雜湊。
+    下次執行時載入既有模型，只需以新文章進行線上更新。
+
+    每個來源對應三類檔案：<key>.dict (Dictionary)、<key>.lda* (LdaMulticore；scikit-learn 後端為 pickle 的
+    <key>.skl) 與 <key>.json (中繼資料)。中繼資料最後寫入，模型寫到一半中斷時不會被誤用。
+
+    :param model_dir: (str) 模型存放目錄。
+    :param fingerprint: (str) 前處理與模型設定指紋，與存檔中記錄的不同時視為沒有既有模型。
+    :param backend: (str) 主題模型後端 (topic_backends.TOPIC_BACKENDS)，與存檔的後端不同時視為沒有既有模型。
+    """
+
+    def __init__(self, model_dir, fingerprint, backend='gensim'):
+        self.model_dir = model_dir
+        self.fingerprint = fingerprint
+        self.backend = backend
+
+    def _paths(self, key):
+        base = os.path.join(self.model_dir, key)
+        return base + '.dict', base + ('.lda' if self.backend == 'gensim' else '.skl'), base + '.json'
+
+    def load(self, key):
+        """
+        載入既有模型，回傳 (詞典, LDA 模型, 已訓練文章雜湊集合)。
+        沒有存檔、設定已變更或讀取失敗時回傳 None。
+        """
+        dict_path, model_path, meta_path = self._paths(key)
+        if not os.path.exists(meta_path):
+            return None
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('version') != MODEL_STORE_VERSION or meta.get('fingerprint') != self.fingerprint:
+                print(f"提示：前處理或模型設定已變更，將重新訓練 {key} 的模型。")
+                return None
+            if meta.get('backend', 'gensim') != self.backend:
+                print(f"提示：主題模型後端已變更為 {self.backend}，將重新訓練 {key} 的模型。")
+                return None
+            dictionary = corpora.Dictionary.load(dict_path)
+            if self.backend == 'gensim':
+                lda_model = models.LdaMulticore.load(model_path)
+            else:
+                with open(model_path, 'rb') as f:
+                    lda_model = pickle.load(f)
+        except (OSError, ValueError, EOFError, pickle.UnpicklingError) as e:
+            print(f"警告：模型 {model_path} 讀取失敗，將重新訓練: {e}")
+            return None
+        return dictionary, lda_model, set(meta['doc_keys'])
+
+    def save(self, key, dictionary, lda_model, doc_keys):
+        """保存詞典、模型與已訓練文章雜湊 (可為集合或列表)"""
+        os.makedirs(self.model_dir, exist_ok=True)
+        dict_path, model_path, meta_path = self._paths(key)
+        dictionary.save(dict_path)
+        if self.backend == 'gensim':
+            lda_model.save(model_path)
+        else:
+            with open(model_path, 'wb') as f:
+                pickle.dump(lda_model, f, protocol=pickle.HIGHEST_PROTOCOL)
+        meta = {'version': MODEL_STORE_VERSION, 'fingerprint': self.fingerprint, 'backend': self.backend,
+                'doc_keys': sorted(doc_keys)}
+        tmp_path = meta_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
@@ -0,0 +1,327 @@
+"""
+以斷詞為基礎的加權情感評分：沿用主題分析的清洗、簡轉繁與 Jieba 詞典 (topic_analysis.clean_text、build_tokenizer)，
+支援加權情感詞典檔，並依前方幾個詞內的否定詞 (「不支持」、「不認同」) 與程度副詞 (「非常支持」) 調整每次出現的權重。
+
+斷詞後每篇文章只保留詞典詞、否定詞、程度副詞與子句分隔 (標點) 的 id 與位置，修飾倍率以陣列運算一次算完，
+整個語料的「文章 × 詞典詞」加權次數矩陣只需建立一次，再與權重向量相乘即得每篇文章的加權總和，
+再除以詞典詞出現次數 (不含修飾倍率與權重) 即為分數：
+
+    分數 = (加權次數矩陣 @ 權重) / 詞典詞出現次數
+
+分母不受倍率與權重影響，「非常支持」(1.8) 的分數高於「支持」(1) 與「有點支持」(0.6)，權重 3 的詞也高於權重 1 的詞；
+分數因此不限於 -1 到 1。詞典權重皆為 ±1 且沒有修飾詞時，分數即為 sentiment.calculate_sentiment_score 的
+(正面詞數 - 負面詞數) / 總詞數 比例分數。
+
+用法: python lexicon_scorer.py     # 以兩種方法為 FILE_PATHS 評分，輸出耗時與差異比較
+"""
+import os
+import re
+import time
+from multiprocessing import Pool
+
+import numpy as np
+from scipy import sparse
+
+from topic_analysis import OPENCC_PROFILE, PREPROCESS_CHUNK_SIZE, PREPROCESS_WORKERS, build_tokenizer, clean_text
+
+# --- 1. 設定 ---
+
+FILE_PATHS = ['gossiping.txt', 'hatepolitics.txt']
+
+# 加權情感詞典檔 (UTF-8，每行「詞 權重」，權重為負表示負面，# 開頭為註解)；
+# 檔案不存在時以 sentiment.POSITIVE_WORDS (+1) 與 NEGATIVE_WORDS (-1) 為詞典
+SENTIMENT_LEXICON_PATH = 'sentiment_lexicon.txt'
+
+# 否定詞：修飾範圍內的情感詞權重乘上 NEGATION_FACTOR (兩個否定詞即負負得正)
+NEGATION_WORDS = {'不', '沒', '沒有', '未', '無法', '不是', '不會', '並非', '毫不', '絕不', '從不', '不再', '別'}
+NEGATION_FACTOR = -1.0
+
+# 程度副詞：修飾範圍內的情感詞權重乘上倍率；小於 1 為減弱，「不太」同時否定並減弱
+INTENSIFIERS = {
+    '很': 1.5, '非常': 1.8, '超': 1.8, '超級': 2.0, '太': 1.5, '十分': 1.5, '相當': 1.4, '特別': 1.4,
+    '極': 1.8, '最': 1.5, '有夠': 1.8, '真的': 1.3, '完全': 1.5,
+    '有點': 0.6, '有些': 0.6, '稍微': 0.5, '不太': -0.5,
+}
+
+# 修飾範圍：情感詞前方幾個詞內的否定詞與程度副詞會生效，不跨越標點 (子句)
+MODIFIER_WINDOW = 3
+
+# 推文行開頭的「推/噓/→ 使用者:」只是格式標記，評分前移除 (否則每則推文的「推」都會被算成正面詞)
+PUSH_PREFIX_PATTERN = re.compile(r'^[推噓→]\s*[^:\s]*\s*:', re.MULTILINE)
+
+# clean_text 將標點與數字換成空白，斷詞後成為子句分隔
+CLAUSE_BREAK = ' '
+
+COMPARISON_FILENAME = os.path.join('sentiment_outputs', 'score_comparison.csv')
+
+# 評分版本：修改分數的計算方式時請遞增，情感分析的檢查點會自動失效
+SCORER_VERSION = 2
+
+
+# --- 2. 詞典 ---
+
+def load_weighted_lexicon(path=None):
+    """
+    讀取加權情感詞典檔，回傳 {詞: 權重}；檔案不存在時以 sentiment 的正負詞集合建立 (權重 +1 / -1)。
+    格式錯誤的行會被略過並顯示警告。
+    """
+    path = SENTIMENT_LEXICON_PATH if path is None else path
+    if path is None or not os.path.exists(path):
+        from sentiment import NEGATIVE_WORDS, POSITIVE_WORDS
+        weights = {word: 1.0 for word in POSITIVE_WORDS}
+        for word in NEGATIVE_WORDS:
+            weights[word] = weights.get(word, 0.0) - 1.0
+        return weights
+
+    weights = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            parts = line.rsplit(None, 1)
+            try:
+                weights[parts[0]] = float(parts[1])
+            except (IndexError, ValueError):
+                print(f"警告：情感詞典 {path} 第 {line_number} 行格式錯誤，已略過: {line}")
+    return weights
+
+
+# --- 3. 加權評分器 ---
+
+class WeightedLexiconScorer:
+    """
+    斷詞後以「文章 × 詞典詞」稀疏矩陣與權重向量相乘計算情感分數。
+
+    :param weights: (dict) 詞 -> 權重 (正面為正、負面為負)，None 時以 load_weighted_lexicon() 讀取。
+    :param negation_words: (set) 否定詞。
+    :param intensifiers: (dict) 程度副詞 -> 倍率。
+    :param window: (int) 修飾範圍的詞數。
+    """
+
+    def __init__(self, weights=None, negation_words=None, intensifiers=None, window=None):
+        from opencc import OpenCC
+        self.cc = OpenCC(OPENCC_PROFILE)
+        raw_weights = load_weighted_lexicon() if weights is None else weights
+        negation_words = NEGATION_WORDS if negation_words is None else negation_words
+        intensifiers = INTENSIFIERS if intensifiers is None else intensifiers
+        self.window = MODIFIER_WINDOW if window is None else window
+        self.config = (raw_weights, sorted(negation_words), intensifiers, self.window, NEGATION_FACTOR, SCORER_VERSION)
+
+        # 詞典詞與原文經過相同的清洗與簡轉繁；清洗後含空白的詞 (多個英文字) 無法以單一詞比對
+        self.weights = {}
+        for word, weight in raw_weights.items():
+            normalized = clean_text(word, self.cc)
+            if normalized and CLAUSE_BREAK not in normalized:
+                self.weights[normalized] = self.weights.get(normalized, 0.0) + weight
+        modifiers = {clean_text(word, self.cc): NEGATION_FACTOR for word in negation_words}
+        modifiers.update({clean_text(word, self.cc): factor for word, factor in intensifiers.items()})
+
+        # 固定的詞 id：0 為子句分隔，之後依序為詞典詞與修飾詞
+        terms = sorted(self.weights)
+        modifier_words = sorted(word for word in modifiers if word not in self.weights)
+        self.tokens = [CLAUSE_BREAK] + terms + modifier_words
+        self.terms = terms
+        self.modifiers = sorted(modifiers)
+        self.token_ids = {token: token_id for token_id, token in enumerate(self.tokens)}
+        self.weight_vector = np.zeros(len(self.tokens), dtype=np.float64)
+        self.weight_vector[1:len(terms) + 1] = [self.weights[term] for term in terms]
+        self.factor_vector = np.ones(len(self.tokens), dtype=np.float64)
+        for word, factor in modifiers.items():
+            if word in self.token_ids:
+                self.factor_vector[self.token_ids[word]] = factor
+        self.tokenizer = None
+
+    def tokenize(self, text):
+        """與主題分析相同的清洗與斷詞，但保留否定詞、單字詞與子句分隔"""
+        if self.tokenizer is None:
+            self.tokenizer = self.build_tokenizer()
+        return self.tokenizer.lcut(clean_text(PUSH_PREFIX_PATTERN.sub(' ', text), self.cc))
+
+    def build_tokenizer(self):
+        """
+        詞典詞與修飾詞加入斷詞詞典，確保「沒毛病」、「不太」等詞不被拆開。
+        修飾詞與後方詞典詞常被 Jieba 的既有長詞吸收：整個組合成詞 (「不合理」、「很爛」)，
+        或修飾詞與詞典詞的前幾個字成詞 (「不可|笑」、「很大|推」)，兩者都以 suggest_freq 調低詞頻，
+        使修飾詞與詞典詞分開。
+        """
+        tokenizer = build_tokenizer(self.tokens[1:])
+        for modifier in self.modifiers:
+            for term in self.terms:
+                tokenizer.suggest_freq((modifier, term), tune=True)
+                for end in range(1, len(term)):
+                    prefix = modifier + term[:end]
+                    # 本身是修飾詞或詞典詞的不拆 (「沒|有」會讓「沒有」失效)
+                    if prefix not in self.token_ids and tokenizer.FREQ.get(prefix):
+                        tokenizer.suggest_freq((modifier, term[:end]), tune=True)
+        return tokenizer
+
+    def encode(self, texts):
+        """
+        斷詞並只保留有固定 id 的詞。
+
+        :return: (tuple) (詞 id int32 陣列, 該詞在原斷詞結果中的位置 int32 陣列, 每篇保留的詞數 int64 陣列)。
+        """
+        token_ids = self.token_ids
+        ids, positions, lengths = [], [], []
+        for text in texts:
+            count = 0
+            for position, word in enumerate(self.tokenize(text)):
+                token_id = token_ids.get(word)
+                if token_id is not None:
+                    ids.append(token_id)
+                    positions.append(position)
+                    count += 1
+            lengths.append(count)
+        return np.asarray(ids, dtype=np.int32), np.asarray(positions, dtype=np.int32), np.asarray(lengths, dtype=np.int64)
+
+    def encode_parallel(self, texts, workers=None, chunk_size=None):
+        """
+        以多行程執行 encode (同 topic_analysis.preprocess_texts_parallel)，回傳 (詞 id, 位置, 位移) CSR 陣列，
+        第 i 篇文章為 [offsets[i], offsets[i + 1])。
+        """
+        workers = PREPROCESS_WORKERS if workers is None else workers
+        chunk_size = PREPROCESS_CHUNK_SIZE if chunk_size is None else chunk_size
+        if workers <= 1 or len(texts) <= chunk_size:
+            blocks = [self.encode(texts)]
+        else:
+            chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+            with Pool(min(workers, len(chunks)), initializer=_init_score_worker, initargs=self.config[:4]) as pool:
+                blocks = list(pool.imap(_encode_chunk, chunks))
+        ids = np.concatenate([block[0] for block in blocks])
+        positions = np.concatenate([block[1] for block in blocks])
+        offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+        np.cumsum(np.concatenate([block[2] for block in blocks]), out=offsets[1:])
+        return ids, positions, offsets
+
+    def occurrence_matrices(self, ids, positions, offsets):
+        """
+        計算每次詞典詞出現的修飾倍率 (前方 window 個詞內、同一子句中的否定詞與程度副詞倍率相乘)，
+        回傳 (文章 × 詞 加權次數 csr_matrix, 每篇文章的詞典詞出現次數 int64 陣列)。
+        """
+        hits = np.flatnonzero(self.weight_vector[ids] != 0)
+        doc_starts = offsets[np.searchsorted(offsets, hits, side='right') - 1]
+        clauses = np.cumsum(ids == 0)   # 子句編號：每遇到一個分隔就加一
+        multipliers = np.ones(len(hits), dtype=np.float64)
+        # 保留的詞至少各佔一個位置，往前 window 個保留詞已涵蓋修飾範圍內的所有修飾詞
+        for lag in range(1, self.window + 1):
+            previous = hits - lag
+            valid = previous >= doc_starts
+            previous = np.where(valid, previous, 0)
+            valid &= (positions[hits] - positions[previous] <= self.window) & (clauses[previous] == clauses[hits])
+            multipliers[valid] *= self.factor_vector[ids[previous[valid]]]
+
+        shape = (len(offsets) - 1, len(self.tokens))
+        indptr = np.searchsorted(hits, offsets)
+        weighted = sparse.csr_matrix((multipliers, ids[hits], indptr), shape=shape)
+        weighted.sum_duplicates()
+        return weighted, np.diff(indptr)
+
+    def score_sums(self, texts):
+        """回傳與 texts 對齊的 (加權分數總和 float64 陣列, 詞典詞出現次數 int64 陣列)"""
+        weighted, hit_counts = self.occurrence_matrices(*self.encode_parallel(texts))
+        return weighted @ self.weight_vector, hit_counts
+
+    def score(self, texts):
+        """每篇文章的情感分數 (float64 陣列，加權總和 / 詞典詞出現次數)，沒有任何詞典詞時為 0"""
+        return normalize_scores(*self.score_sums(texts))
+
+
+def normalize_scores(totals, hit_counts):
+    """加權分數總和除以詞典詞出現次數，沒有出現任何詞典詞的文章為 0"""
+    return np.divide(totals, hit_counts, out=np.zeros_like(totals), where=hit_counts > 0)
+
+
+# 各評分子行程的評分器，由 _init_score_worker 建立一次
+_worker_scorer = None
+
+def _init_score_worker(weights, negation_words, intensifiers, window):
+    global _worker_scorer
+    _worker_scorer = WeightedLexiconScorer(weights, negation_words, intensifiers, window)
+
+def _encode_chunk(texts):
+    return _worker_scorer.encode(texts)
+
+
+# --- 4. 與比例分數比較 ---
+
+def compare_scores(texts, scorer):
+    """
+    以 sentiment.calculate_sentiment_scores (比例分數) 與加權評分器分別評分。
+
+    :return: (tuple) (比例分數陣列, 加權分數陣列, 加權分數總和陣列, {'ratio': 秒數, 'tokenize': 秒數, 'product': 秒數})。
+    """
+    from sentiment import calculate_sentiment_scores
+    timings = {}
+    start = time.perf_counter()
+    ratio_scores = np.asarray(calculate_sentiment_scores(texts), dtype=np.float64)
+    timings['ratio'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    encoded = scorer.encode_parallel(texts)
+    timings['tokenize'] = time.perf_counter() - start
+    start = time.perf_counter()
+    weighted, hit_counts = scorer.occurrence_matrices(*encoded)
+    totals = weighted @ scorer.weight_vector
+    weighted_scores = normalize_scores(totals, hit_counts)
+    timings['product'] = time.perf_counter() - start
+    return ratio_scores, weighted_scores, totals, timings
+
+def report_comparison(board, ratio_scores, weighted_scores, timings):
+    """印出單一版面兩種分數的耗時、平均、相關係數與正負號一致的比例"""
+    num_posts = len(ratio_scores)
+    print(f"\n--- {board} ({num_posts} 篇) ---")
+    print(f"  - 比例分數: 耗時 {timings['ratio']:.2f} 秒，平均 {ratio_scores.mean():.4f}")
+    print(f"  - 加權分數: 斷詞 {timings['tokenize']:.2f} 秒 + 矩陣評分 {timings['product']:.3f} 秒，"
+          f"平均 {weighted_scores.mean():.4f}")
+    if num_posts > 1 and ratio_scores.std() > 0 and weighted_scores.std() > 0:
+        print(f"  - 相關係數: {np.corrcoef(ratio_scores, weighted_scores)[0, 1]:.4f}")
+    same_sign = np.sign(ratio_scores) == np.sign(weighted_scores)
+    print(f"  - 正負號一致: {same_sign.mean() * 100:.1f}% (不一致 {int((~same_sign).sum())} 篇)")
+
+
+# --- 5. 主程式執行流程 ---
+
+def main():
+    import pandas as pd
+    from corpus_cache import load_corpus
+    from ptt_reader import board_name_from_path
+
+    print("--- PTT 情感評分比較：比例分數 vs. 加權斷詞分數 ---")
+    if SENTIMENT_LEXICON_PATH and os.path.exists(SENTIMENT_LEXICON_PATH):
+        print(f"加權詞典: {SENTIMENT_LEXICON_PATH}")
+    else:
+        print(f"提示：找不到加權詞典 {SENTIMENT_LEXICON_PATH}，以 sentiment.py 的正負詞典 (權重 ±1) 評分。")
+    scorer = WeightedLexiconScorer()
+    frames = []
+    for path in FILE_PATHS:
+        board = board_name_from_path(path)
+        try:
+            corpus = load_corpus(path, columns=['timestamp', 'title', 'text'])
+        except FileNotFoundError:
+            print(f"錯誤：找不到檔案 {path}，將跳過此檔案。")
+            continue
+        corpus = corpus[corpus['timestamp'].notna()]
+        if corpus.empty:
+            continue
+        ratio_scores, weighted_scores, weighted_sums, timings = compare_scores(corpus['text'].tolist(), scorer)
+        report_comparison(board, ratio_scores, weighted_scores, timings)
+        frames.append(pd.DataFrame({
+            'board': board,
+            'timestamp': corpus['timestamp'].to_numpy(),
+            'title': corpus['title'].to_numpy(),
+            'ratio_score': ratio_scores,
+            'weighted_score': weighted_scores,
+            'weighted_sum': weighted_sums,
+        }))
+    if not frames:
+        print("沒有找到任何文章。")
+        return
+
+    os.makedirs(os.path.dirname(COMPARISON_FILENAME), exist_ok=True)
+    pd.concat(frames, ignore_index=True).to_csv(COMPARISON_FILENAME, index=False, encoding='utf-8-sig')
+    print(f"\n每篇文章的兩種分數已儲存至 {COMPARISON_FILENAME}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,453 @@
+"""
+選舉夜即時監看：持續追蹤爬蟲正在附加的匯出檔，只解析新增的文章，以環狀緩衝區維護最近 10 分鐘、1 小時與 1 天的
+各版面情感分數與人物提及次數，並以本機 HTTP 端點提供目前的數值 (JSON)。
+
+啟動時從檔尾往前讀到最長時間窗的起點為止 (匯出檔依發文時間遞增附加)，之後每次只讀取上次位移之後新增的內容，
+不會重新掃描歷史資料。情感分數與人物提及的計算方式與 sentiment.py (依 SENTIMENT_SCORER)、entity.py 相同。
+
+用法:
+  python live_monitor.py                         # 監看 FILE_PATHS，於 http://127.0.0.1:8726/ 提供結果
+  curl http://127.0.0.1:8726/                    # 所有時間窗
+  curl http://127.0.0.1:8726/?window=10min       # 單一時間窗
+"""
+import asyncio
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from corpus_cache import parse_post
+from entity import ENTITY_MATCH_MODE, build_entity_matcher, get_entity_map
+from ptt_reader import (COMPRESSED_SUFFIXES, POST_SEPARATOR, READ_CHUNK_SIZE, board_name_from_path, iter_posts_from_offset,
+                        resolve_dump_path)
+from sentiment import score_texts
+
+# --- 1. 設定 ---
+
+FILE_PATHS = ['gossiping.txt', 'hatepolitics.txt']
+
+# 時間窗: (名稱, 長度秒數, 環狀緩衝區格數)；每格的長度 (長度 / 格數) 即時間窗滑動的解析度，
+# 例如 10 分鐘窗每格 10 秒、1 天窗每格 10 分鐘
+LIVE_WINDOWS = [
+    ('10min', 600, 60),
+    ('1h', 3600, 60),
+    ('1d', 86400, 144),
+]
+
+# 檢查檔案是否有新內容的間隔 (秒)
+POLL_INTERVAL = 2.0
+
+# HTTP 服務位址 (預設只接受本機連線)
+LIVE_HOST = '127.0.0.1'
+LIVE_PORT = 8726
+
+# False: 時間窗結尾為目前系統時間 (監看爬蟲即時寫入的檔案)；
+# True: 時間窗結尾為目前讀到的最新發文時間 (重播過去的匯出檔時使用)
+USE_POST_CLOCK = False
+
+# 啟動時往前讀取的容許誤差 (秒)：匯出檔大致依發文時間排列，但爬蟲補抓的文章可能略微亂序，
+# 遇到早於最長時間窗起點超過此秒數的文章才停止往前讀
+BACKFILL_SLACK_SECONDS = 3600
+
+# 每個時間窗輸出的人物數 (依提及次數排序)
+TOP_ENTITIES = 20
+
+# 等待 HTTP 請求標頭的秒數
+HTTP_TIMEOUT = 5.0
+
+# 發文時間為不含時區的台灣當地時間 (UTC+8)；系統時間也換算到此時區，與發文時間以相同基準換算為秒數，
+# 不受執行環境的時區設定影響
+POST_TIMEZONE = timezone(timedelta(hours=8), 'Asia/Taipei')
+EPOCH = datetime(1970, 1, 1)
+
+
+# --- 2. 環狀緩衝區時間窗 ---
+
+def to_seconds(timestamp):
+    return (timestamp - EPOCH).total_seconds()
+
+def from_seconds(seconds):
+    return EPOCH + timedelta(seconds=seconds)
+
+
+class RollingWindow:
+    """
+    以環狀緩衝區保存的滑動時間窗。共 num_slots 格，每格保存 slot_seconds 秒內各版面的文章數、
+    情感分數總和與人物提及次數；新時間格直接覆寫同一位置已過期的格，記憶體用量與文章數無關。
+
+    :param label: (str) 時間窗名稱 (例如 '10min')。
+    :param seconds: (int) 時間窗長度 (秒)，須為 num_slots 的整數倍。
+    :param num_slots: (int) 格數。
+    :param num_boards: (int) 版面數。
+    :param num_entities: (int) 人物數。
+    """
+
+    def __init__(self, label, seconds, num_slots, num_boards, num_entities):
+        if seconds % num_slots:
+            raise ValueError(f"時間窗 {label} 的長度 {seconds} 秒無法平均分為 {num_slots} 格")
+        self.label = label
+        self.seconds = seconds
+        self.num_slots = num_slots
+        self.slot_seconds = seconds // num_slots
+        self.slot_ids = np.full(num_slots, -1, dtype=np.int64)   # 每個位置目前保存的時間格編號
+        self.posts = np.zeros((num_slots, num_boards), dtype=np.int64)
+        self.score_sums = np.zeros((num_slots, num_boards), dtype=np.float64)
+        self.mentions = np.zeros((num_slots, num_boards, num_entities), dtype=np.int64)
+
+    def add(self, seconds, board, score, entity_counts, sign=1):
+        """
+        將一篇文章計入所屬的時間格；sign 為 -1 時扣除先前計入的同一篇文章。
+
+        :param entity_counts: (list) [(人物 id, 次數)]。
+        """
+        slot = int(seconds // self.slot_seconds)
+        pos = slot % self.num_slots
+        if self.slot_ids[pos] != slot:
+            if self.slot_ids[pos] > slot:
+                return  # 比緩衝區保存的範圍更舊，已不在任何時間窗內
+            self.slot_ids[pos] = slot
+            self.posts[pos] = 0
+            self.score_sums[pos] = 0.0
+            self.mentions[pos] = 0
+        self.posts[pos, board] += sign
+        self.score_sums[pos, board] += sign * score
+        for entity_id, count in entity_counts:
+            self.mentions[pos, board, entity_id] += sign * count
+
+    def clear_board(self, board):
+        """清除某個版面的所有資料 (檔案被截斷或替換時重新載入用)"""
+        self.posts[:, board] = 0
+        self.score_sums[:, board] = 0.0
+        self.mentions[:, board] = 0
+        # 已沒有任何版面資料的格可重新使用，之後較舊的時間格也能寫入
+        self.slot_ids[self.posts.sum(axis=1) == 0] = -1
+
+    def totals(self, now_seconds):
+        """
+        加總結尾為 now_seconds 的時間窗內的所有時間格。
+
+        :return: (tuple) (各版面文章數, 各版面分數總和, 版面 × 人物提及次數)。
+        """
+        now_slot = int(now_seconds // self.slot_seconds)
+        active = (self.slot_ids > now_slot - self.num_slots) & (self.slot_ids <= now_slot)
+        return self.posts[active].sum(axis=0), self.score_sums[active].sum(axis=0), self.mentions[active].sum(axis=0)
+
+
+# --- 3. 增量讀取 ---
+
+def parse_live_post(post, matcher):
+    """解析單篇文章原文，回傳 (發文時間秒數, 文本, {人物: 次數})；空白或沒有發文時間的文章回傳 None"""
+    record = parse_post(post)
+    if record is None or record['timestamp'] is None:
+        return None
+    text = record['text']
+    return to_seconds(record['timestamp']), text, matcher.count_labels(text, ENTITY_MATCH_MODE)
+
+def score_posts(parsed):
+    """以 sentiment.score_texts 整批計算 parse_live_post 結果的情感分數，回傳 [(發文時間秒數, 情感分數, {人物: 次數})]"""
+    if not parsed:
+        return []
+    scores = score_texts([text for _, text, _ in parsed])
+    return [(seconds, float(score), mentions) for (seconds, _, mentions), score in zip(parsed, scores)]
+
+def backfill_offset(file_path, span_seconds, end_seconds=None, slack_seconds=BACKFILL_SLACK_SECONDS,
+                    chunk_size=READ_CHUNK_SIZE):
+    """
+    從檔尾往前讀，找出填滿最長時間窗所需讀取的起始位元組位移。匯出檔依發文時間遞增附加，
+    遇到發文時間早於 (結尾時間 - span_seconds - slack_seconds) 的文章即停止，更早的歷史資料不會被讀取。
+
+    :param span_seconds: (float) 最長時間窗的長度 (秒)。
+    :param end_seconds: (float) 時間窗結尾的秒數；None 時以檔案中最新一篇文章的發文時間為結尾。
+    :return: (int) 起始位移 (某篇文章的開頭，或檔案開頭 0)。
+    """
+    sep = POST_SEPARATOR.encode('ascii')
+    span_seconds += slack_seconds
+    since = None if end_seconds is None else end_seconds - span_seconds
+    with open(file_path, 'rb') as f:
+        position = f.seek(0, os.SEEK_END)
+        tail = b''  # 上一輪尚未切出的開頭片段，與本輪讀入的區塊相接
+        while position > 0:
+            size = min(chunk_size, position)
+            position -= size
+            f.seek(position)
+            buffer = f.read(size) + tail
+            segment_end = len(buffer)
+            idx = buffer.rfind(sep)
+            while idx != -1:
+                record = parse_post(buffer[idx + len(sep):segment_end].decode('utf-8', 'replace'))
+                if record is not None and record['timestamp'] is not None:
+                    seconds = to_seconds(record['timestamp'])
+                    if since is None:
+                        since = seconds - span_seconds
+                    if seconds < since:
+                        # 從這篇文章開始讀：它本身在時間窗之外，計入後也不會出現在任何時間窗的加總中
+                        return position + idx + len(sep)
+                segment_end = idx
+                idx = buffer.rfind(sep, 0, idx)
+            tail = buffer[:segment_end]
+    return 0
+
+def read_new_posts(file_path, offset, matcher):
+    """
+    從位移 offset 讀取新增的文章，連同尾段文章整批計算分數。
+
+    :return: (tuple) (完整文章列表, 新位移, 尾段文章)；尾段文章之後尚無分隔線 (爬蟲可能仍在寫入)，
+             不推進位移，下次讀取時會被重新計算。文章格式同 score_posts，尾段為空白時為 None。
+    """
+    parsed = []
+    pending = None
+    new_offset = offset
+    for post, end_offset in iter_posts_from_offset(file_path, offset):
+        item = parse_live_post(post, matcher)
+        if end_offset is None:
+            pending = item
+            continue
+        new_offset = end_offset
+        if item is not None:
+            parsed.append(item)
+    posts = score_posts(parsed + ([pending] if pending is not None else []))
+    if pending is not None:
+        pending = posts.pop()
+    return posts, new_offset, pending
+
+
+# --- 4. 即時監看 ---
+
+class LiveMonitor:
+    """
+    追蹤多個匯出檔並維護所有時間窗。檔案讀取與解析在執行緒中進行，時間窗只在事件迴圈中更新與讀取。
+
+    :param file_paths: (list) 要監看的匯出檔；壓縮檔無法依位移接續讀取，啟動時即略過。
+    :param use_post_clock: (bool) 是否以最新發文時間作為時間窗結尾 (見 USE_POST_CLOCK)。
+    """
+
+    def __init__(self, file_paths, use_post_clock=False):
+        self.file_paths = []
+        for path in file_paths:
+            if resolve_dump_path(path).endswith(COMPRESSED_SUFFIXES):
+                print(f"提示：{path} 為壓縮檔，無法即時追蹤新增內容，已略過此檔案。")
+                continue
+            self.file_paths.append(path)
+        self.boards = [board_name_from_path(path) for path in self.file_paths]
+        entity_map = get_entity_map()
+        self.entity_names = list(entity_map)
+        self.entity_ids = {name: entity_id for entity_id, name in enumerate(self.entity_names)}
+        self.matcher = build_entity_matcher(entity_map)
+        self.windows = [
+            RollingWindow(label, seconds, num_slots, len(self.boards), len(self.entity_names))
+            for label, seconds, num_slots in LIVE_WINDOWS
+        ]
+        self.span_seconds = max(window.seconds for window in self.windows)
+        self.use_post_clock = use_post_clock
+        # 每個檔案的讀取狀態：位移、上次看到的大小與 inode、尚未完整的尾段文章、已計入的文章數、最新發文時間
+        self.files = [
+            {'offset': None, 'size': None, 'inode': None, 'pending': None, 'posts': 0, 'latest': None, 'missing': False}
+            for _ in self.file_paths
+        ]
+
+    def now_seconds(self):
+        if self.use_post_clock:
+            latest = [state['latest'] for state in self.files if state['latest'] is not None]
+            if latest:
+                return max(latest)
+        return to_seconds(datetime.now(POST_TIMEZONE).replace(tzinfo=None))
+
+    def ingest(self, board, item, sign=1):
+        seconds, score, mentions = item
+        entity_counts = [(self.entity_ids[name], count) for name, count in mentions.items()]
+        for window in self.windows:
+            window.add(seconds, board, score, entity_counts, sign)
+        state = self.files[board]
+        if sign > 0 and (state['latest'] is None or seconds > state['latest']):
+            state['latest'] = seconds
+
+    def read_updates(self, board):
+        """
+        (在執行緒中執行) 讀取檔案自上次之後新增的內容；檔案沒有變化時回傳 None。
+        第一次讀取或檔案被截斷、替換時，從最長時間窗的起點重新載入。
+
+        :return: (tuple) (新的讀取狀態, 完整文章列表, 尾段文章, 是否重新載入)。
+        """
+        state = self.files[board]
+        path = resolve_dump_path(self.file_paths[board])
+        stat = os.stat(path)
+        offset = state['offset']
+        reload = offset is None or stat.st_ino != state['inode'] or stat.st_size < offset
+        if not reload and stat.st_size == state['size']:
+            return None
+        if reload:
+            end_seconds = None if self.use_post_clock else self.now_seconds()
+            offset = backfill_offset(path, self.span_seconds, end_seconds)
+        posts, new_offset, pending = read_new_posts(path, offset, self.matcher)
+        return {'offset': new_offset, 'size': stat.st_size, 'inode': stat.st_ino}, posts, pending, reload
+
+    def apply_updates(self, board, updates):
+        """將 read_updates 的結果計入時間窗：先扣除上次計入的尾段文章，再加入新文章與新的尾段"""
+        new_state, posts, pending, reload = updates
+        state = self.files[board]
+        if reload and state['offset'] is not None:
+            print(f"提示：{self.file_paths[board]} 已被截斷或替換，重新載入最近的文章。")
+            for window in self.windows:
+                window.clear_board(board)
+            state['pending'] = None
+            state['posts'] = 0
+            state['latest'] = None
+        if state['pending'] is not None:
+            self.ingest(board, state['pending'], sign=-1)
+        for item in posts:
+            self.ingest(board, item)
+        if pending is not None:
+            self.ingest(board, pending)
+        state.update(new_state)
+        state['pending'] = pending
+        state['posts'] += len(posts)
+        if posts:
+            print(f"  > {self.boards[board]}: 新增 {len(posts)} 篇文章 (累計 {state['posts']} 篇)")
+
+    async def follow_file(self, board, poll_interval):
+        """持續檢查單一檔案並計入新文章"""
+        loop = asyncio.get_running_loop()
+        state = self.files[board]
+        path = self.file_paths[board]
+        while True:
+            try:
+                updates = await loop.run_in_executor(None, self.read_updates, board)
+            except FileNotFoundError:
+                if not state['missing']:
+                    print(f"錯誤：找不到檔案 {path}，將持續等待檔案建立。")
+                    state['missing'] = True
+            except (OSError, ValueError) as e:
+                print(f"讀取檔案 {path} 時發生錯誤: {e}")
+            else:
+                state['missing'] = False
+                if updates is not None:
+                    self.apply_updates(board, updates)
+            await asyncio.sleep(poll_interval)
+
+    def window_summary(self, window, now_seconds):
+        """單一時間窗的 JSON 內容：各版面與合計的文章數、平均情感分數與人物提及次數"""
+        posts, score_sums, mentions = window.totals(now_seconds)
+
+        def summarize(num_posts, score_sum, entity_counts):
+            top_ids = np.argsort(-entity_counts, kind='stable')[:TOP_ENTITIES]
+            return {
+                'posts': int(num_posts),
+                'mean_score': round(float(score_sum) / int(num_posts), 4) if num_posts else None,
+                'entities': {self.entity_names[i]: int(entity_counts[i]) for i in top_ids if entity_counts[i] > 0},
+            }
+
+        return {
+            'start': from_seconds(now_seconds - window.seconds).isoformat(timespec='seconds'),
+            'end': from_seconds(now_seconds).isoformat(timespec='seconds'),
+            'resolution_seconds': window.slot_seconds,
+            'boards': {
+                board: summarize(posts[i], score_sums[i], mentions[i]) for i, board in enumerate(self.boards)
+            },
+            'combined': summarize(posts.sum(), score_sums.sum(), mentions.sum(axis=0)),
+        }
+
+    def snapshot(self, labels=None):
+        """
+        目前所有 (或指定的) 時間窗的數值。
+
+        :param labels: (list) 要輸出的時間窗名稱，None 時輸出全部。
+        """
+        now_seconds = self.now_seconds()
+        return {
+            'now': from_seconds(now_seconds).isoformat(timespec='seconds'),
+            'clock': 'posts' if self.use_post_clock else 'wall',
+            'windows': {
+                window.label: self.window_summary(window, now_seconds)
+                for window in self.windows if labels is None or window.label in labels
+            },
+            'files': {
+                board: {'path': path, 'offset': state['offset'], 'posts': state['posts']}
+                for board, path, state in zip(self.boards, self.file_paths, self.files)
+            },
+        }
+
+
+# --- 5. HTTP 端點 ---
+
+HTTP_STATUS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed'}
+
+def route_request(monitor, request_line):
+    """依請求行回傳 (狀態碼, JSON 內容)。GET / 或 /stats 回傳時間窗數值，可加上 ?window=10min,1h 篩選"""
+    parts = request_line.decode('latin-1').split()
+    if len(parts) < 2:
+        return 400, {'error': '無法解析的請求'}
+    method, target = parts[0], parts[1]
+    if method != 'GET':
+        return 405, {'error': f"不支援的方法: {method}"}
+    url = urlsplit(target)
+    if url.path == '/health':
+        return 200, {'status': 'ok'}
+    if url.path not in ('/', '/stats'):
+        return 404, {'error': f"找不到路徑: {url.path}"}
+    labels = None
+    query = parse_qs(url.query)
+    if 'window' in query:
+        labels = [label for value in query['window'] for label in value.split(',') if label]
+        known = [window.label for window in monitor.windows]
+        unknown = [label for label in labels if label not in known]
+        if unknown:
+            return 404, {'error': f"未知的時間窗: {', '.join(unknown)}", 'windows': known}
+    return 200, monitor.snapshot(labels)
+
+async def handle_request(monitor, reader, writer):
+    """處理單一 HTTP 連線：讀取請求行與標頭，回傳 JSON 後關閉連線"""
+    try:
+        request_line = await asyncio.wait_for(reader.readline(), HTTP_TIMEOUT)
+        while True:
+            line = await asyncio.wait_for(reader.readline(), HTTP_TIMEOUT)
+            if line in (b'\r\n', b'\n', b''):
+                break
+        status, payload = route_request(monitor, request_line)
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        header = (f"HTTP/1.1 {status} {HTTP_STATUS[status]}\r\n"
+                  "Content-Type: application/json; charset=utf-8\r\n"
+                  f"Content-Length: {len(body)}\r\n"
+                  "Connection: close\r\n\r\n")
+        writer.write(header.encode('ascii') + body)
+        await writer.drain()
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+async def run_monitor(monitor, host, port, poll_interval):
+    """啟動 HTTP 服務與每個檔案的追蹤工作，直到被中斷"""
+    server = await asyncio.start_server(lambda r, w: handle_request(monitor, r, w), host, port)
+    print(f"即時監看已啟動: http://{host}:{port}/ (每 {poll_interval} 秒檢查一次檔案，Ctrl+C 結束)")
+    followers = [asyncio.ensure_future(monitor.follow_file(board, poll_interval)) for board in range(len(monitor.boards))]
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        for follower in followers:
+            follower.cancel()
+
+
+# --- 6. 主程式執行流程 ---
+
+def main():
+    print("--- PTT 即時監看 ---")
+    print(f"監看檔案: {', '.join(FILE_PATHS)}")
+    print(f"時間窗: {', '.join(label for label, _, _ in LIVE_WINDOWS)} "
+          f"({'最新發文時間' if USE_POST_CLOCK else '系統時間'}為結尾)")
+    monitor = LiveMonitor(FILE_PATHS, USE_POST_CLOCK)
+    if not monitor.file_paths:
+        print("錯誤：沒有可監看的未壓縮匯出檔。")
+        return
+    try:
+        asyncio.run(run_monitor(monitor, LIVE_HOST, LIVE_PORT, POLL_INTERVAL))
+    except KeyboardInterrupt:
+        print("\n即時監看已停止。")
+    except OSError as e:
+        print(f"錯誤：無法在 {LIVE_HOST}:{LIVE_PORT} 啟動 HTTP 服務: {e}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+import numpy as np
+from scipy import sparse
+
+
+class MentionMatrix:
+    """
+    文章 × 人物的稀疏提及次數矩陣，並附上與列對齊的發文時間與版面陣列。
+    建立一次後，任意時間切點、滑動視窗、每小時/每日序列或版面組合都只需遮罩與加總，不必重新掃描文字。
+
+    :param counts: (csr_matrix) 形狀為 (文章數, 人物數) 的提及次數。
+    :param timestamps: (ndarray) datetime64[s]，每篇文章的發文時間。
+    :param board_codes: (ndarray) 每篇文章所屬版面在 board_names 中的索引。
+    :param board_names: (list) 版面名稱。
+    :param entity_names: (list) 人物名稱，對應矩陣欄位。
+    :param post_counts: (ndarray) 每列代表的文章數；列為時間桶彙總時使用，None 表示每列一篇。
+    """
+
+    def __init__(self, counts, timestamps, board_codes, board_names, entity_names, post_counts=None):
+        self.counts = counts
+        self.timestamps = timestamps
+        self.board_codes = board_codes
+        self.board_names = list(board_names)
+        self.entity_names = list(entity_names)
+        self.post_counts = post_counts
+
+    @property
+    def num_posts(self):
+        if self.post_counts is not None:
+            return int(self.post_counts.sum())
+        return self.counts.shape[0]
+
+    def count_posts(self, mask):
+        """遮罩範圍內的文章數"""
+        if self.post_counts is not None:
+            return int(self.post_counts[mask].sum())
+        return int(mask.sum())
+
+    def select(self, boards=None, start=None, end=None):
+        """
+        回傳符合條件的文章布林遮罩。時間區間為 (start, end]，與原本以 CUTOFF_TIME 切分
+        「<= 切點」與「> 切點」的規則一致；None 表示不設限。
+        """
+        mask = np.ones(self.counts.shape[0], dtype=bool)
+        if boards is not None:
+            if isinstance(boards, str):
+                boards = [boards]
+            codes = [self.board_names.index(board) for board in boards if board in self.board_names]
+            mask &= np.isin(self.board_codes, codes)
+        if start is not None:
+            mask &= self.timestamps > np.datetime64(start, 's')
+        if end is not None:
+            mask &= self.timestamps <= np.datetime64(end, 's')
+        return mask
+
+    def totals(self, mask=None):
+        """各人物在遮罩範圍內的總提及次數 (ndarray)"""
+        counts = self.counts if mask is None else self.counts[np.flatnonzero(mask)]
+        return np.asarray(counts.sum(axis=0)).ravel()
+
+    def top_entities(self, mask=None, n=20):
+        """提及次數最高的前 n 位人物，回傳 [(人物, 次數), ...]，不含零次者"""
+        totals = self.totals(mask)
+        order = np.argsort(-totals, kind='stable')[:n]
+        return [(self.entity_names[i], int(totals[i])) for i in order if totals[i] > 0]
+
+    def time_series(self, freq='D', mask=None):
+        """
+        依時間解析度 (pandas 頻率字串，例如 'D'、'H'、'10min') 加總提及次數。
+        以「時間桶 × 文章」指示矩陣乘上提及矩陣一次完成，回傳 DataFrame (時間 × 人物)。
+        """
+        import pandas as pd  # 只有時間序列需要 pandas，聲量查詢不必載入
+        rows = np.arange(self.counts.shape[0]) if mask is None else np.flatnonzero(mask)
+        columns = self.entity_names
+        if rows.size == 0:
+            return pd.DataFrame(columns=columns, dtype=np.int64)
+        buckets = pd.DatetimeIndex(self.timestamps[rows]).floor(freq)
+        bucket_codes, bucket_labels = pd.factorize(buckets, sort=True)
+        indicator = sparse.csr_matrix(
+            (np.ones(rows.size, dtype=np.int64), (bucket_codes, np.arange(rows.size))),
+            shape=(len(bucket_labels), rows.size)
+        )
+        series = indicator @ self.counts[rows]
+        return pd.DataFrame(series.toarray(), index=bucket_labels, columns=columns)
+
+
+class MentionMatrixBuilder:
+    """
+    逐篇加入文章的提及次數，最後一次組成 MentionMatrix。供需要在同一個迴圈中同時做其他分析的呼叫端使用。
+
+    :param entity_names: (list) 人物名稱，決定矩陣欄位順序。
+    """
+
+    def __init__(self, entity_names):
+        self.entity_names = list(entity_names)
+        self._entity_index = {name: i for i, name in enumerate(self.entity_names)}
+        self.board_names = []
+        self._row_ids, self._col_ids, self._values = [], [], []
+        self._timestamps, self._board_codes = [], []
+
+    def add_board(self, board):
+        """登記版面並回傳其代碼"""
+        if board not in self.board_names:
+            self.board_names.append(board)
+        return self.board_names.index(board)
+
+    def add_post(self, board_code, timestamp, entity_counts):
+        """加入一篇文章；entity_counts 為 {人物: 次數}"""
+        row = len(self._timestamps)
+        for entity, count in entity_counts.items():
+            self._row_ids.append(row)
+            self._col_ids.append(self._entity_index[entity])
+            self._values.append(count)
+        self._timestamps.append(timestamp)
+        self._board_codes.append(board_code)
+
+    def build(self):
+        counts = sparse.csr_matrix(
+            (np.asarray(self._values, dtype=np.int32),
+             (np.asarray(self._row_ids, dtype=np.int64), np.asarray(self._col_ids, dtype=np.int64))),
+            shape=(len(self._timestamps), len(self.entity_names))
+        )
+        return MentionMatrix(
+            counts,
+            np.asarray(self._timestamps, dtype='datetime64[s]'),
+            np.asarray(self._board_codes, dtype=np.int16),
+            self.board_names,
+            self.entity_names
+        )
+
+
+def build_mention_matrix(board_docs, matcher, entity_names, match_mode):
+    """
+    掃描每篇文章一次，建立 MentionMatrix。
+
+    :param board_docs: (dict) 版面名稱 -> parse_docs_with_dates 的回傳值 ({'doc', 'date'} 列表)。
+    :param matcher: (AhoCorasick) 別名自動機，標籤為人物名稱。
+    :param entity_names: (list) 人物名稱，決定矩陣欄位順序。
+    :param match_mode: (str) 別名比對模式。
+    """
+    builder = MentionMatrixBuilder(entity_names)
+    for board in board_docs:
+        board_code = builder.add_board(board)
+        for item in board_docs[board]:
+            builder.add_post(board_code, item['date'], matcher.count_labels(item['doc'], match_mode))
+    return builder.build()
+
+
+def build_bucketed_mention_matrix(board_buckets, entity_names):
+    """
+    由時間桶彙總建立 MentionMatrix，每列為一個 (版面, 時間桶)。供增量檢查點使用。
+
+    :param board_buckets: (dict) 版面名稱 -> {'posts': {時間桶: 文章數}, 'mentions': {時間桶: {人物: 次數}}}，
+                          時間桶為 ISO 格式字串。
+    :param entity_names: (list) 人物名稱，決定矩陣欄位順序。
+    """
+    entity_index = {name: i for i, name in enumerate(entity_names)}
+    board_names = list(board_buckets)
+    row_ids, col_ids, values = [], [], []
+    timestamps, board_codes, post_counts = [], [], []
+
+    row = 0
+    for board_code, board in enumerate(board_names):
+        buckets = board_buckets[board]
+        for bucket, num_posts in sorted(buckets['posts'].items()):
+            for entity, count in buckets['mentions'].get(bucket, {}).items():
+                if entity in entity_index:
+                    row_ids.append(row)
+                    col_ids.append(entity_index[entity])
+                    values.append(count)
+            timestamps.append(bucket)
+            board_codes.append(board_code)
+            post_counts.append(num_posts)
+            row += 1
+
+    counts = sparse.csr_matrix(
+        (np.asarray(values, dtype=np.int32), (np.asarray(row_ids, dtype=np.int64), np.asarray(col_ids, dtype=np.int64))),
+        shape=(row, len(entity_names))
+    )
+    return MentionMatrix(
+        counts,
+        np.asarray(timestamps, dtype='datetime64[s]'),
+        np.asarray(board_codes, dtype=np.int16),
+        board_names,
+        entity_names,
+        post_counts=np.asarray(post_counts, dtype=np.int64)
+    )
@@ -0,0 +1,185 @@
+"""
+單次掃描的整合分析入口：每個版面的匯出檔只讀取與解析一次，解析後的文章同時交給人物聲量計數
+與情感評分 (整批計算)，並保留主題分析所需的文本，最後依序輸出三種分析結果。
+三種分析使用完全相同的文章集合 (有發文時間的文章)，情感分析的輸出與 sentiment.py 相同只計入 SENTIMENT_YEAR 的文章。
+
+用法:
+  python pipeline.py                              # 執行全部分析
+  python pipeline.py --stages entity sentiment    # 只執行人物聲量與情感分析
+  python pipeline.py --dedup                      # 先移除跨版面的近似重複文章 (轉貼、複製貼上的新聞稿)
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from corpus_cache import load_corpus
+from dedup import DEDUP_COLUMNS, NearDuplicateIndex, drop_near_duplicates, report_dedup
+from entity import ENTITY_MATCH_MODE, build_entity_matcher, get_entity_map, report_all_volumes
+from mention_matrix import MentionMatrixBuilder
+from ptt_reader import board_name_from_path
+from run_report import finish_run, stage, start_run
+from sentiment import OUTPUT_FILENAME, SCORED_COLUMNS, SENTIMENT_YEAR, TIME_RESOLUTION, aggregate_sentiment, score_texts
+
+# topic_analysis (gensim、jieba) 只在執行主題分析時才載入
+
+# --- 1. 設定 ---
+
+FILE_PATHS = ['gossiping.txt', 'hatepolitics.txt']
+
+STAGES = ['entity', 'sentiment', 'topic']
+
+# 是否在分析前移除近似重複文章 (MinHash/LSH，所有版面共用一個索引，先出現的文章保留)
+DEDUP_POSTS = False
+
+
+# --- 2. 單次掃描 ---
+
+def scan_board(path, stages, entity_builder=None, entity_matcher=None, dedup_index=None):
+    """
+    讀取並解析單一版面一次，逐篇計算人物提及 (加入 entity_builder) 與情感分數。
+    dedup_index 不為 None 時，先移除與索引中文章近似重複的文章。
+
+    :return: (dict) {'date_summary': (文章數, 最早, 最晚),
+             'scored': 情感分數 DataFrame (每列一篇，與加入 entity_builder 的文章一一對齊，不限年份) 或 None,
+             'topic': (文本列表, doc_meta) 或 None, 'dedup': (去重前文章數, 重複篇數) 或 None}；
+             找不到檔案時回傳 None。
+    """
+    # 只載入各分析需要的欄位 (text 已包含內文與推文)
+    columns = ['timestamp']
+    if entity_builder is not None or 'sentiment' in stages:
+        columns.append('text')
+    if 'topic' in stages:
+        from topic_analysis import TOPIC_COLUMNS
+        columns += [name for name in TOPIC_COLUMNS if name not in columns]
+    if dedup_index is not None:
+        columns += [name for name in DEDUP_COLUMNS if name not in columns]
+    with stage('parse', board=path) as record:
+        try:
+            corpus = load_corpus(path, columns=columns)
+        except FileNotFoundError:
+            print(f"錯誤：找不到檔案 {path}，將跳過此檔案。")
+            return None
+        except Exception as e:
+            print(f"讀取檔案 {path} 時發生錯誤: {e}")
+            return None
+        corpus = corpus[corpus['timestamp'].notna()]
+        record.items = len(corpus)
+
+    dedup_counts = None
+    if dedup_index is not None:
+        with stage('dedup', board=path, items=len(corpus)):
+            num_posts = len(corpus)
+            corpus, num_removed = drop_near_duplicates(corpus, dedup_index, board_name_from_path(path), mode='collapse')
+            dedup_counts = (num_posts, num_removed)
+
+    timestamps = corpus['timestamp']
+    board_code = entity_builder.add_board(path) if entity_builder is not None else None
+    do_sentiment = 'sentiment' in stages
+    with stage('scan', board=path, items=len(corpus)):
+        if entity_builder is not None:
+            for text, timestamp in zip(corpus['text'], timestamps.dt.to_pydatetime()):
+                entity_builder.add_post(board_code, timestamp, entity_matcher.count_labels(text, ENTITY_MATCH_MODE))
+        # 情感分數整批計算 (依 sentiment.SENTIMENT_SCORER 選擇比例分數或加權評分器)
+        scores = score_texts(corpus['text'].tolist()) if do_sentiment else None
+
+    result = {
+        'date_summary': (len(corpus), timestamps.min().to_pydatetime(), timestamps.max().to_pydatetime())
+                        if len(corpus) else (0, None, None),
+        'scored': None,
+        'topic': None,
+        'dedup': dedup_counts,
+    }
+    if 'topic' in stages:
+        from topic_analysis import topic_documents
+        result['topic'] = topic_documents(corpus)
+    if do_sentiment:
+        result['scored'] = pd.DataFrame({
+            'board': board_name_from_path(path),
+            'timestamp': timestamps.to_numpy(),
+            'score_sum': scores,
+            'count': np.ones(len(scores), dtype=np.int64)
+        }, columns=SCORED_COLUMNS)
+    return result
+
+
+# --- 3. 結果輸出 ---
+
+def report_sentiment(scored_frames, board_names):
+    """
+    以 TIME_RESOLUTION 匯總情感分數並寫出與 sentiment.py 相同格式的 CSV；
+    與 sentiment.py 相同只計入 SENTIMENT_YEAR 的文章。
+    """
+    scored = pd.concat(scored_frames, ignore_index=True) if scored_frames else None
+    if scored is not None:
+        scored = scored[scored['timestamp'].dt.year == SENTIMENT_YEAR]
+    if scored is None or scored.empty:
+        print("沒有找到任何文章，無法進行情感分析。")
+        return
+    with stage('aggregate_sentiment') as record:
+        df, _ = aggregate_sentiment(scored, board_names, TIME_RESOLUTION)
+        record.items = len(df)
+    df.fillna(method='ffill', inplace=True)
+    df.to_csv(OUTPUT_FILENAME, encoding='utf-8-sig')
+    print(f"\n--- 平均情感分數結果 ({TIME_RESOLUTION}) ---")
+    print(df.round(3).to_string())
+    print(f"\n分析結果已儲存至 {OUTPUT_FILENAME}")
+
+
+def run_pipeline(stages, dedup=DEDUP_POSTS):
+    """執行選取的分析 (STAGES 的子集合)；dedup 為 True 時先移除近似重複文章"""
+    stages = set(stages)
+    print(f"--- PTT 整合分析 ({'、'.join(s for s in STAGES if s in stages)}) ---")
+    start_run('pipeline')
+
+    entity_map = entity_builder = entity_matcher = None
+    if 'entity' in stages:
+        entity_map = get_entity_map()
+        entity_matcher = build_entity_matcher(entity_map)
+        entity_builder = MentionMatrixBuilder(list(entity_map))
+
+    # 每個檔案只讀取與解析一次
+    dedup_index = NearDuplicateIndex() if dedup else None
+    board_results = {}
+    for path in FILE_PATHS:
+        print(f"\n[掃描] {path}")
+        result = scan_board(path, stages, entity_builder, entity_matcher, dedup_index)
+        if result is not None:
+            board_results[path] = result
+            print(f"  > {result['date_summary'][0]} 篇文章。")
+    if dedup_index is not None:
+        report_dedup({board_name_from_path(path): result['dedup'] for path, result in board_results.items()},
+                     dedup_index)
+
+    if 'entity' in stages:
+        with stage('build_matrix') as record:
+            matrix = entity_builder.build()
+            record.items = matrix.num_posts
+        date_summaries = {path: result['date_summary'] for path, result in board_results.items()}
+        report_all_volumes(matrix, date_summaries, list(board_results))
+
+    if 'sentiment' in stages:
+        report_sentiment([result['scored'] for result in board_results.values() if len(result['scored'])],
+                         [board_name_from_path(path) for path in FILE_PATHS])
+
+    if 'topic' in stages:
+        from topic_analysis import run_topic_analyses
+        board_documents = [(path, *result['topic']) for path, result in board_results.items()]
+        # 主題分析只需文本，釋放其餘掃描結果
+        board_results.clear()
+        run_topic_analyses(board_documents, len(FILE_PATHS), dedup_index)
+
+    finish_run()
+    print("\n--- 所有分析任務已完成 ---")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='PTT 人物聲量、情感與主題整合分析 (每個檔案只讀取一次)')
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES, help='要執行的分析')
+    parser.add_argument('--dedup', action='store_true', default=DEDUP_POSTS, help='分析前移除近似重複文章')
+    args = parser.parse_args()
+    run_pipeline(args.stages, args.dedup)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+import gzip
+import io
+import os
+
+# --- 1. 設定 ---
+
+# PTT 匯出檔中分隔每篇文章的分隔線
+POST_SEPARATOR = '======================================================================'
+
+# 每次從檔案讀入的字元數 (緩衝區大小)
+READ_CHUNK_SIZE = 1 << 20
+
+# 支援的壓縮副檔名，依序嘗試
+COMPRESSED_SUFFIXES = ('.gz', '.zst')
+
+
+# --- 2. 檔案開啟 ---
+
+def resolve_dump_path(file_path):
+    """
+    若原始路徑不存在，嘗試尋找同名的壓縮檔 (例如 gossiping.txt.gz)。
+    找不到時回傳原路徑，讓呼叫端照常處理 FileNotFoundError。
+    """
+    if os.path.exists(file_path):
+        return file_path
+    for suffix in COMPRESSED_SUFFIXES:
+        candidate = file_path + suffix
+        if os.path.exists(candidate):
+            return candidate
+    return file_path
+
+def board_name_from_path(file_path):
+    """由檔案路徑取得版面名稱，會先去掉壓縮副檔名 (gossiping.txt.gz -> gossiping)"""
+    name = os.path.basename(file_path)
+    for suffix in COMPRESSED_SUFFIXES:
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+            break
+    return os.path.splitext(name)[0]
+
+def open_dump(file_path, encoding='utf-8'):
+    """依副檔名以文字模式開啟匯出檔，支援 .txt、.gz 與 .zst"""
+    file_path = resolve_dump_path(file_path)
+    if file_path.endswith('.gz'):
+        return gzip.open(file_path, 'rt', encoding=encoding)
+    if file_path.endswith('.zst'):
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("讀取 .zst 檔案需要 zstandard 套件，請先執行 pip install zstandard。")
+        raw = open(file_path, 'rb')
+        reader = zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+        return io.TextIOWrapper(reader, encoding=encoding)
+    return open(file_path, 'r', encoding=encoding)
+
+
+# --- 3. 逐篇讀取 ---
+
+def iter_posts(file_path, chunk_size=READ_CHUNK_SIZE):
+    """
+    以緩衝區掃描分隔線，逐篇產生文章原文 (未 strip)。
+    切分結果與 content.split(POST_SEPARATOR) 相同，但記憶體用量只與單篇文章大小有關。
+    """
+    sep_len = len(POST_SEPARATOR)
+    with open_dump(file_path) as f:
+        buffer = ''
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            # 只需從上一個緩衝區尾端附近開始找，避免長文章被重複掃描
+            search_from = max(0, len(buffer) - sep_len + 1)
+            buffer += chunk
+            start = 0
+            idx = buffer.find(POST_SEPARATOR, search_from)
+            while idx != -1:
+                yield buffer[start:idx]
+                start = idx + sep_len
+                idx = buffer.find(POST_SEPARATOR, start)
+            buffer = buffer[start:]
+        yield buffer
+
+def _decode_post(raw, encoding, errors='strict'):
+    # 與文字模式開檔相同，將 \r\n 與 \r 轉為 \n
+    return raw.decode(encoding, errors).replace('\r\n', '\n').replace('\r', '\n')
+
+def iter_posts_from_offset(file_path, offset=0, chunk_size=READ_CHUNK_SIZE, encoding='utf-8'):
+    """
+    從位元組位移 offset 開始逐篇讀取未壓縮的匯出檔，產生 (文章原文, 該篇之後分隔線的結束位移)。
+    最後一段之後尚無分隔線 (爬蟲可能仍在寫入)，其結束位移為 None，呼叫端不應將其記入檢查點。
+    """
+    file_path = resolve_dump_path(file_path)
+    if file_path.endswith(COMPRESSED_SUFFIXES):
+        raise ValueError(f"增量讀取只支援未壓縮的匯出檔: {file_path}")
+    sep = POST_SEPARATOR.encode('ascii')
+    with open(file_path, 'rb') as f:
+        f.seek(offset)
+        buffer = b''
+        buffer_offset = offset  # buffer[0] 在檔案中的位移
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            search_from = max(0, len(buffer) - len(sep) + 1)
+            buffer += chunk
+            start = 0
+            idx = buffer.find(sep, search_from)
+            while idx != -1:
+                yield _decode_post(buffer[start:idx], encoding), buffer_offset + idx + len(sep)
+                start = idx + len(sep)
+                idx = buffer.find(sep, start)
+            buffer = buffer[start:]
+            buffer_offset += start
+        # 尾段可能正被寫入，結尾的多位元組字元可能不完整
+        yield _decode_post(buffer, encoding, 'replace'), None
@@ -0,0 +1,136 @@
+"""
+推文層級分析：以 corpus_cache.load_pushes 的欄位式推文表 (每列一則推/噓/→) 計算
+  - 推文活動曲線：每個時間桶的推、噓、→ 數量與淨推數 (推 - 噓)
+  - 推文情感：每則推文以 sentiment.score_texts (依 SENTIMENT_SCORER) 評分後，依時間桶取平均
+  - 每篇文章的推/噓/→ 數 (以 post_id 一次 bincount，可與文章表直接合併)
+推文表在解析文章時一併產生並快取，這些計算都不必重新讀取原始檔。
+
+用法: python push_analysis.py
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from corpus_cache import PUSH_TAGS, load_corpus_and_pushes
+from ptt_reader import board_name_from_path
+from run_report import finish_run, stage, start_run
+from sentiment import score_texts
+
+# --- 1. 設定 ---
+
+FILE_PATHS = ['gossiping.txt', 'hatepolitics.txt']
+
+# 推文曲線的時間解析度 (pandas 頻率字串)
+PUSH_RESOLUTION = 'H'
+
+OUTPUT_DIR = 'push_outputs'
+
+
+# --- 2. 推文統計 ---
+
+def push_activity(pushes, freq=None):
+    """
+    依時間桶計算推/噓/→ 數量、總數與淨推數 (推 - 噓)。沒有推文時間的推文不計入。
+
+    :param freq: (str) 時間桶 (pandas 頻率字串)，None 時使用 PUSH_RESOLUTION。
+    :return: (DataFrame) 索引為連續的時間桶，欄位為 推, 噓, →, total, net。
+    """
+    freq = PUSH_RESOLUTION if freq is None else freq
+    columns = PUSH_TAGS + ['total', 'net']
+    dated = pushes[pushes['time'].notna()]
+    if dated.empty:
+        return pd.DataFrame(columns=columns)
+    buckets = dated['time'].dt.floor(freq).rename('time')
+    counts = dated.groupby([buckets, dated['tag']], observed=False).size().unstack('tag', fill_value=0)
+    full_index = pd.date_range(buckets.min(), buckets.max(), freq=freq, name='time')
+    activity = counts.reindex(index=full_index, columns=PUSH_TAGS, fill_value=0)
+    activity.columns = list(PUSH_TAGS)
+    activity['total'] = activity[PUSH_TAGS].sum(axis=1)
+    activity['net'] = activity['推'] - activity['噓']
+    return activity
+
+def push_sentiment(pushes, freq=None, scores=None):
+    """
+    依時間桶計算推文情感的平均分數與推文數，並依推文標籤分開計算。
+
+    :param freq: (str) 時間桶 (pandas 頻率字串)，None 時使用 PUSH_RESOLUTION。
+    :param scores: (ndarray) 與推文表對齊的情感分數，None 時以 sentiment.score_texts (依 SENTIMENT_SCORER) 計算。
+    :return: (DataFrame) 索引為時間桶，欄位為 mean_score, count 與各標籤的 mean_score_<標籤>。
+    """
+    freq = PUSH_RESOLUTION if freq is None else freq
+    if scores is None:
+        scores = score_texts(pushes['text'].tolist())
+    frame = pd.DataFrame({'time': pushes['time'].to_numpy(), 'tag': pushes['tag'].to_numpy(), 'score': scores})
+    frame = frame[frame['time'].notna()]
+    if frame.empty:
+        return pd.DataFrame(columns=['mean_score', 'count'])
+    buckets = frame['time'].dt.floor(freq)
+    result = frame.groupby(buckets)['score'].agg(mean_score='mean', count='size')
+    by_tag = frame.groupby([buckets, 'tag'], observed=False)['score'].mean().unstack('tag')
+    for tag in PUSH_TAGS:
+        result[f'mean_score_{tag}'] = by_tag[tag] if tag in by_tag else np.nan
+    return result
+
+def post_push_counts(pushes, num_posts):
+    """
+    每篇文章的推/噓/→ 數，以 (post_id, 標籤代碼) 一次 bincount 算出。
+
+    :param num_posts: (int) 文章表的列數 (load_corpus 的長度)。
+    :return: (DataFrame) 列與文章表對齊，欄位為 推, 噓, →。
+    """
+    post_ids = pushes['post_id'].to_numpy(dtype=np.int64)
+    tag_codes = pushes['tag'].cat.codes.to_numpy(dtype=np.int64)
+    valid = tag_codes >= 0
+    flat = np.bincount(post_ids[valid] * len(PUSH_TAGS) + tag_codes[valid], minlength=num_posts * len(PUSH_TAGS))
+    return pd.DataFrame(flat.reshape(num_posts, len(PUSH_TAGS)), columns=PUSH_TAGS)
+
+
+# --- 3. 主程式執行流程 ---
+
+def analyze_board(path):
+    """計算單一版面的推文曲線與推文情感並輸出 CSV，讀取失敗時回傳 None"""
+    board = board_name_from_path(path)
+    with stage('load_pushes', board=board) as record:
+        try:
+            posts, pushes = load_corpus_and_pushes(path, columns=['timestamp'])
+            num_posts = len(posts)
+        except FileNotFoundError:
+            print(f"錯誤：找不到檔案 {path}，將跳過此檔案。")
+            return None
+        except Exception as e:
+            print(f"讀取檔案 {path} 時發生錯誤: {e}")
+            return None
+        record.items = len(pushes)
+    print(f"\n--- {board}: {num_posts} 篇文章、{len(pushes)} 則推文 ---")
+
+    with stage('push_activity', board=board):
+        activity = push_activity(pushes)
+        per_post = post_push_counts(pushes, num_posts)
+    with stage('push_sentiment', board=board, items=len(pushes)):
+        sentiment = push_sentiment(pushes)
+
+    totals = per_post.sum()
+    print(f"  - 推 {totals['推']} 則、噓 {totals['噓']} 則、→ {totals['→']} 則")
+    if len(per_post):
+        top = per_post.assign(net=per_post['推'] - per_post['噓']).nlargest(5, 'net')
+        print(f"  - 淨推數最高的文章 (文章表列號): {', '.join(f'{i} ({n})' for i, n in top['net'].items())}")
+    if len(activity):
+        peak = activity['total'].idxmax()
+        print(f"  - 推文最多的時段: {peak} ({activity.loc[peak, 'total']} 則)")
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    activity.join(sentiment).to_csv(os.path.join(OUTPUT_DIR, f"push_curve-{board}.csv"), encoding='utf-8-sig')
+    return activity
+
+def main():
+    print("--- PTT 推文活動與推文情感分析 ---")
+    start_run('pushes')
+    for path in FILE_PATHS:
+        analyze_board(path)
+    finish_run()
+    print(f"\n推文曲線已儲存至 {OUTPUT_DIR}/")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+import json
+import os
+import platform
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows 沒有 resource 模組，記憶體欄位記為 None
+    resource = None
+
+# --- 1. 設定 ---
+
+# 是否記錄各階段耗時與記憶體並輸出 JSON 報告 (每個階段只多幾次系統呼叫，可常駐開啟)
+ENABLE_RUN_REPORT = True
+
+REPORT_DIR = 'run_reports'
+
+
+# --- 2. 量測 ---
+
+def peak_rss_mb():
+    """目前行程至今的最高常駐記憶體 (MB)，無法取得時回傳 None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 為單位，macOS 以位元組為單位
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024
+
+def children_cpu_seconds():
+    """已結束子行程 (例如前處理行程池) 的累計 CPU 時間"""
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+class StageRecord:
+    """單一階段的量測結果；items 可在階段內由呼叫端設定 (例如處理的文章數)"""
+
+    def __init__(self, name, board=None, depth=0):
+        self.name = name
+        self.board = board
+        self.depth = depth
+        self.items = None
+        self.started = datetime.now()
+        self.wall_seconds = None
+        self.cpu_seconds = None
+        self.child_cpu_seconds = None
+        self.peak_rss_mb = None
+        self.rss_growth_mb = None
+
+    def as_dict(self):
+        return {
+            'stage': self.name,
+            'board': self.board,
+            'depth': self.depth,
+            'started': self.started.isoformat(timespec='seconds'),
+            'wall_seconds': round(self.wall_seconds, 4),
+            'cpu_seconds': round(self.cpu_seconds, 4),
+            'child_cpu_seconds': round(self.child_cpu_seconds, 4),
+            'peak_rss_mb': None if self.peak_rss_mb is None else round(self.peak_rss_mb, 1),
+            'rss_growth_mb': None if self.rss_growth_mb is None else round(self.rss_growth_mb, 1),
+            'items': self.items,
+        }
+
+
+class RunReport:
+    """
+    記錄一次執行中各階段 (可依版面區分、可巢狀) 的牆鐘時間、CPU 時間、最高記憶體與項目數，
+    結束時寫成 JSON 報告。
+
+    :param name: (str) 執行名稱 (例如 'entity')，用於報告檔名。
+    :param report_dir: (str) 報告輸出目錄。
+    """
+
+    def __init__(self, name, report_dir=REPORT_DIR):
+        self.name = name
+        self.report_dir = report_dir
+        self.started = datetime.now()
+        self.stages = []
+        self._depth = 0
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+        self._child_cpu_start = children_cpu_seconds()
+
+    @contextmanager
+    def stage(self, name, board=None, items=None):
+        record = StageRecord(name, board, self._depth)
+        record.items = items
+        self.stages.append(record)
+        self._depth += 1
+        rss_before = peak_rss_mb()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        child_cpu_start = children_cpu_seconds()
+        try:
+            yield record
+        finally:
+            record.wall_seconds = time.perf_counter() - wall_start
+            record.cpu_seconds = time.process_time() - cpu_start
+            record.child_cpu_seconds = children_cpu_seconds() - child_cpu_start
+            record.peak_rss_mb = peak_rss_mb()
+            if rss_before is not None:
+                record.rss_growth_mb = record.peak_rss_mb - rss_before
+            self._depth -= 1
+
+    def as_dict(self):
+        return {
+            'run': self.name,
+            'started': self.started.isoformat(timespec='seconds'),
+            'wall_seconds': round(time.perf_counter() - self._wall_start, 4),
+            'cpu_seconds': round(time.process_time() - self._cpu_start, 4),
+            'child_cpu_seconds': round(children_cpu_seconds() - self._child_cpu_start, 4),
+            'peak_rss_mb': None if peak_rss_mb() is None else round(peak_rss_mb(), 1),
+            'argv': sys.argv,
+            'python': platform.python_version(),
+            'cpu_count': os.cpu_count(),
+            'stages': [record.as_dict() for record in self.stages],
+        }
+
+    def save(self):
+        """寫出 JSON 報告並回傳檔案路徑"""
+        os.makedirs(self.report_dir, exist_ok=True)
+        path = os.path.join(self.report_dir, f"{self.name}-{self.started:%Y%m%d-%H%M%S}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.as_dict(), f, ensure_ascii=False, indent=2)
+        return path
+
+    def print_summary(self):
+        print(f"\n--- 執行階段統計 ({self.name}) ---")
+        print(f"{'階段':<40} {'秒數':>9} {'CPU秒數':>9} {'最高記憶體MB':>12} {'項目數':>10}")
+        for record in self.stages:
+            label = '  ' * record.depth + record.name + (f" [{record.board}]" if record.board else '')
+            rss = '-' if record.peak_rss_mb is None else f"{record.peak_rss_mb:.1f}"
+            items = '-' if record.items is None else record.items
+            print(f"{label:<40} {record.wall_seconds:>9.3f} {record.cpu_seconds + record.child_cpu_seconds:>9.3f} "
+                  f"{rss:>12} {items:>10}")
+
+
+# --- 3. 模組層級的目前執行 ---
+# 分析函式透過 stage() 記錄，不必層層傳遞報告物件；沒有進行中的執行時 stage() 不做任何事
+
+_current_run = None
+
+def start_run(name):
+    """開始記錄一次執行 (ENABLE_RUN_REPORT 為 False 時不記錄)"""
+    global _current_run
+    _current_run = RunReport(name) if ENABLE_RUN_REPORT else None
+    return _current_run
+
+@contextmanager
+def stage(name, board=None, items=None):
+    """記錄一個階段；with 區塊內可設定回傳物件的 items"""
+    if _current_run is None:
+        yield StageRecord(name, board)
+        return
+    with _current_run.stage(name, board, items) as record:
+        yield record
+
+def finish_run(verbose=True):
+    """結束目前的執行，輸出 JSON 報告並回傳路徑；沒有進行中的執行時回傳 None"""
+    global _current_run
+    run, _current_run = _current_run, None
+    if run is None:
+        return None
+    path = run.save()
+    if verbose:
+        run.print_summary()
+        print(f"執行報告已儲存至 {path}")
+    return path
@@ -1,10 +1,14 @@
-import re
 import os
+import numpy as np
 import pandas as pd
-from collections import defaultdict
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-import matplotlib.font_manager as fm
+from pandas.tseries.frequencies import to_offset
+
+from aho_corasick import AhoCorasick, OVERLAPPING
+from checkpoint import CheckpointStore, config_fingerprint
+from corpus_cache import CACHE_DIR, PARSER_VERSION, load_corpus, parse_post
+from dedup import DEDUP_COLUMNS, NearDuplicateIndex, drop_near_duplicates, report_dedup
+from ptt_reader import board_name_from_path
+from run_report import finish_run, stage, start_run
 
 # --- 1. 設定 ---
 
@@ -28,124 +32,279 @@ NEGATIVE_WORDS = {
     '巨嬰', '媽寶', '無腦', '側翼', '好了啦', '下去', '可憐哪', '崩潰了'
 }
 
+# 詞典比對模式: 'overlapping' 時「崩潰了」同時計入「崩潰」與「崩潰了」(與舊版 word in text 相同)；
+# 'leftmost_longest' 時重疊的詞只計最長者
+LEXICON_MATCH_MODE = OVERLAPPING
+# False: 每個詞只看是否出現 (舊版行為)；True: 計算實際出現次數
+COUNT_OCCURRENCES = False
+
+# 評分方法: 'ratio' 為詞典比例分數 (calculate_sentiment_score)；'weighted' 為斷詞後的加權詞典分數
+# (lexicon_scorer，支援權重、否定詞與程度副詞，需要 jieba 與 opencc)
+SENTIMENT_SCORER = 'ratio'
+
+# 時間解析度 (pandas 頻率字串)：'D' 每日、'H' 每小時、'10min' 每 10 分鐘
+TIME_RESOLUTION = 'D'
+
+# 增量模式：記錄每個檔案已處理到的位置與分數彙總，重新執行時只處理新增的文章
+USE_CHECKPOINT = True
+CHECKPOINT_PATH = os.path.join(CACHE_DIR, 'sentiment_checkpoint.json')
+# 檢查點中分數彙總的時間桶，也是增量模式下可輸出的最細解析度
+CHECKPOINT_BUCKET = '10min'
+
+# 匯總結果輸出檔
+OUTPUT_FILENAME = 'sentiment_analysis_with_combined_results.csv'
+
+# 只分析此年份的文章
+SENTIMENT_YEAR = 2025
+
+# 是否先移除跨版面的近似重複文章 (轉貼、複製貼上的新聞稿會重複計入平均分數)；
+# 需要比對完整歷史，開啟時不使用增量檢查點
+DEDUP_POSTS = False
+
+# 是否繪製情感趨勢圖 (False 時不載入 matplotlib，只輸出 CSV，適合排程執行)
+SHOW_PLOT = True
+
 # --- 2. 資料處理函式 ---
 
-def parse_ptt_posts_from_file(file_path):
-    """從單一 PTT 檔案中，提取每篇文章的日期和內容"""
+def parse_ptt_posts_from_file(file_path, dedup_index=None, dedup_counts=None):
+    """
+    從單一 PTT 檔案中，提取每篇文章的日期和內容；dedup_index 不為 None 時略過近似重複的文章，
+    並將版面的 (去重前文章數, 重複篇數) 記入 dedup_counts。
+    去重比對所有有發文時間的文章後才篩選 SENTIMENT_YEAR (與 pipeline.py 相同)，
+    轉貼自其他年份文章的重複文章同樣會被移除。
+    """
     posts = []
-    date_pattern = re.compile(r'時間\s+([A-Za-z]{3}\s+[A-Za-z]{3}\s+\d{1,2}\s+\d{2}:\d{2}:\d{2}\s+2025)')
-
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        posts_content = content.split('======================================================================')
-        for post_text in posts_content:
-            post_text = post_text.strip()
-            if not post_text: continue
-            date_match = date_pattern.search(post_text)
-            if date_match:
-                date_str = date_match.group(1)
-                try:
-                    post_date = pd.to_datetime(date_str, format='%a %b %d %H:%M:%S %Y').date()
-                    posts.append({'date': post_date, 'text': post_text})
-                except ValueError: continue
+        corpus = load_corpus(file_path, columns=['timestamp', 'text'] + (DEDUP_COLUMNS if dedup_index is not None else []))
+        if dedup_index is not None:
+            corpus = corpus[corpus['timestamp'].notna()]
+            num_posts = len(corpus)
+            corpus, num_removed = drop_near_duplicates(corpus, dedup_index, board_name_from_path(file_path),
+                                                       mode='collapse')
+            if dedup_counts is not None:
+                dedup_counts[board_name_from_path(file_path)] = (num_posts, num_removed)
+        corpus = corpus[corpus['timestamp'].dt.year == SENTIMENT_YEAR]
+        posts = [
+            {'date': timestamp.date(), 'timestamp': timestamp, 'text': text}
+            for timestamp, text in zip(corpus['timestamp'], corpus['text'])
+        ]
     except FileNotFoundError: print(f"錯誤：找不到檔案 {file_path}。")
     except Exception as e: print(f"處理檔案 {file_path} 時發生錯誤: {e}")
     return posts
 
-def calculate_sentiment_score(text):
+def build_lexicon_matcher(positive_words=POSITIVE_WORDS, negative_words=NEGATIVE_WORDS):
+    """將正負情感詞典編譯為單一 Aho-Corasick 自動機，標籤為 'positive' / 'negative'"""
+    keyword_labels = {}
+    for word in positive_words:
+        keyword_labels.setdefault(word, []).append('positive')
+    for word in negative_words:
+        keyword_labels.setdefault(word, []).append('negative')
+    return AhoCorasick(keyword_labels)
+
+LEXICON_MATCHER = build_lexicon_matcher()
+
+def count_lexicon_hits(text, matcher=None, match_mode=LEXICON_MATCH_MODE, count_occurrences=COUNT_OCCURRENCES):
+    """一次掃描文本，回傳 (正面詞數, 負面詞數)"""
+    if matcher is None:
+        matcher = LEXICON_MATCHER
+    matches = matcher.find_all(text, match_mode)
+    if count_occurrences:
+        kw_ids = [kw_id for _, _, kw_id in matches]
+    else:
+        kw_ids = {kw_id for _, _, kw_id in matches}
+    pos_count = neg_count = 0
+    for kw_id in kw_ids:
+        for label in matcher.labels[kw_id]:
+            if label == 'positive':
+                pos_count += 1
+            else:
+                neg_count += 1
+    return pos_count, neg_count
+
+def calculate_sentiment_score(text, matcher=None, match_mode=LEXICON_MATCH_MODE, count_occurrences=COUNT_OCCURRENCES):
     """計算單一文本的情感分數"""
-    pos_count = sum(1 for word in POSITIVE_WORDS if word in text)
-    neg_count = sum(1 for word in NEGATIVE_WORDS if word in text)
+    pos_count, neg_count = count_lexicon_hits(text, matcher, match_mode, count_occurrences)
     total_mentions = pos_count + neg_count
     if total_mentions == 0: return 0.0
     return (pos_count - neg_count) / total_mentions
 
+def calculate_sentiment_scores(texts, matcher=None, match_mode=LEXICON_MATCH_MODE, count_occurrences=COUNT_OCCURRENCES):
+    """批次計算多篇文本的情感分數，回傳與輸入順序相同的分數列表"""
+    if matcher is None:
+        matcher = LEXICON_MATCHER
+    return [calculate_sentiment_score(text, matcher, match_mode, count_occurrences) for text in texts]
+
+_weighted_scorer = None
+
+def score_texts(texts):
+    """依 SENTIMENT_SCORER 批次計算多篇文本的情感分數，回傳 float64 陣列"""
+    global _weighted_scorer
+    if SENTIMENT_SCORER == 'weighted':
+        if _weighted_scorer is None:
+            from lexicon_scorer import WeightedLexiconScorer
+            _weighted_scorer = WeightedLexiconScorer()
+        return _weighted_scorer.score(list(texts))
+    return np.asarray(calculate_sentiment_scores(texts), dtype=np.float64)
+
+SCORED_COLUMNS = ['board', 'timestamp', 'score_sum', 'count']
+
+def load_scored_posts(file_path, board_name, dedup_index=None, dedup_counts=None):
+    """完整讀取單一版面並計算情感分數，回傳每列一篇文章的 DataFrame (board, timestamp, score_sum, count)"""
+    posts = parse_ptt_posts_from_file(file_path, dedup_index, dedup_counts)
+    sentiment_scores = score_texts([post['text'] for post in posts])
+    return pd.DataFrame({
+        'board': board_name,
+        'timestamp': pd.to_datetime([post['timestamp'] for post in posts]),
+        'score_sum': sentiment_scores,
+        'count': np.ones(len(posts), dtype=np.int64)
+    }, columns=SCORED_COLUMNS)
+
+def sentiment_checkpoint_fingerprint():
+    if SENTIMENT_SCORER == 'weighted':
+        from lexicon_scorer import WeightedLexiconScorer
+        from topic_analysis import get_custom_words
+        scorer = _weighted_scorer if _weighted_scorer is not None else WeightedLexiconScorer()
+        return config_fingerprint('weighted', scorer.config, get_custom_words(), PARSER_VERSION, CHECKPOINT_BUCKET)
+    return config_fingerprint(POSITIVE_WORDS, NEGATIVE_WORDS, LEXICON_MATCH_MODE, COUNT_OCCURRENCES, PARSER_VERSION, CHECKPOINT_BUCKET)
+
+def _add_bucket_score(bucket_sums, bucket, total, count=1):
+    entry = bucket_sums.setdefault(bucket, [0.0, 0])
+    entry[0] += total
+    entry[1] += count
+
+def load_scored_buckets_incremental(file_path, board_name, store):
+    """
+    只讀取檢查點之後新增的文章，併入檢查點中以 CHECKPOINT_BUCKET 為單位的分數彙總，
+    回傳每列一個時間桶的 DataFrame (board, timestamp, score_sum, count)。
+    尚未以分隔線結尾的最後一篇文章只計入本次結果，不寫入檢查點。
+    """
+    committed = store.aggregates(file_path)  # {'YYYY-MM-DDTHH:MM:SS': [分數總和, 文章數]}
+    pending = {}
+    try:
+        # 先收集新增文章再一次評分 (加權評分器以整批文章建立稀疏矩陣)
+        new_posts = []
+        for post_text, complete in store.read_new_posts(file_path):
+            record = parse_post(post_text)
+            if record is None or record['timestamp'] is None or record['timestamp'].year != SENTIMENT_YEAR:
+                continue
+            bucket = pd.Timestamp(record['timestamp']).floor(CHECKPOINT_BUCKET).isoformat()
+            new_posts.append((bucket, complete, record['text']))
+        scores = score_texts([text for _, _, text in new_posts]) if new_posts else []
+        for (bucket, complete, _), score in zip(new_posts, scores):
+            _add_bucket_score(committed if complete else pending, bucket, float(score))
+    except FileNotFoundError: print(f"錯誤：找不到檔案 {file_path}。")
+
+    bucket_sums = {}
+    for source in (committed, pending):
+        for bucket, (total, count) in source.items():
+            _add_bucket_score(bucket_sums, bucket, total, count)
+    return pd.DataFrame({
+        'board': board_name,
+        'timestamp': pd.to_datetime(list(bucket_sums.keys())),
+        'score_sum': np.asarray([total for total, _ in bucket_sums.values()], dtype=np.float64),
+        'count': np.asarray([count for _, count in bucket_sums.values()], dtype=np.int64)
+    }, columns=SCORED_COLUMNS)
+
+def aggregate_sentiment(scored, board_names, freq=TIME_RESOLUTION):
+    """
+    以單次 groupby 依時間解析度 freq 計算各版面與合併 ('combined') 的平均分數與文章數。
+    scored 的每列可以是單篇文章或時間桶彙總 (score_sum 為分數總和、count 為文章數)。
+
+    :return: (tuple) (平均分數 DataFrame, 文章數 DataFrame)，索引為涵蓋整個期間的連續時間序列，
+             沒有文章的時間點平均分數為 NaN。
+    """
+    buckets = scored['timestamp'].dt.floor(freq).rename('Date')
+    grouped = scored.groupby([buckets, scored['board']])[['score_sum', 'count']].sum().unstack('board', fill_value=0)
+    full_index = pd.date_range(buckets.min(), buckets.max(), freq=freq, name='Date')
+    score_sums = grouped['score_sum'].reindex(index=full_index, columns=board_names, fill_value=0.0)
+    counts = grouped['count'].reindex(index=full_index, columns=board_names, fill_value=0).astype(np.int64)
+    score_sums['combined'] = score_sums.sum(axis=1)
+    counts['combined'] = counts.sum(axis=1)
+    means = score_sums / counts.where(counts > 0)
+    means.columns.name = None
+    counts.columns.name = None
+    return means, counts
+
 # --- 3. 主程式執行流程 ---
 
 def main():
-    if not os.path.exists(FONT_FILENAME):
-        print(f"錯誤：找不到字型檔案 '{FONT_FILENAME}'。請確認字型檔與腳本在同一個資料夾。")
-        return
-    my_font = fm.FontProperties(fname=FONT_FILENAME)
+    if SHOW_PLOT:
+        if not os.path.exists(FONT_FILENAME):
+            print(f"錯誤：找不到字型檔案 '{FONT_FILENAME}'。請確認字型檔與腳本在同一個資料夾。")
+            return
+        import matplotlib.font_manager as fm
+        my_font = fm.FontProperties(fname=FONT_FILENAME)
 
     print("--- PTT 版面情感趨勢分析 (含總體) ---")
+    start_run('sentiment')
 
     # 步驟 1: 依版面載入、解析並計算情感分數
     print("\n[步驟 1/3] 正在分析各版面的文章情感傾向...")
-    daily_sentiments = defaultdict(lambda: defaultdict(list))
-    all_dates = set()
+    use_checkpoint = USE_CHECKPOINT
+    if use_checkpoint and to_offset(TIME_RESOLUTION).nanos < to_offset(CHECKPOINT_BUCKET).nanos:
+        print(f"  > 提示：時間解析度 {TIME_RESOLUTION} 比檢查點時間桶 {CHECKPOINT_BUCKET} 更細，本次不使用檢查點。")
+        use_checkpoint = False
+    if use_checkpoint and DEDUP_POSTS:
+        print("  > 提示：去除近似重複文章需要比對完整歷史，本次不使用檢查點。")
+        use_checkpoint = False
+    store = CheckpointStore(CHECKPOINT_PATH, sentiment_checkpoint_fingerprint()) if use_checkpoint else None
+    dedup_index = NearDuplicateIndex() if DEDUP_POSTS else None
+    dedup_counts = {}
+    scored_frames = []
     for path in FILE_PATHS:
-        board_name = os.path.splitext(os.path.basename(path))[0]
+        board_name = board_name_from_path(path)
         print(f"  > 正在處理版面: {board_name}")
-        posts = parse_ptt_posts_from_file(path)
-        if not posts:
+        with stage('score_incremental' if store is not None else 'score', board=board_name) as record:
+            if store is not None:
+                scored = load_scored_buckets_incremental(path, board_name, store)
+            else:
+                scored = load_scored_posts(path, board_name, dedup_index, dedup_counts)
+            record.items = int(scored['count'].sum())
+        if scored.empty:
             print(f"    - 在 {path} 中未找到任何文章，已跳過。")
             continue
-        print(f"    - 載入 {len(posts)} 篇文章。")
-        for post in posts:
-            post_date = post['date']
-            sentiment_score = calculate_sentiment_score(post['text'])
-            daily_sentiments[post_date][board_name].append(sentiment_score)
-            all_dates.add(post_date)
+        print(f"    - 載入 {scored['count'].sum()} 篇文章。")
+        scored_frames.append(scored)
+    if store is not None:
+        store.save()
+    if dedup_index is not None:
+        report_dedup(dedup_counts, dedup_index)
     print("  > 所有版面分析完成。")
 
-    # 步驟 2: 匯總每日平均情感分數 (含合併數據)
-    print("\n[步驟 2/3] 正在匯總每日平均情感分數...")
-    results = []
-    if not daily_sentiments:
+    # 步驟 2: 依時間解析度匯總平均情感分數 (含合併數據)
+    print(f"\n[步驟 2/3] 正在以 {TIME_RESOLUTION} 解析度匯總平均情感分數...")
+    if not scored_frames:
         print("沒有找到任何文章，無法進行分析。")
+        finish_run()
         return
 
-    start_date, end_date = min(all_dates), max(all_dates)
-    date_range = pd.date_range(start=start_date, end=end_date)
-    board_names = [os.path.splitext(os.path.basename(p))[0] for p in FILE_PATHS]
-
-    for date in date_range:
-        date_obj = date.date()
-        row = {'Date': date_obj}
-        all_daily_scores = [] # 用於計算當日合併分數
-
-        # 計算各獨立版面的平均分數
-        for board in board_names:
-            scores = daily_sentiments[date_obj][board]
-            if scores:
-                row[board] = sum(scores) / len(scores)
-                all_daily_scores.extend(scores) # 將分數加入合併列表
-            else:
-                row[board] = None
-
-        # 計算當日合併後的總平均分數
-        if all_daily_scores:
-            row['combined'] = sum(all_daily_scores) / len(all_daily_scores)
-        else:
-            row['combined'] = None
-
-        results.append(row)
-
-    df = pd.DataFrame(results).set_index('Date')
-
-    # 調整欄位順序，讓 'combined' 在最後，方便圖例觀看
-    if 'combined' in df.columns:
-        cols = [col for col in df if col != 'combined'] + ['combined']
-        df = df[cols]
+    board_names = [board_name_from_path(p) for p in FILE_PATHS]
+    with stage('aggregate') as record:
+        df, _ = aggregate_sentiment(pd.concat(scored_frames, ignore_index=True), board_names, TIME_RESOLUTION)
+        record.items = len(df)
 
     df.fillna(method='ffill', inplace=True) # 向前填充空值，使圖表連續
-    df.index = pd.to_datetime(df.index)
 
     print("  > 匯總完成。")
 
     # 步驟 3: 顯示結果、儲存檔案並繪圖
-    print("\n--- 每日平均情感分數結果 (繪圖數據) ---")
+    print(f"\n--- 平均情感分數結果 ({TIME_RESOLUTION}，繪圖數據) ---")
 
-    output_filename = 'sentiment_analysis_with_combined_results.csv'
-    df.to_csv(output_filename, encoding='utf-8-sig')
-    print(f"\n分析結果已儲存至 {output_filename}")
+    df.to_csv(OUTPUT_FILENAME, encoding='utf-8-sig')
+    print(f"\n分析結果已儲存至 {OUTPUT_FILENAME}")
 
     print("\n以下為繪製「PTT 版面情感趨勢圖」所使用的數據：")
     print(df.round(3).to_string())
     print("-" * 50)
 
+    if not SHOW_PLOT:
+        finish_run()
+        return
+
+    # matplotlib 只在需要繪圖時才載入
+    import matplotlib.pyplot as plt
+    import matplotlib.dates as mdates
+
     print("\n正在繪製情感趨勢圖...")
 
     plt.rcParams['axes.unicode_minus'] = False
@@ -203,6 +362,8 @@ def main():
     ax.xaxis.set_major_locator(mdates.DayLocator(interval=2))
     plt.xticks(rotation=45)
     plt.tight_layout()
+    # 報告在顯示圖表前寫出，不受視窗開啟時間影響
+    finish_run()
     plt.show()
 
 if __name__ == '__main__':
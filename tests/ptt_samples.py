@@ -0,0 +1,46 @@
+"""
+測試共用：在暫存目錄中寫出小型 PTT 匯出檔。
+測試以 python -m unittest discover -s tests 執行 (亦可用 pytest)。
+"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from ptt_reader import POST_SEPARATOR  # noqa: E402
+
+
+def make_post(time_line, body, board='gossiping', title='[問卦] 測試'):
+    """單篇文章原文；time_line 為匯出檔的時間格式，例如 'Sat Jul 19 10:00:00 2025'"""
+    return (
+        f"\n作者 tester (測試)\n"
+        f"看板 {board}\n"
+        f"標題 {title}\n"
+        f"時間 {time_line}\n\n"
+        f"{body}\n\n--\n"
+        f"※ 發信站: 批踢踢實業坊(ptt.cc)\n"
+    )
+
+def write_dump(path, posts):
+    """以分隔線串接文章並寫入 path (最後一篇之後也加上分隔線)"""
+    with open(path, 'w', encoding='utf-8') as f:
+        for post in posts:
+            f.write(post)
+            f.write(POST_SEPARATOR + '\n')
+
+
+class DumpTestCase(unittest.TestCase):
+    """每個測試在新的暫存目錄中執行 (解析快取、檢查點與輸出檔都寫在目前目錄)"""
+
+    def setUp(self):
+        self._old_cwd = os.getcwd()
+        self.tmp_dir = tempfile.mkdtemp(prefix='ptt-test-')
+        os.chdir(self.tmp_dir)
+
+    def tearDown(self):
+        os.chdir(self._old_cwd)
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
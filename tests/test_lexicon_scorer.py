@@ -0,0 +1,61 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import ptt_samples  # noqa: F401  (將專案目錄加入 sys.path)
+
+from lexicon_scorer import WeightedLexiconScorer
+
+WEIGHTS = {'支持': 1.0, '認同': 1.0, '合理': 1.0, '可笑': -1.0, '爛': -1.0, '神': 3.0}
+
+
+class WeightedLexiconScorerTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # Jieba 詞典快取寫在目前目錄，整個類別共用一個暫存目錄與評分器
+        cls._old_cwd = os.getcwd()
+        cls.tmp_dir = tempfile.mkdtemp(prefix='ptt-test-')
+        os.chdir(cls.tmp_dir)
+        cls.scorer = WeightedLexiconScorer(WEIGHTS)
+        cls.scorer.tokenize('')
+
+    @classmethod
+    def tearDownClass(cls):
+        os.chdir(cls._old_cwd)
+        shutil.rmtree(cls.tmp_dir, ignore_errors=True)
+
+    def test_negator_is_not_absorbed_into_term(self):
+        # Jieba 詞典本身有「不合理」、「很爛」、「不可」等詞，否定詞與程度副詞仍須與詞典詞分開
+        self.assertEqual(self.scorer.tokenize('不合理'), ['不', '合理'])
+        self.assertEqual(self.scorer.tokenize('不是很爛'), ['不是', '很', '爛'])
+        self.assertEqual(self.scorer.tokenize('不可笑'), ['不', '可笑'])
+
+    def test_negated_terms_score_negative(self):
+        texts = ['不支持', '不認同', '不合理', '支持', '不是很爛']
+        scores = self.scorer.score(texts).tolist()
+        for text, score in zip(texts[:3], scores):
+            self.assertLess(score, 0, text)
+        self.assertGreater(scores[3], 0)
+        self.assertGreater(scores[4], 0)
+
+    def test_multipliers_and_weights_change_the_score(self):
+        # 分母為詞典詞出現次數，單一詞的分數即為 倍率 × 權重
+        strong, plain, weak, heavy = self.scorer.score(['非常支持', '支持', '有點支持', '神']).tolist()
+        self.assertGreater(strong, plain)
+        self.assertGreater(plain, weak)
+        self.assertGreater(weak, 0)
+        self.assertGreater(heavy, plain)
+        self.assertAlmostEqual(plain, 1.0)
+
+    def test_plain_lexicon_matches_ratio_score(self):
+        # 權重皆為 ±1 且沒有修飾詞時即為 (正面詞數 - 負面詞數) / 總詞數
+        totals, hit_counts = self.scorer.score_sums(['支持，認同，但是爛', '今天天氣晴'])
+        self.assertEqual(totals.tolist(), [1.0, 0.0])
+        self.assertEqual(hit_counts.tolist(), [3, 0])
+        self.assertEqual(self.scorer.score(['支持，認同，但是爛', '今天天氣晴']).tolist(), [1 / 3, 0.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
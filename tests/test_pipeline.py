@@ -0,0 +1,72 @@
+import numpy as np
+
+from ptt_samples import DumpTestCase, make_post, write_dump
+
+import entity_network
+import pipeline
+import sentiment
+from dedup import NearDuplicateIndex
+
+
+class ScanBoardYearTest(DumpTestCase):
+    """SENTIMENT_YEAR 以外的文章：情感輸出排除，但人物網路的分數仍須與提及矩陣逐列對齊"""
+
+    def setUp(self):
+        super().setUp()
+        write_dump('gossiping.txt', [
+            make_post('Sat Jul 19 10:00:00 2025', '徐巧芯 支持 讚'),
+            make_post('Fri Jul 19 11:00:00 2024', '黃國昌 爛 垃圾 可悲'),
+            make_post('Sun Jul 20 12:00:00 2025', '徐巧芯 黃國昌 反對'),
+        ])
+
+    def test_scored_keeps_every_post(self):
+        result = pipeline.scan_board('gossiping.txt', {'sentiment'})
+        self.assertEqual(len(result['scored']), 3)
+        self.assertEqual(list(result['scored']['timestamp'].dt.year), [2025, 2024, 2025])
+
+    def test_network_scores_align_with_matrix(self):
+        matrix, scores = entity_network.build_network_inputs(['gossiping.txt'])
+        self.assertEqual(matrix.num_posts, 3)
+        self.assertEqual(len(scores), 3)
+        expected = sentiment.score_texts([
+            '徐巧芯 支持 讚', '黃國昌 爛 垃圾 可悲', '徐巧芯 黃國昌 反對'])
+        # 每篇文章的分數只來自內文的詞典詞，標頭與發信站不含詞典詞
+        np.testing.assert_allclose(scores, expected)
+        summary = entity_network.entity_sentiment_summary(matrix, scores)
+        self.assertEqual(summary.loc['黃國昌', 'posts'], 2)
+        self.assertAlmostEqual(summary.loc['黃國昌', 'score_sum'], expected[1] + expected[2])
+
+    def test_sentiment_csv_matches_sentiment_module(self):
+        pipeline.report_sentiment([pipeline.scan_board('gossiping.txt', {'sentiment'})['scored']], ['gossiping'])
+        with open(sentiment.OUTPUT_FILENAME, encoding='utf-8-sig') as f:
+            from_pipeline = f.read()
+        scored = sentiment.load_scored_posts('gossiping.txt', 'gossiping')
+        self.assertEqual(len(scored), 2)
+        df, _ = sentiment.aggregate_sentiment(scored, ['gossiping'], sentiment.TIME_RESOLUTION)
+        df.fillna(method='ffill', inplace=True)
+        self.assertEqual(from_pipeline, df.to_csv())
+
+
+class DedupOrderTest(DumpTestCase):
+    """sentiment.py 與 pipeline.py 的去重都在篩選年份之前，轉貼自其他年份的文章在兩者都被移除"""
+
+    ARTICLE = '政府今天宣布颱風假，全台各縣市停班停課，民眾支持這項決定，網友認為讚'
+
+    def setUp(self):
+        super().setUp()
+        write_dump('gossiping.txt', [
+            make_post('Fri Jul 19 11:00:00 2024', self.ARTICLE),
+            make_post('Sat Jul 19 10:00:00 2025', self.ARTICLE),
+            make_post('Sun Jul 20 12:00:00 2025', '徐巧芯 黃國昌 反對，覺得爛'),
+        ])
+
+    def test_same_posts_in_both_entry_points(self):
+        dedup_counts = {}
+        from_sentiment = sentiment.load_scored_posts('gossiping.txt', 'gossiping', NearDuplicateIndex(), dedup_counts)
+        result = pipeline.scan_board('gossiping.txt', {'sentiment'}, dedup_index=NearDuplicateIndex())
+        from_pipeline = result['scored']
+        from_pipeline = from_pipeline[from_pipeline['timestamp'].dt.year == sentiment.SENTIMENT_YEAR]
+        self.assertEqual(list(from_sentiment['timestamp']), list(from_pipeline['timestamp']))
+        self.assertEqual(len(from_sentiment), 1)
+        self.assertEqual(dedup_counts['gossiping'], result['dedup'])
+        self.assertEqual(result['dedup'], (3, 1))
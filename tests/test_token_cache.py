@@ -0,0 +1,41 @@
+import numpy as np
+
+from ptt_samples import DumpTestCase
+
+from token_cache import TokenCache, text_key
+from token_corpus import TokenCorpusBuilder
+
+DOCS = {
+    '第一篇': ['罷免', '投票', '罷免'],
+    '第二篇': ['颱風', '停班', '投票'],
+    '第三篇': ['支持', '罷免', '颱風', '笑死'],
+}
+
+
+class TokenCacheTest(DumpTestCase):
+
+    def test_round_trip_and_builder_ids(self):
+        cache = TokenCache('test')
+        keys = [text_key(text) for text in DOCS]
+        self.assertEqual(cache.lookup(keys).tolist(), [-1, -1, -1])
+        self.assertEqual([cache.add(key, words) for key, words in zip(keys, DOCS.values())], [0, 1, 2])
+        cache.add(keys[0], DOCS['第一篇'])   # 同一次執行中重複的文章，存檔時只保留一份
+        cache.save()
+
+        reloaded = TokenCache('test')
+        self.assertEqual(len(reloaded), 3)
+        rows = reloaded.lookup(keys[::-1] + [text_key('不存在')])
+        self.assertEqual(rows[-1], -1)
+        for row, words in zip(rows.tolist(), list(DOCS.values())[::-1]):
+            ids = reloaded.document_ids(row)
+            self.assertEqual([reloaded.vocabulary.tokens[i] for i in ids], words)
+
+        # 由快取詞 id 建立的語料與直接加入詞列表的結果相同 (含詞 id 的編排)
+        from_words, from_ids = TokenCorpusBuilder(), TokenCorpusBuilder()
+        for key, words in zip(keys, DOCS.values()):
+            from_words.add(words)
+            from_ids.add_ids(reloaded.document_ids(int(reloaded.lookup([key])[0])), reloaded.vocabulary)
+        expected, actual = from_words.build(), from_ids.build()
+        self.assertEqual(expected.vocabulary.tokens, actual.vocabulary.tokens)
+        np.testing.assert_array_equal(expected.tokens, actual.tokens)
+        np.testing.assert_array_equal(expected.offsets, actual.offsets)
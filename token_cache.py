@@ -0,0 +1,142 @@
+import hashlib
+import os
+from array import array
+
+import numpy as np
+
+from corpus_cache import CACHE_DIR
+from token_corpus import Vocabulary, take_rows
+
+# --- 1. 設定 ---
+
+# 前處理版本：修改 preprocess_text 的清洗或斷詞邏輯時請遞增，舊快取會自動失效
+PREPROCESS_VERSION = 1
+
+
+# --- 2. 快取鍵 ---
+
+def preprocessing_fingerprint(custom_words, stopwords, opencc_profile):
+    """以自定義詞典、停用詞與 OpenCC 設定計算前處理設定的指紋"""
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(f"v{PREPROCESS_VERSION}|{opencc_profile}|".encode('utf-8'))
+    digest.update('\n'.join(sorted(custom_words)).encode('utf-8'))
+    digest.update(b'\x00')
+    digest.update('\n'.join(sorted(stopwords)).encode('utf-8'))
+    return digest.hexdigest()
+
+def text_key(text):
+    """單篇文章內容的雜湊值"""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+# --- 3. 斷詞快取 ---
+
+class TokenCache:
+    """
+    以文章內容雜湊為鍵的斷詞結果磁碟快取。與 token_corpus.TokenCorpus 相同，以共用詞彙表加上 int32 詞 id 陣列
+    與 int64 位移陣列 (CSR) 保存，鍵為依序排列的 16 位元組雜湊陣列，不保留任何每篇文章的詞列表或字典：
+    每個詞 4 位元組、每篇文章 24 位元組。本次新增的文章同樣以 array 緩衝區累積，save() 時才與既有條目合併。
+
+    每組前處理設定 (指紋) 對應一個 .npz 檔，設定變更時自動改用新檔並刪除舊檔。
+    """
+
+    def __init__(self, fingerprint, cache_dir=CACHE_DIR):
+        self.fingerprint = fingerprint
+        self.cache_dir = cache_dir
+        self.path = os.path.join(cache_dir, f"tokens-{fingerprint}.npz")
+        self._vocabulary = None
+        self._keys = None          # 已存檔條目的雜湊 (S16)，由小到大排列；列號即在此陣列中的位置
+        self._tokens = None        # 已存檔條目的詞 id (int32)
+        self._offsets = None       # 已存檔條目的位移 (int64，長度為條目數 + 1)
+        self._new_keys = bytearray()
+        self._new_tokens = array('i')
+        self._new_offsets = array('q', [0])
+
+    def _load(self):
+        self._vocabulary = Vocabulary()
+        self._keys = np.zeros(0, dtype='S16')
+        self._tokens = np.zeros(0, dtype=np.int32)
+        self._offsets = np.zeros(1, dtype=np.int64)
+        if not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path) as data:
+                vocabulary = data['vocabulary'].tobytes().decode('utf-8')
+                keys, tokens, offsets = data['keys'], data['tokens'], data['offsets']
+        except (OSError, ValueError, KeyError) as e:
+            print(f"警告：斷詞快取 {self.path} 讀取失敗，將重新建立: {e}")
+            return
+        self._vocabulary = Vocabulary(vocabulary.split('\x00') if vocabulary else [])
+        self._keys, self._tokens, self._offsets = keys, tokens, offsets
+
+    @property
+    def vocabulary(self):
+        """(Vocabulary) 快取內詞 id 所對應的詞彙表"""
+        if self._vocabulary is None:
+            self._load()
+        return self._vocabulary
+
+    def lookup(self, keys):
+        """
+        回傳與 keys (text_key 的結果) 對齊的快取列號 (int64 陣列，未命中為 -1)。
+        只比對已存檔的條目；同一次執行中重複出現的新文章會再處理一次，存檔時只保留一份。
+        """
+        if self._vocabulary is None:
+            self._load()
+        query = np.array([bytes.fromhex(key) for key in keys], dtype='S16')
+        rows = np.searchsorted(self._keys, query)
+        found = rows < len(self._keys)
+        found[found] = self._keys[rows[found]] == query[found]
+        return np.where(found, rows, -1)
+
+    def add(self, key, words):
+        """加入一篇文章的斷詞結果，回傳其列號"""
+        ids = self.vocabulary.encode(words)
+        self._new_keys += bytes.fromhex(key)
+        self._new_tokens.extend(ids)
+        self._new_offsets.append(len(self._new_tokens))
+        return len(self._keys) + len(self._new_offsets) - 2
+
+    def document_ids(self, row):
+        """第 row 列文章的詞 id 陣列 (int32，對應 vocabulary)"""
+        num_saved = len(self._keys)
+        if row < num_saved:
+            return self._tokens[self._offsets[row]:self._offsets[row + 1]]
+        row -= num_saved
+        return np.frombuffer(self._new_tokens[self._new_offsets[row]:self._new_offsets[row + 1]], dtype=np.int32)
+
+    def __len__(self):
+        if self._vocabulary is None:
+            self._load()
+        return len(self._keys) + len(self._new_offsets) - 1
+
+    def save(self):
+        """有新增條目時才寫回磁碟：與既有條目合併、去除重複的鍵並依鍵排序"""
+        if len(self._new_offsets) == 1:
+            return
+        keys = np.concatenate([self._keys, np.frombuffer(bytes(self._new_keys), dtype='S16')])
+        tokens = np.concatenate([self._tokens, np.frombuffer(self._new_tokens, dtype=np.int32)])
+        offsets = np.concatenate([self._offsets[:-1],
+                                  np.frombuffer(self._new_offsets, dtype=np.int64) + self._offsets[-1]])
+        # 依鍵排序；相同的鍵只保留第一個 (已存檔的條目在前)
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        unique = np.ones(len(order), dtype=bool)
+        unique[1:] = sorted_keys[1:] != sorted_keys[:-1]
+        order = order[unique]
+        tokens, offsets = take_rows(tokens, offsets, order)
+        self._keys, self._tokens, self._offsets = keys[order], tokens, offsets
+        self._new_keys = bytearray()
+        self._new_tokens = array('i')
+        self._new_offsets = array('q', [0])
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        vocabulary = np.frombuffer('\x00'.join(self._vocabulary.tokens).encode('utf-8'), dtype=np.uint8)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, keys=self._keys, tokens=self._tokens, offsets=self._offsets, vocabulary=vocabulary)
+        os.replace(tmp_path, self.path)
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.startswith('tokens-') and name.endswith(('.npz', '.parquet')) and path != self.path:
+                os.remove(path)
@@ -0,0 +1,245 @@
+"""
+斷詞結果的緊湊儲存：所有文章共用一個詞彙表，斷詞結果存為一個 int32 詞 id 陣列加上 int64 位移陣列 (CSR 格式)，
+第 i 篇文章的詞為 tokens[offsets[i]:offsets[i + 1]]。
+
+Python 的「每篇一個 str 列表」每個詞約需 60-70 位元組 (字串物件加列表指標)，(id, 次數) tuple 詞袋每個不重複詞
+約需 100 位元組；這裡每個詞只佔 4 位元組，詞袋 (文章 × 詞 CSR 矩陣) 每個不重複詞佔 8 位元組。
+建立詞典、filter_extremes 與轉換詞袋都直接以陣列運算完成，詞 id 的編排與 gensim Dictionary 完全相同，
+因此訓練出的 LDA 模型也與原本逐篇 doc2bow 的結果一致。
+"""
+import numpy as np
+from scipy import sparse
+
+
+# --- 1. 詞彙表與斷詞語料 ---
+
+class Vocabulary:
+    """
+    詞 -> id 對照表。新詞的 id 編排方式與 gensim Dictionary.doc2bow(allow_update=True) 相同：
+    每篇文章中第一次出現的詞依字串排序後依序編號。
+    """
+
+    def __init__(self, tokens=None):
+        self.tokens = list(tokens) if tokens is not None else []
+        self.token2id = {token: token_id for token_id, token in enumerate(self.tokens)}
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def encode(self, words):
+        """將一篇文章的詞列表轉為 id 列表，並登記未見過的詞"""
+        token2id = self.token2id
+        ids = [token2id.get(word, -1) for word in words]
+        if -1 in ids:
+            for word in sorted({word for word, token_id in zip(words, ids) if token_id == -1}):
+                token2id[word] = len(self.tokens)
+                self.tokens.append(word)
+            ids = [token2id[word] for word in words]
+        return ids
+
+    def merge(self, tokens):
+        """依序登記另一個詞彙表的詞 (新詞依原順序接在後面，同 Dictionary.merge_with)，回傳各詞的新 id"""
+        token2id = self.token2id
+        ids = []
+        for token in tokens:
+            token_id = token2id.get(token)
+            if token_id is None:
+                token_id = token2id[token] = len(self.tokens)
+                self.tokens.append(token)
+            ids.append(token_id)
+        return ids
+
+
+class TokenCorpus:
+    """
+    以 CSR 格式保存的斷詞語料。
+
+    :param vocabulary: (Vocabulary) 共用的詞彙表。
+    :param tokens: (ndarray) int32，所有文章的詞 id 依序串接。
+    :param offsets: (ndarray) int64，長度為文章數 + 1。
+    """
+
+    def __init__(self, vocabulary, tokens, offsets):
+        self.vocabulary = vocabulary
+        self.tokens = tokens
+        self.offsets = offsets
+        self._doc_term = None
+
+    @property
+    def num_docs(self):
+        return len(self.offsets) - 1
+
+    def __len__(self):
+        return self.num_docs
+
+    @property
+    def nbytes(self):
+        """詞 id 與位移陣列佔用的位元組數 (不含詞彙表)"""
+        return self.tokens.nbytes + self.offsets.nbytes
+
+    def document(self, i):
+        """第 i 篇文章的詞列表"""
+        return [self.vocabulary.tokens[token_id] for token_id in self.tokens[self.offsets[i]:self.offsets[i + 1]]]
+
+    def doc_term_matrix(self):
+        """
+        文章 × 詞的次數矩陣 (csr_matrix，int32)，每列即該文章的詞袋，欄 id 為詞彙表 id。
+        由 (tokens, offsets) 直接建立後合併重複項，等同對每篇文章執行 doc2bow；結果會被保留重複使用。
+        """
+        if self._doc_term is None:
+            shape = (self.num_docs, len(self.vocabulary))
+            data = np.ones(len(self.tokens), dtype=np.int32)
+            # 須複製：sum_duplicates 會就地排序欄 id，不能改動原本的詞序
+            matrix = sparse.csr_matrix((data, self.tokens, self.offsets), shape=shape, copy=True)
+            matrix.sum_duplicates()  # 同時將每列的欄 id 排序，與 doc2bow 的輸出順序相同
+            self._doc_term = matrix
+        return self._doc_term
+
+    def document_frequencies(self):
+        """每個詞出現在幾篇文章中 (int64，依詞 id 排列)"""
+        return np.bincount(self.doc_term_matrix().indices, minlength=len(self.vocabulary))
+
+    def collection_frequencies(self):
+        """每個詞在整個語料中出現的總次數 (int64，依詞 id 排列)"""
+        return np.bincount(self.tokens, minlength=len(self.vocabulary))
+
+
+class TokenCorpusBuilder:
+    """
+    逐篇加入斷詞結果，立即轉為詞 id 並串接，詞列表本身不會被保留。
+
+    :param vocabulary: (Vocabulary) 要沿用的詞彙表，None 時建立新的詞彙表。
+    """
+
+    def __init__(self, vocabulary=None):
+        self.vocabulary = vocabulary if vocabulary is not None else Vocabulary()
+        self._blocks = []
+        self._ids = []
+        self._lengths = []
+        self._source = None
+        self._source_map = np.zeros(0, dtype=np.int64)  # 來源詞彙表 id -> 本詞彙表 id，尚未對應為 -1
+
+    def add(self, words):
+        ids = self.vocabulary.encode(words)
+        self._ids.extend(ids)
+        self._lengths.append(len(ids))
+        if len(self._ids) >= 1 << 20:
+            self._flush()
+
+    def add_ids(self, ids, source):
+        """
+        加入以另一個詞彙表 source 的 id 表示的文章 (例如斷詞快取)，結果與 add(對應的詞列表) 相同，
+        不必先還原成詞列表。source 可在加入過程中持續增加新詞。
+        """
+        if source is not self._source:
+            self._source = source
+            self._source_map = np.zeros(0, dtype=np.int64)
+        if len(self._source_map) < len(source):
+            grown = np.full(len(source), -1, dtype=np.int64)
+            grown[:len(self._source_map)] = self._source_map
+            self._source_map = grown
+        mapped = self._source_map[ids]
+        if (mapped < 0).any():
+            # 與 Vocabulary.encode 相同：本篇第一次出現的詞依字串排序後依序編號
+            source_tokens = source.tokens
+            unmapped = sorted(np.unique(ids[mapped < 0]).tolist(), key=source_tokens.__getitem__)
+            target_ids = self.vocabulary.merge([source_tokens[source_id] for source_id in unmapped])
+            self._source_map[unmapped] = target_ids
+            mapped = self._source_map[ids]
+        self._ids.extend(mapped.tolist())
+        self._lengths.append(len(mapped))
+        if len(self._ids) >= 1 << 20:
+            self._flush()
+
+    def _flush(self):
+        # 以固定大小的 int32 區塊暫存，避免整個語料的 id 都以 Python 整數列表保存
+        if self._ids:
+            self._blocks.append(np.asarray(self._ids, dtype=np.int32))
+            self._ids = []
+
+    def build(self):
+        self._flush()
+        tokens = np.concatenate(self._blocks) if self._blocks else np.zeros(0, dtype=np.int32)
+        offsets = np.zeros(len(self._lengths) + 1, dtype=np.int64)
+        np.cumsum(self._lengths, out=offsets[1:])
+        self._blocks = []
+        self._lengths = []
+        return TokenCorpus(self.vocabulary, tokens, offsets)
+
+
+def take_rows(tokens, offsets, rows):
+    """依 rows 的順序取出 CSR 格式 (tokens, offsets) 中的文章，回傳新的 (tokens, offsets)"""
+    lengths = np.diff(offsets)[rows]
+    new_offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=new_offsets[1:])
+    positions = np.repeat(offsets[:-1][rows] - new_offsets[:-1], lengths) + np.arange(new_offsets[-1])
+    return tokens[positions], new_offsets
+
+def merge_token_corpora(parts):
+    """
+    將多個 TokenCorpus 依序合併為一個。詞彙表的合併方式與 gensim Dictionary.merge_with 相同：
+    保留第一個詞彙表的 id，其餘詞彙表的新詞依其原 id 順序接在後面。
+    """
+    vocabulary = Vocabulary(parts[0].vocabulary.tokens)
+    token_blocks = [parts[0].tokens]
+    offset_blocks = [parts[0].offsets[:-1]]
+    base = parts[0].offsets[-1]
+    for part in parts[1:]:
+        id_map = np.asarray(vocabulary.merge(part.vocabulary.tokens), dtype=np.int32)
+        token_blocks.append(id_map[part.tokens])
+        offset_blocks.append(part.offsets[:-1] + base)
+        base += part.offsets[-1]
+    offsets = np.concatenate(offset_blocks + [np.asarray([base], dtype=np.int64)])
+    return TokenCorpus(vocabulary, np.concatenate(token_blocks), offsets)
+
+
+# --- 2. 詞彙過濾與詞袋 ---
+
+def filter_extremes_ids(document_frequencies, num_docs, no_below=5, no_above=0.5, keep_n=100000):
+    """
+    與 gensim Dictionary.filter_extremes 相同的規則：保留出現在 no_below 篇以上、且不超過 no_above 比例文章中的詞，
+    再依文件頻率 (同頻率時依 id) 保留前 keep_n 個。
+
+    :return: (ndarray) 保留的詞 id，由小到大排列；其位置即過濾並重新編號後的新 id。
+    """
+    no_above_abs = int(no_above * num_docs)
+    good_ids = np.flatnonzero((document_frequencies >= no_below) & (document_frequencies <= no_above_abs))
+    if keep_n is not None and len(good_ids) > keep_n:
+        order = np.argsort(-document_frequencies[good_ids], kind='stable')
+        good_ids = np.sort(good_ids[order[:keep_n]])
+    return good_ids
+
+def remap_columns(matrix, id_map, num_columns):
+    """
+    依 id_map (舊欄 id -> 新欄 id，-1 表示丟棄) 轉換文章 × 詞矩陣的欄，回傳欄位已排序的新 csr_matrix。
+    """
+    coo = matrix.tocoo()
+    new_columns = id_map[coo.col]
+    keep = new_columns >= 0
+    remapped = sparse.csr_matrix((coo.data[keep], (coo.row[keep], new_columns[keep])),
+                                 shape=(matrix.shape[0], num_columns))
+    remapped.sort_indices()
+    return remapped
+
+
+class BowCorpus:
+    """
+    以文章 × 詞 csr_matrix 為底的 gensim 詞袋語料庫，可重複走訪，每篇產生與 doc2bow 相同的 [(詞 id, 次數)]。
+    """
+
+    def __init__(self, matrix):
+        self.matrix = matrix
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    def __getitem__(self, i):
+        start, end = self.matrix.indptr[i], self.matrix.indptr[i + 1]
+        return list(zip(self.matrix.indices[start:end].tolist(), self.matrix.data[start:end].tolist()))
+
+    def __iter__(self):
+        indptr = self.matrix.indptr
+        indices = self.matrix.indices
+        data = self.matrix.data
+        for start, end in zip(indptr[:-1].tolist(), indptr[1:].tolist()):
+            yield list(zip(indices[start:end].tolist(), data[start:end].tolist()))
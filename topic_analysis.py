@@ -1,11 +1,23 @@
+import hashlib
+import os
 import re
+from multiprocessing import Pool
 import pandas as pd
 import jieba
-from gensim import corpora, models
+from gensim import corpora, models, utils
 from opencc import OpenCC
-from collections import Counter
 import numpy as np
 
+from checkpoint import config_fingerprint
+from corpus_cache import CACHE_DIR, load_corpus
+from dedup import DEDUP_COLUMNS, NearDuplicateIndex, drop_near_duplicates, report_dedup
+from lda_store import MODEL_DIR, LdaModelStore
+from ptt_reader import board_name_from_path
+from run_report import finish_run, stage, start_run
+from token_cache import TokenCache, preprocessing_fingerprint, text_key
+from topic_backends import BACKEND_LABELS, LDA_CHUNK_SIZE, SklearnTopicModel, corpus_matrix
+from token_corpus import BowCorpus, TokenCorpusBuilder, filter_extremes_ids, merge_token_corpora, remap_columns
+
 # --- 1. 設定與資料載入 ---
 
 # 檔案路徑 (現在會對列表中每個檔案單獨分析，然後再合併分析)
@@ -16,6 +28,44 @@ NUM_TOPICS = 5      # 探勘5個主題
 PASSES = 15         # 迭代次數
 RANDOM_STATE = 42   # 隨機種子
 
+# 主題模型後端：'gensim' (LdaMulticore)、'sklearn-batch'、'sklearn-online' (scikit-learn LDA) 或 'nmf'
+TOPIC_BACKEND = 'gensim'
+LDA_WORKERS = 4     # gensim 的 workers 與 scikit-learn LDA 的 n_jobs
+
+# 前處理設定
+OPENCC_PROFILE = 's2twp'    # OpenCC 簡轉繁設定檔
+USE_TOKEN_CACHE = True      # 是否將斷詞結果快取到磁碟，調整 LDA 參數時可跳過前處理
+PREPROCESS_WORKERS = os.cpu_count() or 1   # 前處理使用的行程數 (1 表示不平行化)
+PREPROCESS_CHUNK_SIZE = 500                # 每個工作單位包含的文章數
+
+# 預建含自定義詞彙的 Jieba 詞典與其前綴詞典快取，啟動時不必逐一 add_word
+USE_PREBUILT_JIEBA_DICT = True
+JIEBA_DICT_DIR = os.path.join(CACHE_DIR, 'jieba')
+
+# 是否先移除跨版面的近似重複文章 (轉貼、複製貼上的新聞稿會讓主題偏向重複的文字)
+DEDUP_POSTS = False
+
+# 斷詞結果每 PREPROCESS_BATCH_SIZE 篇轉為詞 id 陣列 (token_corpus.TokenCorpus) 後即釋放，不保留詞列表
+PREPROCESS_BATCH_SIZE = 20000
+
+# 串流模式：過濾後的詞袋語料庫序列化為磁碟上的 Matrix Market 檔 (gensim MmCorpus)，訓練與推論時逐篇讀取
+STREAM_CORPUS = False
+CORPUS_DIR = os.path.join(CACHE_DIR, 'lda_corpus')
+
+# 主題推論：每批推論的文章數，以及是否將「文章 × 主題」權重矩陣連同版面與發文時間存檔
+INFERENCE_CHUNK_SIZE = 2000
+SAVE_DOC_TOPICS = True
+TOPIC_OUTPUT_DIR = 'topic_outputs'
+
+# topic_documents 使用的文章表欄位 (load_corpus 的 columns)
+TOPIC_COLUMNS = ['board', 'timestamp', 'body', 'pushes']
+
+# 模型保存與增量更新：載入上次各來源的模型與詞典，只以新文章進行線上更新 (詞彙沿用既有詞典)。
+# 需要重建詞彙或完整重新訓練時，將 FORCE_RETRAIN 設為 True
+PERSIST_MODELS = True
+FORCE_RETRAIN = False
+UPDATE_PASSES = 1   # 線上更新時對新文章的迭代次數
+
 # 建立繁體中文停用詞列表
 def get_stopwords():
     # ... (此處省略您提供的完整停用詞列表，直接使用)
@@ -106,7 +156,7 @@ def get_stopwords():
     }
 
 # 建立自定義詞典
-def setup_jieba():
+def get_custom_words():
     # ... (此處省略您提供的完整 jieba 設定，直接使用)
     highly_relevant_synonyms = {
         "王鴻薇": ["鴻薇", "落跑議員"], "李彥秀": ["彥秀"], "羅智強": ["智強", "強哥", "小強"],
@@ -164,175 +214,638 @@ def setup_jieba():
     for category in all_keyword_lists:
         for keyword in category:
             all_custom_words.add(keyword)
-    print(f"開始將 {len(all_custom_words)} 個獨特的自定義詞彙加入 Jieba 詞典...")
+    return all_custom_words
+
+_jieba_ready = False
+
+def jieba_dictionary_path(custom_words):
+    """預建 Jieba 詞典檔的路徑，以自定義詞彙與 jieba 版本計算指紋"""
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(jieba.__version__.encode('utf-8'))
+    digest.update('\n'.join(sorted(custom_words)).encode('utf-8'))
+    return os.path.join(JIEBA_DICT_DIR, f"dict-{digest.hexdigest()}.txt")
+
+def build_jieba_dictionary(custom_words, path):
+    """
+    將 jieba 內建詞典與自定義詞彙寫成一個完整詞典檔。自定義詞彙依排序逐一以 add_word 的預設頻率
+    (suggest_freq) 加入，產生的前綴詞典與在內建詞典上逐一 add_word 相同。
+    詞典檔以空白分隔欄位，含空白的詞彙 (例如 'David Wu') 改記錄於 path + '.extra'，載入後再以相同頻率加入。
+    """
+    tokenizer = jieba.Tokenizer()
+    tokenizer.initialize()
+    lines, extra_lines = [], []
+    for word in sorted(custom_words):
+        tokenizer.add_word(word)
+        if any(ch.isspace() for ch in word):
+            extra_lines.append(f"{word}\t{tokenizer.FREQ[word]}\n")
+        else:
+            lines.append(f"{word} {tokenizer.FREQ[word]}\n")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.extra', 'w', encoding='utf-8') as f:
+        f.writelines(extra_lines)
+    # 詞典檔最後才寫入完成，存在即表示 .extra 也已就緒
+    tmp_path = path + '.tmp'
+    with jieba.get_dict_file() as src, open(tmp_path, 'wb') as dst:
+        content = src.read()
+        dst.write(content if content.endswith(b'\n') else content + b'\n')
+        dst.write(''.join(lines).encode('utf-8'))
+    os.replace(tmp_path, path)
+
+def load_jieba_extra_words(path):
+    """讀取 build_jieba_dictionary 另存的含空白詞彙，回傳 [(詞彙, 頻率)]"""
+    extra_path = path + '.extra'
+    if not os.path.exists(extra_path):
+        return []
+    with open(extra_path, 'r', encoding='utf-8') as f:
+        return [(word, int(freq)) for word, freq in (line.rstrip('\n').rsplit('\t', 1) for line in f if line.strip())]
+
+def setup_jieba(custom_words=None, verbose=True):
+    global _jieba_ready
+    all_custom_words = get_custom_words() if custom_words is None else custom_words
+    if USE_PREBUILT_JIEBA_DICT:
+        # 使用已含自定義詞彙的詞典檔；jieba 會將其前綴詞典快取於 JIEBA_DICT_DIR，之後啟動直接載入快取
+        path = jieba_dictionary_path(all_custom_words)
+        if not os.path.exists(path):
+            if verbose:
+                print(f"正在建立含 {len(all_custom_words)} 個自定義詞彙的 Jieba 詞典 (只需建立一次)...")
+            build_jieba_dictionary(all_custom_words, path)
+        jieba.dt.tmp_dir = JIEBA_DICT_DIR
+        jieba.set_dictionary(path)
+        jieba.initialize()
+        for word, freq in load_jieba_extra_words(path):
+            jieba.add_word(word, freq)
+        _jieba_ready = True
+        return
+    if verbose:
+        print(f"開始將 {len(all_custom_words)} 個獨特的自定義詞彙加入 Jieba 詞典...")
     for word in sorted(list(all_custom_words)):
         jieba.add_word(word)
+    _jieba_ready = True
+
+def build_tokenizer(extra_words=()):
+    """
+    建立獨立的 jieba.Tokenizer：詞典與 setup_jieba 相同 (含自定義詞彙)，再加入 extra_words。
+    用於需要額外詞彙 (例如情感詞典) 的斷詞，不會改變主題分析使用的全域詞典與斷詞快取。
+    """
+    all_custom_words = get_custom_words()
+    if USE_PREBUILT_JIEBA_DICT:
+        path = jieba_dictionary_path(all_custom_words)
+        if not os.path.exists(path):
+            build_jieba_dictionary(all_custom_words, path)
+        tokenizer = jieba.Tokenizer(path)
+        tokenizer.tmp_dir = JIEBA_DICT_DIR
+        tokenizer.initialize()
+        for word, freq in load_jieba_extra_words(path):
+            tokenizer.add_word(word, freq)
+    else:
+        tokenizer = jieba.Tokenizer()
+        for word in sorted(all_custom_words):
+            tokenizer.add_word(word)
+    for word in sorted(extra_words):
+        tokenizer.add_word(word)
+    return tokenizer
+
+def ensure_jieba():
+    """尚未載入自定義詞典時才執行 setup_jieba (全部命中斷詞快取時可完全跳過)"""
+    if not _jieba_ready:
+        setup_jieba()
 
 # --- 2. 資料前處理 ---
 
-def parse_ptt_file(file_path):
-    """解析 PTT 原始 txt 檔案格式"""
+DOC_META_COLUMNS = ['board', 'timestamp', 'post_index']
+
+def topic_documents(corpus):
+    """
+    由 load_corpus 的文章表取出主題分析用的文本 (內文加推文)，
+    回傳 (文本列表, 與文本對齊的 DataFrame[board, timestamp, post_index])；post_index 為文章表中的列索引。
+    """
+    all_texts = []
+    for body, pushes in zip(corpus['body'], corpus['pushes']):
+        full_text = body
+        if pushes is not None:
+            full_text += " " + pushes
+        all_texts.append(full_text)
+    doc_meta = corpus[['board', 'timestamp']].reset_index(drop=True)
+    doc_meta['post_index'] = corpus.index.to_numpy()
+    return all_texts, doc_meta
+
+def parse_ptt_file(file_path, with_meta=False, dedup_index=None):
+    """
+    解析 PTT 原始 txt 檔案格式。
+    with_meta 為 True 時回傳 (文本列表, 與文本對齊的 DataFrame[board, timestamp, post_index])。
+    dedup_index 不為 None 時略過與索引中文章近似重複的文章。
+    """
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        posts = content.split('======================================================================')
-        all_texts = []
-        for post in posts:
-            post = post.strip()
-            if not post:
-                continue
-            parts = re.split(r'※ 發信站: 批踢踢實業坊\(ptt\.cc\)', post)
-            main_content = parts[0]
-            main_content = re.sub(r'^作者.*\n', '', main_content, flags=re.MULTILINE)
-            main_content = re.sub(r'^看板.*\n', '', main_content, flags=re.MULTILINE)
-            main_content = re.sub(r'^標題.*\n', '', main_content, flags=re.MULTILINE)
-            main_content = re.sub(r'^時間.*\n', '', main_content, flags=re.MULTILINE)
-            main_content = re.sub(r': ※ 引述.*', '', main_content)
-            full_text = main_content.strip()
-            if len(parts) > 1:
-                comments_text = ' '.join(re.findall(r'[:→推噓]\s.*', parts[1]))
-                full_text += " " + comments_text
-            all_texts.append(full_text)
+        corpus = load_corpus(file_path, columns=TOPIC_COLUMNS)
+        if dedup_index is not None:
+            corpus, _ = drop_near_duplicates(corpus, dedup_index, board_name_from_path(file_path), mode='collapse')
+        all_texts, doc_meta = topic_documents(corpus)
+        if with_meta:
+            return all_texts, doc_meta
         return all_texts
     except FileNotFoundError:
         print(f"錯誤：找不到檔案 {file_path}。請確認檔案名稱與路徑是否正確。")
-        return []
     except Exception as e:
         print(f"讀取或解析檔案 {file_path} 時發生錯誤: {e}")
-        return []
+    if with_meta:
+        return [], pd.DataFrame(columns=DOC_META_COLUMNS)
+    return []
 
-def preprocess_text(text, stopwords, cc):
-    """文本清洗、簡轉繁、斷詞、移除停用詞"""
+def clean_text(text, cc):
+    """移除網址、將非中英文字元 (標點、數字) 換成單一空白並簡轉繁，為斷詞前的清洗"""
     text = re.sub(r'https?://\S+', '', text)
     text = re.sub(r'[^a-zA-Z\u4e00-\u9fa5]+', ' ', text)
     text = re.sub(r'\s+', ' ', text).strip()
-    text = cc.convert(text)
-    words = jieba.lcut(text)
+    return cc.convert(text)
+
+def preprocess_text(text, stopwords, cc):
+    """文本清洗、簡轉繁、斷詞、移除停用詞"""
+    words = jieba.lcut(clean_text(text, cc))
     words = [word for word in words if word not in stopwords and len(word) > 1]
     return words
 
+# 各前處理子行程的共享資源，由 _init_preprocess_worker 初始化一次
+_worker_stopwords = None
+_worker_cc = None
+
+def _init_preprocess_worker(stopwords, opencc_profile):
+    global _worker_stopwords, _worker_cc
+    if not _jieba_ready:
+        setup_jieba(verbose=False)
+    _worker_stopwords = stopwords
+    _worker_cc = OpenCC(opencc_profile)
+
+def _preprocess_chunk(texts):
+    return [preprocess_text(text, _worker_stopwords, _worker_cc) for text in texts]
+
+def preprocess_texts_parallel(texts, stopwords, cc, workers=PREPROCESS_WORKERS, chunk_size=PREPROCESS_CHUNK_SIZE):
+    """
+    以多行程執行 preprocess_text，輸出順序與輸入相同。
+    文章數不足一個工作單位或 workers <= 1 時直接在主行程處理。
+    """
+    # 先在主行程載入詞典；fork 模式下子行程可直接沿用
+    ensure_jieba()
+    if workers <= 1 or len(texts) <= chunk_size:
+        return [preprocess_text(text, stopwords, cc) for text in texts]
+
+    chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+    workers = min(workers, len(chunks))
+    processed = []
+    with Pool(workers, initializer=_init_preprocess_worker, initargs=(stopwords, OPENCC_PROFILE)) as pool:
+        for chunk_result in pool.imap(_preprocess_chunk, chunks):
+            processed.extend(chunk_result)
+    return processed
+
+def preprocess_documents(documents, stopwords, cc, token_cache=None):
+    """
+    對文本列表執行 preprocess_text。有快取時只處理快取中沒有的文章並加入快取，
+    回傳各文章在快取詞彙表中的詞 id 陣列 (見 TokenCache)，不還原成詞列表。
+    """
+    if token_cache is None:
+        return preprocess_texts_parallel(documents, stopwords, cc)
+
+    keys = [text_key(doc) for doc in documents]
+    rows = token_cache.lookup(keys)
+    miss_indices = np.flatnonzero(rows < 0).tolist()
+    if miss_indices:
+        miss_results = preprocess_texts_parallel([documents[i] for i in miss_indices], stopwords, cc)
+        for i, words in zip(miss_indices, miss_results):
+            rows[i] = token_cache.add(keys[i], words)
+    print(f"  > 斷詞快取命中 {len(documents) - len(miss_indices)} 篇，新處理 {len(miss_indices)} 篇。")
+    return [token_cache.document_ids(row) for row in rows.tolist()]
+
+def iter_processed_docs(documents, stopwords, cc, token_cache=None, chunk_size=PREPROCESS_BATCH_SIZE, kept_indices=None):
+    """
+    分批前處理並逐篇產生非空的斷詞結果 (有快取時為快取詞彙表的詞 id 陣列)，同一時間只保留一批的結果。
+    kept_indices 不為 None 時，會依序附加被保留文章在 documents 中的索引。
+    """
+    for start in range(0, len(documents), chunk_size):
+        processed = preprocess_documents(documents[start:start + chunk_size], stopwords, cc, token_cache)
+        for offset, words in enumerate(processed):
+            if len(words):
+                if kept_indices is not None:
+                    kept_indices.append(start + offset)
+                yield words
+
 # --- 3. 核心分析函式 ---
 
-def run_lda_analysis(documents, source_name, stopwords, cc, num_topics, passes, random_state):
+def materialize_corpus(matrix, path=None):
     """
-    對給定的文檔列表執行完整的LDA分析並印出結果。
-    
-    :param documents: (list) 待分析的文本列表。
-    :param source_name: (str) 數據來源名稱，用於報告輸出。
-    :param stopwords: (set) 停用詞集合。
-    :param cc: (OpenCC) OpenCC 實例。
-    :param num_topics: (int) 要提取的主題數量。
-    :param passes: (int) LDA 訓練的迭代次數。
-    :param random_state: (int) 隨機種子。
+    將文章 × 詞矩陣包裝為 gensim 詞袋語料庫。path 為 None 時直接以記憶體中的 CSR 矩陣逐篇產生詞袋；
+    否則序列化為 MmCorpus 檔並回傳逐篇從磁碟讀取的語料庫。
     """
-    print("\n" + "="*80)
-    print(f"|| 開始分析來源: {source_name} ||")
-    print(f"|| 文章總數: {len(documents)} 篇 ||")
-    print("="*80)
+    corpus = BowCorpus(matrix)
+    if path is None:
+        return corpus
+    corpora.MmCorpus.serialize(path, corpus)
+    return corpora.MmCorpus(path)
 
-    if not documents:
-        print("\n錯誤：此來源沒有可供分析的文章，跳過此分析。")
-        return
+def build_raw_corpus(processed_docs, source_vocabulary=None):
+    """
+    建立未經 filter_extremes 的斷詞語料 (共用詞彙表 + int32 詞 id 陣列)，保留完整文件頻率以便後續合併。
+    processed_docs 只會被走訪一次，每篇轉為詞 id 後即不再保留，可以是產生器。
 
-    # 步驟 1: 文本前處理
-    print("\n[步驟 1/4] 正在進行文本前處理...")
-    processed_docs = [preprocess_text(doc, stopwords, cc) for doc in documents]
-    processed_docs = [doc for doc in processed_docs if doc] # 確保沒有空文檔
-    if not processed_docs:
-        print("\n錯誤：前處理後沒有剩下任何有效詞語，無法進行分析。")
-        return
-    print("  > 前處理完成。")
+    :param source_vocabulary: (Vocabulary) 不為 None 時 processed_docs 為此詞彙表的詞 id 陣列 (斷詞快取)，
+                              直接轉換 id 而不經過詞列表。
+    """
+    builder = TokenCorpusBuilder()
+    for doc in processed_docs:
+        if source_vocabulary is None:
+            builder.add(doc)
+        else:
+            builder.add_ids(doc, source_vocabulary)
+    return builder.build()
 
-    # 步驟 2: 建立詞袋與語料庫
-    print("\n[步驟 2/4] 正在建立詞袋與語料庫...")
-    dictionary = corpora.Dictionary(processed_docs)
-    dictionary.filter_extremes(no_below=10, no_above=0.6) # 過濾極端詞彙
-    corpus = [dictionary.doc2bow(doc) for doc in processed_docs]
-    
-    if not corpus or not any(corpus):
-        print("\n錯誤：建立詞袋後，語料庫為空。可能是篩選條件過於嚴格或文本內容過短。")
-        return
-    print("  > 詞袋與語料庫建立完成。")
+def build_dictionary(raw_corpus, keep_ids):
+    """
+    以保留的詞 id (由小到大) 建立 gensim Dictionary，內容與對完整詞典執行 filter_extremes 的結果相同，
+    供模型輸出關鍵詞與模型存檔使用。
+    """
+    tokens = raw_corpus.vocabulary.tokens
+    dictionary = corpora.Dictionary()
+    dictionary.token2id = {tokens[old_id]: new_id for new_id, old_id in enumerate(keep_ids.tolist())}
+    dictionary.dfs = dict(enumerate(raw_corpus.document_frequencies()[keep_ids].tolist()))
+    dictionary.cfs = dict(enumerate(raw_corpus.collection_frequencies()[keep_ids].tolist()))
+    # filter_extremes 不會更新整體統計，這裡同樣保留過濾前的值
+    dictionary.num_docs = raw_corpus.num_docs
+    dictionary.num_pos = len(raw_corpus.tokens)
+    dictionary.num_nnz = raw_corpus.doc_term_matrix().nnz
+    return dictionary
+
+def iter_remapped(corpus, id_map):
+    """依 id_map (舊 id -> 新 id) 逐篇轉換詞袋，不在對照表中的詞會被丟棄"""
+    for doc in corpus:
+        yield sorted((id_map[word_id], count) for word_id, count in doc if word_id in id_map)
+
+def filter_corpus(raw_corpus, no_below=10, no_above=0.6, path=None):
+    """
+    過濾極端詞彙並重新編號，以陣列運算直接轉換文章 × 詞矩陣的欄。
+    結果與先 filter_extremes 再 doc2bow 相同。path 不為 None 時輸出為 MmCorpus 檔。
+
+    :param raw_corpus: (TokenCorpus) build_raw_corpus 或 merge_raw_corpora 的結果。
+    :return: (tuple) (Dictionary, 詞袋語料庫)。
+    """
+    keep_ids = filter_extremes_ids(raw_corpus.document_frequencies(), raw_corpus.num_docs, no_below, no_above)
+    id_map = np.full(len(raw_corpus.vocabulary), -1, dtype=np.int64)
+    id_map[keep_ids] = np.arange(len(keep_ids))
+    matrix = remap_columns(raw_corpus.doc_term_matrix(), id_map, len(keep_ids))
+    return build_dictionary(raw_corpus, keep_ids), materialize_corpus(matrix, path)
+
+def merge_raw_corpora(raw_corpora):
+    """
+    依序合併多個未過濾的斷詞語料，詞彙表的合併方式與 Dictionary.merge_with 相同，
+    詞典內容與直接對全部文章建立 Dictionary 相同。
+    """
+    return merge_token_corpora(raw_corpora)
+
+def corpus_path(corpus_key):
+    """串流模式下回傳過濾後語料庫的 MmCorpus 檔路徑；非串流模式回傳 None"""
+    if not STREAM_CORPUS:
+        return None
+    os.makedirs(CORPUS_DIR, exist_ok=True)
+    return os.path.join(CORPUS_DIR, f"{corpus_key}.mm")
+
+def infer_doc_topics(lda_model, corpus, chunk_size=INFERENCE_CHUNK_SIZE):
+    """
+    分批推論整個語料庫的主題分佈，回傳 (文章數 × 主題數) 的矩陣，每列總和為 1。
+    語料庫只走訪一次，可以是磁碟上的 MmCorpus；scikit-learn 後端則對整個文章 × 詞矩陣一次推論。
+    """
+    if isinstance(lda_model, SklearnTopicModel):
+        return lda_model.doc_topics(corpus_matrix(corpus, len(lda_model.id2word)))
+    blocks = []
+    for chunk in utils.grouper(corpus, chunk_size):
+        gamma, _ = lda_model.inference(chunk)
+        blocks.append(gamma / gamma.sum(axis=1, keepdims=True))
+    if not blocks:
+        return np.zeros((0, lda_model.num_topics))
+    return np.vstack(blocks)
 
-    # 步驟 3: 訓練 LDA 模型
-    print("\n[步驟 3/4] 正在訓練 LDA 主題模型...")
-    lda_model = models.LdaMulticore(
+def save_doc_topics(doc_topics, doc_meta, corpus_key):
+    """將「文章 × 主題」權重矩陣連同版面、發文時間與主要主題存成 Parquet，便於與其他分析結果合併"""
+    df = doc_meta.reset_index(drop=True).copy()
+    df['dominant_topic'] = doc_topics.argmax(axis=1) + 1
+    for topic_id in range(doc_topics.shape[1]):
+        df[f'topic_{topic_id + 1}'] = doc_topics[:, topic_id]
+    os.makedirs(TOPIC_OUTPUT_DIR, exist_ok=True)
+    output_path = os.path.join(TOPIC_OUTPUT_DIR, f"doc_topics-{corpus_key}.parquet")
+    df.to_parquet(output_path, index=False)
+    print(f"  > 文章主題權重已儲存至 {output_path}")
+
+def fit_lda_model(dictionary, corpus, num_topics, passes, random_state):
+    """從頭訓練 gensim LDA 模型"""
+    return models.LdaMulticore(
         corpus=corpus,
         id2word=dictionary,
         num_topics=num_topics,
         random_state=random_state,
-        chunksize=100,
+        chunksize=LDA_CHUNK_SIZE,
         passes=passes,
         per_word_topics=True,
-        workers=4
+        workers=LDA_WORKERS
     )
-    print("  > 模型訓練完成。")
+
+def fit_topic_model(dictionary, corpus, num_topics, passes, random_state, backend=None):
+    """
+    依 backend (預設 TOPIC_BACKEND) 從頭訓練主題模型。scikit-learn 後端直接以語料庫的文章 × 詞 CSR 矩陣訓練，
+    回傳的 SklearnTopicModel 與 gensim 模型有相同的 num_topics 與 show_topic 介面。
+    """
+    backend = TOPIC_BACKEND if backend is None else backend
+    if backend == 'gensim':
+        return fit_lda_model(dictionary, corpus, num_topics, passes, random_state)
+    model = SklearnTopicModel(backend, dictionary, num_topics, passes, random_state, n_jobs=LDA_WORKERS)
+    return model.fit(corpus_matrix(corpus, len(dictionary)))
+
+def update_topic_model(lda_model, dictionary, corpus, new_docs):
+    """
+    以新文章的詞袋更新既有模型，回傳更新後的模型。
+    gensim 與 scikit-learn LDA 做線上更新；NMF 無法線上更新，改以整個語料庫重新訓練。
+    """
+    if not isinstance(lda_model, SklearnTopicModel):
+        lda_model.passes = UPDATE_PASSES
+        lda_model.update(new_docs)
+        return lda_model
+    if lda_model.supports_update:
+        return lda_model.update(corpus_matrix(new_docs, len(dictionary)))
+    print("  > NMF 不支援線上更新，以全部文章重新訓練。")
+    return fit_topic_model(dictionary, corpus, lda_model.num_topics, PASSES, RANDOM_STATE, lda_model.backend)
+
+def align_corpus(dictionary, corpus, target_dictionary, path=None):
+    """將以 dictionary 編號的詞袋轉為 target_dictionary 的 id，不在 target_dictionary 中的詞會被丟棄"""
+    id_map = {}
+    for word_id, token in dictionary.items():
+        target_id = target_dictionary.token2id.get(token)
+        if target_id is not None:
+            id_map[word_id] = target_id
+    if isinstance(corpus, BowCorpus):
+        id_array = np.full(len(dictionary), -1, dtype=np.int64)
+        id_array[list(id_map)] = list(id_map.values())
+        return materialize_corpus(remap_columns(corpus.matrix, id_array, len(target_dictionary)), path)
+    corpora.MmCorpus.serialize(path, iter_remapped(corpus, id_map))
+    return corpora.MmCorpus(path)
+
+def load_or_train_lda(dictionary, corpus, num_topics, passes, random_state, model_store=None, model_key=None, doc_keys=None):
+    """
+    步驟 3: 取得 LDA 模型。有既有模型時沿用其詞典，只以未訓練過的文章 (依 doc_keys 判斷) 線上更新；
+    否則 (或 FORCE_RETRAIN 為 True 時) 完整訓練。model_store 不為 None 時結果會寫回存檔。
+
+    :param doc_keys: (list) 與 corpus 對齊的文章內容雜湊。
+    :return: (tuple) (模型, 模型使用的詞典, 以該詞典編號的語料庫)。
+    """
+    saved = None
+    if model_store is not None and not FORCE_RETRAIN:
+        saved = model_store.load(model_key)
+
+    if saved is None:
+        print(f"\n[步驟 3/4] 正在訓練 {BACKEND_LABELS[TOPIC_BACKEND]} 主題模型...")
+        lda_model = fit_topic_model(dictionary, corpus, num_topics, passes, random_state)
+        if model_store is not None:
+            model_store.save(model_key, dictionary, lda_model, doc_keys)
+        print("  > 模型訓練完成。")
+        return lda_model, dictionary, corpus
+
+    saved_dictionary, lda_model, trained_keys = saved
+    model_corpus_path = os.path.join(CORPUS_DIR, f"{model_key}-model.mm") if STREAM_CORPUS else None
+    corpus = align_corpus(dictionary, corpus, saved_dictionary, model_corpus_path)
+    new_docs = [bow for bow, key in zip(corpus, doc_keys) if key not in trained_keys]
+    print(f"\n[步驟 3/4] 載入既有 {BACKEND_LABELS[TOPIC_BACKEND]} 模型，以 {len(new_docs)} 篇新文章進行線上更新...")
+    if new_docs:
+        lda_model = update_topic_model(lda_model, saved_dictionary, corpus, new_docs)
+        model_store.save(model_key, saved_dictionary, lda_model, trained_keys.union(doc_keys))
+        print("  > 模型更新完成。")
+    else:
+        print("  > 沒有新文章，直接沿用既有模型。")
+    return lda_model, saved_dictionary, corpus
+
+def train_and_report_lda(dictionary, corpus, source_name, num_topics, passes, random_state, model_store=None, model_key=None, doc_keys=None):
+    """
+    步驟 3-4: 訓練 (或載入並更新) LDA 模型並印出主題關鍵詞與佔比。
+    回傳「文章 × 主題」權重矩陣 (列順序與 corpus 相同)，無法訓練時回傳 None。
+    """
+    if not corpus or not any(corpus):
+        print("\n錯誤：建立詞袋後，語料庫為空。可能是篩選條件過於嚴格或文本內容過短。")
+        return None
+    print("  > 詞袋與語料庫建立完成。")
+
+    with stage('train_lda', board=model_key) as record:
+        lda_model, dictionary, corpus = load_or_train_lda(
+            dictionary, corpus, num_topics, passes, random_state, model_store, model_key, doc_keys
+        )
+        record.items = len(corpus)
 
     # 步驟 4: 顯示結果
     print("\n" + "---" * 10 + f" {source_name} 分析結果 " + "---" * 10)
     
     # 顯示主題關鍵詞
     print(f"\n共識別出 {num_topics} 個主題，每個主題的前15個關鍵詞如下：\n")
-    topics = lda_model.print_topics(num_words=15)
-    for i, topic in enumerate(topics):
-        topic_num, words_str = topic
-        words = re.findall(r'"(.*?)"', words_str)
+    for i in range(lda_model.num_topics):
+        words = [word for word, _ in lda_model.show_topic(i, topn=15)]
         print(f"主題 {i+1}: {'、'.join(words)}")
         
     # 計算並顯示每個主題的佔比
     print("\n--- 主題佔比分析 ---")
-    doc_topics = [lda_model.get_document_topics(doc, minimum_probability=0.0) for doc in corpus]
+    with stage('infer_topics', board=model_key) as record:
+        doc_topics = infer_doc_topics(lda_model, corpus)
+        record.items = len(doc_topics)
     
-    dominant_topics = []
-    if doc_topics:
-        for doc_topic in doc_topics:
-            if doc_topic:
-                dominant_topic = sorted(doc_topic, key=lambda x: x[1], reverse=True)[0][0]
-                dominant_topics.append(dominant_topic)
-    
-    if dominant_topics:
-        topic_counts = Counter(dominant_topics)
-        total_docs_in_model = len(dominant_topics)
+    if len(doc_topics):
+        topic_counts = np.bincount(doc_topics.argmax(axis=1), minlength=num_topics)
+        total_docs_in_model = len(doc_topics)
         print("此數據顯示各主題作為文章主要議題的百分比。\n")
-        for topic_id, count in sorted(topic_counts.items()):
+        for topic_id in np.flatnonzero(topic_counts):
+            count = topic_counts[topic_id]
             percentage = (count / total_docs_in_model) * 100
             print(f"主題 {topic_id + 1}: 佔比 {percentage:.2f}% ({count}/{total_docs_in_model} 篇文章)")
     else:
         print("無法計算主題佔比，因為沒有文章能明確對應到任一主題。")
     print("---" * 10 + " 分析結束 " + "---" * 10 + "\n")
+    return doc_topics
+
+def print_source_header(source_name, num_documents):
+    print("\n" + "="*80)
+    print(f"|| 開始分析來源: {source_name} ||")
+    print(f"|| 文章總數: {num_documents} 篇 ||")
+    print("="*80)
+
+def run_lda_analysis(documents, source_name, stopwords, cc, num_topics, passes, random_state, token_cache=None, corpus_key='corpus', doc_meta=None, model_store=None):
+    """
+    對給定的文檔列表執行完整的LDA分析並印出結果。
+    
+    :param documents: (list) 待分析的文本列表。
+    :param source_name: (str) 數據來源名稱，用於報告輸出。
+    :param stopwords: (set) 停用詞集合。
+    :param cc: (OpenCC) OpenCC 實例。
+    :param num_topics: (int) 要提取的主題數量。
+    :param passes: (int) LDA 訓練的迭代次數。
+    :param random_state: (int) 隨機種子。
+    :param token_cache: (TokenCache) 斷詞快取，None 表示不使用。
+    :param corpus_key: (str) 串流模式下語料庫與輸出檔案的名稱。
+    :param doc_meta: (DataFrame) 與 documents 對齊的文章資訊 (版面、發文時間)，用於輸出文章主題權重。
+    :param model_store: (LdaModelStore) 模型存檔，None 表示每次都重新訓練且不保存。
+    :return: (tuple) (未過濾的斷詞語料 TokenCorpus, 保留文章的 doc_meta, 保留文章的內容雜湊)，供合併分析沿用；
+             無法分析時回傳 None。
+    """
+    print_source_header(source_name, len(documents))
+
+    if not documents:
+        print("\n錯誤：此來源沒有可供分析的文章，跳過此分析。")
+        return None
+
+    source_part = build_source_corpus(documents, stopwords, cc, token_cache, corpus_key, doc_meta)
+    if source_part is None:
+        return None
+    raw_corpus, kept_meta, doc_keys = source_part
+    with stage('filter_extremes', board=corpus_key):
+        dictionary, corpus = filter_corpus(raw_corpus, path=corpus_path(corpus_key)) # 過濾極端詞彙
+
+    doc_topics = train_and_report_lda(dictionary, corpus, source_name, num_topics, passes, random_state,
+                                      model_store, corpus_key, doc_keys)
+    if SAVE_DOC_TOPICS and doc_topics is not None and kept_meta is not None:
+        save_doc_topics(doc_topics, kept_meta, corpus_key)
+    return source_part
+
+def build_source_corpus(documents, stopwords, cc, token_cache=None, corpus_key='corpus', doc_meta=None):
+    """
+    步驟 1-2: 分批前處理並將斷詞結果轉為詞 id 陣列，建立未過濾的斷詞語料與文章 × 詞矩陣。
+
+    :return: (tuple) (TokenCorpus, 保留文章的 doc_meta, 保留文章的內容雜湊)；沒有有效詞語時回傳 None。
+    """
+    # 步驟 1: 文本前處理 (每批斷詞後立即轉為詞 id，不保留詞列表)
+    print("\n[步驟 1/4] 正在進行文本前處理...")
+    kept_indices = []
+    with stage('preprocess', board=corpus_key, items=len(documents)):
+        processed_docs = iter_processed_docs(documents, stopwords, cc, token_cache, kept_indices=kept_indices)
+        raw_corpus = build_raw_corpus(processed_docs, token_cache.vocabulary if token_cache is not None else None) # 空文檔不會被加入
+    if token_cache is not None:
+        with stage('save_token_cache', board=corpus_key):
+            token_cache.save()
+    if raw_corpus.num_docs == 0:
+        print("\n錯誤：前處理後沒有剩下任何有效詞語，無法進行分析。")
+        return None
+    print(f"  > 前處理完成：{raw_corpus.num_docs} 篇文章、{len(raw_corpus.tokens)} 個詞、"
+          f"{len(raw_corpus.vocabulary)} 個不重複詞 (詞 id 陣列 {raw_corpus.nbytes / 2**20:.1f} MB)。")
+
+    # 步驟 2: 建立詞袋與語料庫
+    print("\n[步驟 2/4] 正在建立詞袋與語料庫...")
+    with stage('build_bow', board=corpus_key, items=raw_corpus.num_docs):
+        raw_corpus.doc_term_matrix()
+    kept_meta = doc_meta.iloc[kept_indices].reset_index(drop=True) if doc_meta is not None else None
+    doc_keys = [text_key(documents[i]) for i in kept_indices]
+    return raw_corpus, kept_meta, doc_keys
+
+def run_combined_lda_analysis(raw_parts, source_name, num_documents, num_topics, passes, random_state, corpus_key='combined', model_store=None):
+    """
+    沿用各版面的前處理與詞袋結果進行合併分析：合併詞典並轉換 id 後重新過濾，只需重新訓練模型。
+
+    :param raw_parts: (list) 各版面 run_lda_analysis 回傳的 (TokenCorpus, doc_meta, 文章雜湊)。
+    :param num_documents: (int) 各版面文章總數，用於報告輸出。
+    :param model_store: (LdaModelStore) 模型存檔，None 表示每次都重新訓練且不保存。
+    """
+    print_source_header(source_name, num_documents)
+
+    if not raw_parts:
+        print("\n錯誤：此來源沒有可供分析的文章，跳過此分析。")
+        return
+
+    print("\n[步驟 1/4] 沿用各版面的前處理結果。")
+
+    # 步驟 2: 合併詞典與語料庫
+    print("\n[步驟 2/4] 正在合併各版面的詞典與語料庫...")
+    with stage('merge_corpora', board=corpus_key) as record:
+        raw_corpus = merge_raw_corpora([part for part, _, _ in raw_parts])
+        record.items = raw_corpus.num_docs
+    with stage('filter_extremes', board=corpus_key):
+        dictionary, corpus = filter_corpus(raw_corpus, path=corpus_path(corpus_key)) # 過濾極端詞彙
+    metas = [meta for _, meta, _ in raw_parts]
+    kept_meta = pd.concat(metas, ignore_index=True) if all(meta is not None for meta in metas) else None
+    doc_keys = [key for _, _, keys in raw_parts for key in keys]
+
+    doc_topics = train_and_report_lda(dictionary, corpus, source_name, num_topics, passes, random_state,
+                                      model_store, corpus_key, doc_keys)
+    if SAVE_DOC_TOPICS and doc_topics is not None and kept_meta is not None:
+        save_doc_topics(doc_topics, kept_meta, corpus_key)
 
 
 # --- 4. 主程式執行流程 ---
 
-def main():
-    print("--- PTT 輿論主題模型分析 ---")
-    
-    # 初始化共享資源
-    print("\n[初始化] 正在設定 Jieba 自定義詞典...")
-    setup_jieba()
+def init_topic_resources(dedup_index=None):
+    """
+    建立停用詞、OpenCC、斷詞快取與模型存檔 (依設定可為 None)，回傳 (stopwords, cc, token_cache, model_store)。
+    Jieba 自定義詞典延後到實際需要斷詞時才載入。
+
+    :param dedup_index: (NearDuplicateIndex) 文章去重使用的索引；其設定計入模型指紋，
+                        去重與否 (或門檻) 不同時不會沿用彼此的模型。
+    """
     stopwords = get_stopwords()
-    cc = OpenCC('s2twp')
+    cc = OpenCC(OPENCC_PROFILE)
+    fingerprint = preprocessing_fingerprint(get_custom_words(), stopwords, OPENCC_PROFILE)
+    token_cache = TokenCache(fingerprint) if USE_TOKEN_CACHE else None
+    model_store = None
+    if PERSIST_MODELS:
+        model_parts = ['lda', fingerprint, NUM_TOPICS]
+        if dedup_index is not None:
+            model_parts.append(('dedup', dedup_index.threshold, dedup_index.num_perm, dedup_index.shingle_size,
+                                dedup_index.min_chars, dedup_index.seed))
+        model_store = LdaModelStore(MODEL_DIR, config_fingerprint(*model_parts), TOPIC_BACKEND)
+    return stopwords, cc, token_cache, model_store
+
+def run_topic_analyses(board_documents, num_boards, dedup_index=None):
+    """
+    對每個版面獨立進行 LDA 分析，再沿用各版面的詞袋結果進行合併分析。
+
+    :param board_documents: (iterable) (檔案路徑, 文本列表, doc_meta)，可為逐一解析的產生器。
+    :param num_boards: (int) 版面數，只有一個版面時不做合併分析。
+    :param dedup_index: (NearDuplicateIndex) 文章已先以此索引去重時傳入 (見 init_topic_resources)。
+    """
+    # 初始化共享資源
+    print("\n[初始化] 正在準備前處理設定...")
+    stopwords, cc, token_cache, model_store = init_topic_resources(dedup_index)
 
     # --- 針對每個版面獨立進行 LDA 分析 ---
     print("\n[第一階段] 開始對每個版面進行獨立分析...")
-    all_docs_for_combined_analysis = []
-    for path in FILE_PATHS:
-        docs = parse_ptt_file(path)
+    raw_parts_for_combined_analysis = []
+    num_docs_for_combined_analysis = 0
+    for path, docs, doc_meta in board_documents:
         if docs:
-            run_lda_analysis(docs, f"單獨版面: {path}", stopwords, cc, NUM_TOPICS, PASSES, RANDOM_STATE)
-            all_docs_for_combined_analysis.extend(docs)
+            raw_part = run_lda_analysis(docs, f"單獨版面: {path}", stopwords, cc, NUM_TOPICS, PASSES, RANDOM_STATE, token_cache, corpus_key=board_name_from_path(path), doc_meta=doc_meta, model_store=model_store)
+            num_docs_for_combined_analysis += len(docs)
+            if raw_part is not None:
+                raw_parts_for_combined_analysis.append(raw_part)
         else:
             print(f"\n警告：檔案 {path} 為空或讀取失敗，將在合併分析中跳過此檔案。")
 
-    # --- 針對所有版面合併進行 LDA 分析 ---
-    if len(FILE_PATHS) > 1 and all_docs_for_combined_analysis:
+    # --- 針對所有版面合併進行 LDA 分析 (沿用各版面的詞袋結果) ---
+    if num_boards > 1 and num_docs_for_combined_analysis:
         print("\n[第二階段] 開始對所有版面進行合併分析...")
-        run_lda_analysis(all_docs_for_combined_analysis, "所有版面合併", stopwords, cc, NUM_TOPICS, PASSES, RANDOM_STATE)
-    elif len(FILE_PATHS) <= 1:
+        run_combined_lda_analysis(raw_parts_for_combined_analysis, "所有版面合併", num_docs_for_combined_analysis, NUM_TOPICS, PASSES, RANDOM_STATE, model_store=model_store)
+    elif num_boards <= 1:
          print("\n提示：只有一個檔案，無需進行合併分析。")
     else:
         print("\n錯誤：所有檔案均無法讀取，無法進行合併分析。")
-        
+
+def iter_board_documents(file_paths, dedup_index=None, dedup_counts=None):
+    """
+    逐一解析檔案，產生 (檔案路徑, 文本列表, doc_meta)。
+    dedup_index 不為 None 時略過近似重複的文章，並將各版面的 (去重前文章數, 重複篇數) 記入 dedup_counts。
+    """
+    for path in file_paths:
+        with stage('parse', board=path) as record:
+            duplicates_before = dedup_index.num_duplicates if dedup_index is not None else 0
+            docs, doc_meta = parse_ptt_file(path, with_meta=True, dedup_index=dedup_index)
+            record.items = len(docs)
+        if dedup_index is not None and dedup_counts is not None:
+            num_removed = dedup_index.num_duplicates - duplicates_before
+            dedup_counts[board_name_from_path(path)] = (len(docs) + num_removed, num_removed)
+        yield path, docs, doc_meta
+
+def main():
+    print("--- PTT 輿論主題模型分析 ---")
+    start_run('topic')
+    dedup_index = NearDuplicateIndex() if DEDUP_POSTS else None
+    dedup_counts = {}
+    run_topic_analyses(iter_board_documents(FILE_PATHS, dedup_index, dedup_counts), len(FILE_PATHS), dedup_index)
+    if dedup_index is not None:
+        report_dedup(dedup_counts, dedup_index)
+    finish_run()
     print("\n--- 所有分析任務已完成 ---")
 
 
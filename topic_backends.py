@@ -0,0 +1,120 @@
+"""
+主題模型後端：gensim LdaMulticore 之外，以 scikit-learn 的 LatentDirichletAllocation (batch / online) 或 NMF
+訓練主題模型。所有後端都使用同一個文章 × 詞 CSR 矩陣 (token_corpus.BowCorpus.matrix)，不必另外轉換語料。
+
+SklearnTopicModel 提供與 gensim LdaModel 相同的 num_topics、show_topic 介面，
+報告與文章主題權重的輸出格式不因後端而改變。
+"""
+import numpy as np
+
+from token_corpus import BowCorpus
+
+# --- 1. 設定 ---
+
+TOPIC_BACKENDS = ['gensim', 'sklearn-batch', 'sklearn-online', 'nmf']
+BACKEND_LABELS = {
+    'gensim': 'LDA',
+    'sklearn-batch': 'LDA (scikit-learn, batch)',
+    'sklearn-online': 'LDA (scikit-learn, online)',
+    'nmf': 'NMF (scikit-learn)',
+}
+
+# 線上 LDA 每批的文章數 (與 gensim 的 chunksize 相同)
+LDA_CHUNK_SIZE = 100
+
+# NMF 的最大迭代次數 (NMF 以 PASSES 為迭代次數太少，收斂通常需要數百次)
+NMF_MAX_ITER = 400
+
+
+# --- 2. 語料轉換 ---
+
+def corpus_matrix(corpus, num_terms):
+    """
+    取得詞袋語料庫的文章 × 詞 csr_matrix：BowCorpus 直接回傳其矩陣，
+    其他語料庫 (例如串流模式的 MmCorpus) 逐篇讀入轉換。
+    """
+    if isinstance(corpus, BowCorpus):
+        return corpus.matrix
+    from gensim import matutils
+    return matutils.corpus2csc(corpus, num_terms=num_terms, dtype=np.float64).T.tocsr()
+
+
+# --- 3. scikit-learn 主題模型 ---
+
+class SklearnTopicModel:
+    """
+    包裝 scikit-learn 的主題模型與其詞典。
+
+    :param backend: (str) 'sklearn-batch'、'sklearn-online' 或 'nmf'。
+    :param id2word: (Dictionary) 欄 id 對應的詞典 (輸出主題關鍵詞用)。
+    :param num_topics: (int) 主題數。
+    :param passes: (int) LDA 的迭代次數 (max_iter)。
+    :param random_state: (int) 隨機種子。
+    :param n_jobs: (int) LDA 使用的行程數 (NMF 不支援平行化，會被忽略)。
+    """
+
+    def __init__(self, backend, id2word, num_topics, passes, random_state, n_jobs=None):
+        from sklearn.decomposition import NMF, LatentDirichletAllocation
+        from sklearn.feature_extraction.text import TfidfTransformer
+        if backend not in TOPIC_BACKENDS[1:]:
+            raise ValueError(f"未知的主題模型後端: {backend}")
+        self.backend = backend
+        self.id2word = id2word
+        self.num_topics = num_topics
+        self.tfidf = None
+        if backend == 'nmf':
+            # NMF 以 TF-IDF 權重訓練，否則高頻詞會主導每個主題
+            self.tfidf = TfidfTransformer()
+            # init=None：主題數不超過文章數與詞數時使用 NNDSVDa (結果穩定)，否則隨機初始化
+            self.estimator = NMF(n_components=num_topics, init=None, max_iter=NMF_MAX_ITER,
+                                 random_state=random_state)
+        else:
+            # 先驗與 gensim 預設的對稱先驗 (1 / 主題數) 相同
+            self.estimator = LatentDirichletAllocation(
+                n_components=num_topics,
+                doc_topic_prior=1.0 / num_topics,
+                topic_word_prior=1.0 / num_topics,
+                learning_method='online' if backend == 'sklearn-online' else 'batch',
+                batch_size=LDA_CHUNK_SIZE,
+                max_iter=passes,
+                random_state=random_state,
+                n_jobs=n_jobs,
+            )
+
+    @property
+    def supports_update(self):
+        """LDA 可以 partial_fit 線上更新；NMF 只能重新訓練"""
+        return self.tfidf is None
+
+    def _features(self, matrix, fit=False):
+        if self.tfidf is None:
+            return matrix
+        return self.tfidf.fit_transform(matrix) if fit else self.tfidf.transform(matrix)
+
+    def fit(self, matrix):
+        if self.tfidf is None:
+            self.estimator.set_params(total_samples=matrix.shape[0])
+        self.estimator.fit(self._features(matrix, fit=True))
+        return self
+
+    def update(self, matrix):
+        """以新文章的文章 × 詞矩陣線上更新 (只適用於 LDA)"""
+        self.estimator.partial_fit(matrix)
+        return self
+
+    def get_topics(self):
+        """主題 × 詞的權重矩陣，每列總和為 1 (與 gensim LdaModel.get_topics 相同)"""
+        components = self.estimator.components_
+        return components / components.sum(axis=1, keepdims=True)
+
+    def show_topic(self, topicid, topn=10):
+        """回傳 [(詞, 權重)]，依權重由高到低排列 (與 gensim LdaModel.show_topic 相同)"""
+        weights = self.get_topics()[topicid]
+        top_ids = np.argsort(-weights, kind='stable')[:topn]
+        return [(self.id2word[int(word_id)], float(weights[word_id])) for word_id in top_ids]
+
+    def doc_topics(self, matrix):
+        """文章 × 主題權重矩陣，每列總和為 1；NMF 中沒有任何權重的文章平均分配到各主題"""
+        weights = self.estimator.transform(self._features(matrix))
+        totals = weights.sum(axis=1, keepdims=True)
+        return np.divide(weights, totals, out=np.full_like(weights, 1.0 / self.num_topics), where=totals > 0)
@@ -0,0 +1,187 @@
+import os
+import time
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+from gensim import models
+from gensim.models import CoherenceModel
+from opencc import OpenCC
+
+from ptt_reader import board_name_from_path
+from token_cache import TokenCache, preprocessing_fingerprint
+from topic_analysis import (
+    FILE_PATHS, OPENCC_PROFILE, PASSES, TOPIC_OUTPUT_DIR, USE_TOKEN_CACHE,
+    build_source_corpus, corpus_path, filter_corpus, get_custom_words, get_stopwords,
+    merge_raw_corpora, parse_ptt_file
+)
+
+# --- 1. 設定 ---
+
+# 要比較的主題數與隨機種子，每個組合各訓練一個模型
+SWEEP_TOPIC_COUNTS = [3, 5, 8, 10, 15]
+SWEEP_SEEDS = [42, 43, 44]
+
+SWEEP_WORKERS = os.cpu_count() or 1   # 同時訓練的模型數 (1 表示依序訓練)
+SWEEP_HOLDOUT_EVERY = 10              # 每 10 篇保留 1 篇作為驗證集計算 perplexity (<= 1 表示不保留)
+SWEEP_COHERENCE = 'u_mass'            # 只需詞袋即可計算，不必保留斷詞結果
+
+SWEEP_OUTPUT_FILE = os.path.join(TOPIC_OUTPUT_DIR, 'topic_sweep.csv')
+
+
+# --- 2. 語料切分 ---
+
+class CorpusSplit:
+    """
+    依文章序號將語料庫切為訓練集或驗證集，可重複走訪且不複製詞袋 (適用於 BowCorpus 與 MmCorpus)。
+
+    :param corpus: (iterable) 詞袋語料庫。
+    :param every: (int) 每 every 篇取 1 篇作為驗證集。
+    :param holdout: (bool) True 表示只產生驗證集，False 表示只產生訓練集。
+    """
+
+    def __init__(self, corpus, every, holdout):
+        self.corpus = corpus
+        self.every = every
+        self.holdout = holdout
+
+    def __iter__(self):
+        for i, doc in enumerate(self.corpus):
+            if (i % self.every == 0) == self.holdout:
+                yield doc
+
+    def __len__(self):
+        num_holdout = -(-len(self.corpus) // self.every)
+        return num_holdout if self.holdout else len(self.corpus) - num_holdout
+
+def split_corpus(corpus, every=SWEEP_HOLDOUT_EVERY):
+    """回傳 (訓練集, 驗證集)；every <= 1 時兩者皆為完整語料庫"""
+    if every <= 1:
+        return corpus, corpus
+    return CorpusSplit(corpus, every, holdout=False), CorpusSplit(corpus, every, holdout=True)
+
+
+# --- 3. 平行訓練與評分 ---
+
+# 各子行程共用的詞典與語料庫，由 _init_sweep_worker 設定一次；fork 模式下直接沿用主行程的物件而不複製
+_sweep_dictionary = None
+_sweep_train = None
+_sweep_holdout = None
+_sweep_passes = None
+
+def _init_sweep_worker(dictionary, train_corpus, holdout_corpus, passes):
+    global _sweep_dictionary, _sweep_train, _sweep_holdout, _sweep_passes
+    _sweep_dictionary = dictionary
+    _sweep_train = train_corpus
+    _sweep_holdout = holdout_corpus
+    _sweep_passes = passes
+
+def _train_and_score(task):
+    """訓練單一 (主題數, 隨機種子) 組合並計算 coherence 與驗證集 perplexity"""
+    num_topics, random_state = task
+    start = time.perf_counter()
+    # 子行程不能再建立行程池，因此使用單行程的 LdaModel；平行度來自同時訓練多個模型
+    lda_model = models.LdaModel(
+        corpus=_sweep_train,
+        id2word=_sweep_dictionary,
+        num_topics=num_topics,
+        random_state=random_state,
+        chunksize=100,
+        passes=_sweep_passes,
+        eval_every=None
+    )
+    train_seconds = time.perf_counter() - start
+    coherence = CoherenceModel(
+        model=lda_model, corpus=_sweep_train, dictionary=_sweep_dictionary, coherence=SWEEP_COHERENCE
+    ).get_coherence()
+    perplexity = float(np.exp2(-lda_model.log_perplexity(_sweep_holdout)))
+    return {
+        'num_topics': num_topics,
+        'random_state': random_state,
+        'coherence': coherence,
+        'perplexity': perplexity,
+        'train_seconds': train_seconds,
+    }
+
+def run_topic_sweep(dictionary, corpus, topic_counts, seeds, passes, workers=SWEEP_WORKERS):
+    """
+    在同一份詞典與語料庫上訓練所有 (主題數, 隨機種子) 組合並評分。
+
+    :param dictionary: (Dictionary) 過濾後的詞典。
+    :param corpus: (iterable) 以該詞典編號的詞袋語料庫 (BowCorpus 或 MmCorpus)。
+    :param topic_counts: (list) 要比較的主題數。
+    :param seeds: (list) 隨機種子。
+    :param passes: (int) 每個模型的迭代次數。
+    :param workers: (int) 同時訓練的模型數。
+    :return: (DataFrame) 每個組合一列，欄位為 num_topics, random_state, coherence, perplexity, train_seconds。
+    """
+    train_corpus, holdout_corpus = split_corpus(corpus)
+    tasks = [(num_topics, seed) for num_topics in topic_counts for seed in seeds]
+    initargs = (dictionary, train_corpus, holdout_corpus, passes)
+
+    if workers <= 1 or len(tasks) <= 1:
+        _init_sweep_worker(*initargs)
+        results = [_train_and_score(task) for task in tasks]
+    else:
+        with Pool(min(workers, len(tasks)), initializer=_init_sweep_worker, initargs=initargs) as pool:
+            results = []
+            for result in pool.imap_unordered(_train_and_score, tasks):
+                print(f"  > 主題數 {result['num_topics']}、種子 {result['random_state']} 完成 "
+                      f"(coherence {result['coherence']:.4f}, perplexity {result['perplexity']:.1f})")
+                results.append(result)
+    return pd.DataFrame(results).sort_values(['num_topics', 'random_state'], ignore_index=True)
+
+def summarize_sweep(results):
+    """依主題數彙總各種子的平均與標準差，依平均 coherence 由高到低排序 (u_mass 越接近 0 越好)"""
+    summary = results.groupby('num_topics').agg(
+        coherence_mean=('coherence', 'mean'),
+        coherence_std=('coherence', 'std'),
+        perplexity_mean=('perplexity', 'mean'),
+        train_seconds_mean=('train_seconds', 'mean'),
+    )
+    return summary.sort_values('coherence_mean', ascending=False)
+
+
+# --- 4. 主程式執行流程 ---
+
+def main():
+    print("--- PTT 主題數掃描 ---")
+    stopwords = get_stopwords()
+    cc = OpenCC(OPENCC_PROFILE)
+    token_cache = None
+    if USE_TOKEN_CACHE:
+        token_cache = TokenCache(preprocessing_fingerprint(get_custom_words(), stopwords, OPENCC_PROFILE))
+
+    # 語料庫只建立一次，所有模型共用
+    print("\n[步驟 1/3] 正在建立共用語料庫...")
+    raw_parts = []
+    for path in FILE_PATHS:
+        docs = parse_ptt_file(path)
+        if not docs:
+            print(f"\n警告：檔案 {path} 為空或讀取失敗，將跳過此檔案。")
+            continue
+        source_part = build_source_corpus(docs, stopwords, cc, token_cache, corpus_key=board_name_from_path(path))
+        if source_part is not None:
+            raw_parts.append(source_part[0])
+    if not raw_parts:
+        print("\n錯誤：所有檔案均無法讀取，無法進行掃描。")
+        return
+
+    dictionary, corpus = filter_corpus(merge_raw_corpora(raw_parts), path=corpus_path('sweep'))
+    print(f"  > 語料庫共 {len(corpus)} 篇文章、{len(dictionary)} 個詞。")
+
+    print(f"\n[步驟 2/3] 正在訓練 {len(SWEEP_TOPIC_COUNTS) * len(SWEEP_SEEDS)} 個模型...")
+    results = run_topic_sweep(dictionary, corpus, SWEEP_TOPIC_COUNTS, SWEEP_SEEDS, PASSES)
+
+    print("\n[步驟 3/3] 比較結果")
+    print(results.to_string(index=False, float_format=lambda x: f"{x:.4f}"))
+    print("\n--- 依主題數彙總 ---")
+    print(summarize_sweep(results).to_string(float_format=lambda x: f"{x:.4f}"))
+
+    os.makedirs(TOPIC_OUTPUT_DIR, exist_ok=True)
+    results.to_csv(SWEEP_OUTPUT_FILE, index=False, encoding='utf-8-sig')
+    print(f"\n掃描結果已儲存至 {SWEEP_OUTPUT_FILE}")
+
+
+if __name__ == '__main__':
+    main()